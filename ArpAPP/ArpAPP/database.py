@@ -0,0 +1,66 @@
+"""
+Database profiles for ``settings.DATABASES``.
+
+``ARP_DATABASE=sqlite`` (the default) keeps the single-file database next to
+``manage.py``, tuned for a write-heavy ingest: WAL lets readers run while an
+import commits, ``synchronous=NORMAL`` only syncs at checkpoints, and a larger
+page cache plus memory-mapped reads keep the node and membership indexes hot.
+
+``ARP_DATABASE=postgresql`` reads its connection from ``ARP_PG_NAME``,
+``ARP_PG_USER``, ``ARP_PG_PASSWORD``, ``ARP_PG_HOST`` and ``ARP_PG_PORT``;
+there bulk ingest loads nodes with ``COPY`` and one merge statement (see
+``MainApp.pg_ingest``).
+"""
+import os
+
+# seconds a connection is kept between requests; None keeps it for the life of the worker
+CONN_MAX_AGE = 600
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    # negative values are KiB: 64 MiB of page cache
+    'cache_size': -64 * 1024,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,
+}
+
+
+def sqlite_profile(path, pragmas=None):
+    pragmas = {**SQLITE_PRAGMAS, **(pragmas or {})}
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # run on every new connection, so persistent and test connections get them too
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in pragmas.items()),
+            # take the write lock at BEGIN instead of failing to upgrade a read lock mid-transaction
+            'transaction_mode': 'IMMEDIATE',
+        },
+    }
+
+
+def postgresql_profile(environ=os.environ):
+    return {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': environ.get('ARP_PG_NAME', 'arpapp'),
+        'USER': environ.get('ARP_PG_USER', ''),
+        'PASSWORD': environ.get('ARP_PG_PASSWORD', ''),
+        'HOST': environ.get('ARP_PG_HOST', ''),
+        'PORT': environ.get('ARP_PG_PORT', ''),
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+    }
+
+
+def database_profile(base_dir, environ=os.environ):
+    """The ``default`` database for the profile named by ``ARP_DATABASE``."""
+    name = environ.get('ARP_DATABASE', 'sqlite').lower()
+    if name == 'sqlite':
+        return sqlite_profile(environ.get('ARP_SQLITE_PATH', base_dir / 'db.sqlite3'))
+    if name in ('postgresql', 'postgres'):
+        return postgresql_profile(environ)
+    raise ValueError(f"ARP_DATABASE must be 'sqlite' or 'postgresql', not {name!r}")
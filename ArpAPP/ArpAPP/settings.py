@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/dev/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from .database import database_profile
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -48,6 +51,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'MainApp.middleware.RequestMetricsMiddleware',
 ]
 
 ROOT_URLCONF = 'ArpAPP.urls'
@@ -73,12 +77,38 @@ WSGI_APPLICATION = 'ArpAPP.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/dev/ref/settings/#databases
 
+# ARP_DATABASE=sqlite|postgresql picks the profile; see ArpAPP/database.py.
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_profile(BASE_DIR),
 }
+# On PostgreSQL, bulk ingest loads nodes with COPY and a single merge; False keeps the ORM path.
+ARP_PG_COPY_INGEST = True
+
+
+# Bearer tokens accepted by the bulk ingest endpoint (comma-separated in the
+# environment); with none set the endpoint rejects every upload.
+ARP_INGEST_TOKENS = [token for token in os.environ.get('ARP_INGEST_TOKENS', '').split(',') if token]
+
+# Dashboard summaries are cached per process by default. With several worker
+# processes, or imports run from manage.py, set ARP_CACHE_DIR to share a file
+# cache so that their invalidations reach every worker.
+if os.environ.get('ARP_CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ['ARP_CACHE_DIR'],
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+# seconds a dashboard summary may be served; bounds staleness from writers in other processes
+ARP_DASHBOARD_CACHE_TIMEOUT = 300
 
 
 # Password validation
@@ -119,3 +149,12 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # https://docs.djangoproject.com/en/dev/howto/static-files/
 
 STATIC_URL = 'static/'
+
+# Graph rendering runs in a background pool; set GRAPH_RENDER_PROCESSES = False
+# to render in the pool's threads instead of separate worker processes.
+GRAPH_RENDER_WORKERS = 2
+GRAPH_RENDER_PROCESSES = True
+# Seconds after which a queued or running render is failed; its worker is assumed gone.
+GRAPH_JOB_TIMEOUT = 600
+# Above this many nodes graph images only label switches (or nothing, if there are more switches).
+GRAPH_LABEL_LIMIT = 300
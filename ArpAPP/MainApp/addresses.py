@@ -0,0 +1,103 @@
+import ipaddress
+import re
+
+MAC_BITS = 48
+MAC_MAX = (1 << MAC_BITS) - 1
+# hex digits of a 128-bit address; IPv4 is keyed as its IPv4-mapped IPv6 form
+IP_SORT_KEY_LENGTH = 32
+
+_MAC_HEX = re.compile(r'[0-9a-f]')
+_MAC_SEPARATORS = re.compile(r'[:.\-\s]')
+_IPV4_MAPPED_BASE = 0xFFFF << 32
+
+
+def mac_to_int(mac):
+    """48-bit integer of a MAC in any of the notations normalize_mac accepts, or None."""
+    if mac is None:
+        return None
+    if isinstance(mac, int):
+        return mac if 0 <= mac <= MAC_MAX else None
+    digits = ''.join(_MAC_HEX.findall(mac.strip().lower()))
+    if len(digits) != 12:
+        return None
+    return int(digits, 16)
+
+
+def mac_prefix_range(prefix):
+    """
+    ``(first, last)`` MAC integers starting with the hex digits of ``prefix``
+    (e.g. ``00:1a:2b``), for ``MacInt__range`` queries; None if it is not a prefix.
+    """
+    digits = ''.join(_MAC_HEX.findall((prefix or '').strip().lower()))
+    if not digits or len(digits) > 12 or len(digits) != len(_MAC_SEPARATORS.sub('', prefix.strip())):
+        return None
+    free_bits = 4 * (12 - len(digits))
+    first = int(digits, 16) << free_bits
+    return first, first | ((1 << free_bits) - 1)
+
+
+def int_to_mac(value):
+    """Lower-case colon-separated text form of a 48-bit MAC integer."""
+    if value is None:
+        return None
+    digits = f'{value:012x}'
+    return ':'.join(digits[i:i + 2] for i in range(0, 12, 2))
+
+
+def parse_ip(ip):
+    """``ipaddress`` object for ``ip``, or None when it is not a valid IPv4/IPv6 address."""
+    try:
+        return ipaddress.ip_address((ip or '').strip())
+    except ValueError:
+        return None
+
+
+def normalize_ip(ip):
+    """Canonical text form of ``ip``; invalid addresses are returned unchanged."""
+    parsed = parse_ip(ip)
+    return str(parsed) if parsed is not None else ip
+
+
+def _key(value):
+    return f'{value:0{IP_SORT_KEY_LENGTH}x}'
+
+
+def _as_int(addr):
+    if addr.version == 4:
+        return _IPV4_MAPPED_BASE | int(addr)
+    return int(addr)
+
+
+def ip_sort_key(ip):
+    """
+    Fixed-width hex key that sorts like the numeric address, with IPv4 keyed as
+    ``::ffff:a.b.c.d`` so both families share one index. Invalid addresses get
+    an empty key.
+    """
+    addr = ip if isinstance(ip, (ipaddress.IPv4Address, ipaddress.IPv6Address)) else parse_ip(ip)
+    if addr is None:
+        return ''
+    return _key(_as_int(addr))
+
+
+def network_key_range(cidr):
+    """
+    ``(first, last)`` sort keys of every address in ``cidr``, for
+    ``IpSortKey__range`` queries.
+    """
+    net = cidr if isinstance(cidr, (ipaddress.IPv4Network, ipaddress.IPv6Network)) \
+        else ipaddress.ip_network(cidr.strip(), strict=False)
+    return _key(_as_int(net.network_address)), _key(_as_int(net.broadcast_address))
+
+
+def ip_to_int(ip):
+    """Integer whose order matches ``ip_sort_key`` (IPv4 as ``::ffff:a.b.c.d``), or None if invalid."""
+    addr = ip if isinstance(ip, (ipaddress.IPv4Address, ipaddress.IPv6Address)) else parse_ip(ip)
+    if addr is None:
+        return None
+    return _as_int(addr)
+
+
+def network_int_range(net):
+    """``(first, last)`` of ``ip_to_int`` over every address of an ``ipaddress`` network."""
+    return _as_int(net.network_address), _as_int(net.broadcast_address)
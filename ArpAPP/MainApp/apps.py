@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class MainappConfig(AppConfig):
     name = 'MainApp'
+
+    def ready(self):
+        from . import signals  # noqa: F401
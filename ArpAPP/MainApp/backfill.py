@@ -0,0 +1,252 @@
+import io
+import logging
+import os
+import tarfile
+import time
+from collections import deque
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db import transaction
+
+from .addresses import mac_to_int, parse_ip
+from .history import record_observations, start_scan
+from .ingest import bulk_ingest_entries
+from .parsing import ParseStats, is_broadcast_or_multicast, iter_stream_lines, iter_tables, open_decoded_stream, \
+    parse_arp_lines
+
+logger = logging.getLogger(__name__)
+
+# entries per writer transaction; larger than the web path since nobody waits on the locks
+BACKFILL_BATCH_SIZE = 50000
+
+# Content-Encoding implied by a dump's file suffix
+SUFFIX_ENCODINGS = {'.gz': 'gzip', '.zst': 'zstd'}
+
+TARBALL_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.zst')
+
+# separates a tarball path from the member name in source names
+MEMBER_SEPARATOR = '::'
+
+
+def _is_tarball(path):
+    return os.path.isfile(path) and path.endswith(TARBALL_SUFFIXES)
+
+
+def iter_sources(paths):
+    """
+    Yield ``(name, payload, mtime)`` for every dump under ``paths`` in a
+    stable order. Plain files and directories yield the file path as payload,
+    so workers read them themselves; tarball members are read here,
+    sequentially, and yield their bytes. ``mtime`` dates the dump's scan.
+    """
+    for path in paths:
+        path = os.path.abspath(path)
+        if _is_tarball(path):
+            if path.endswith('.tar.zst'):
+                with open(path, 'rb') as raw:
+                    with tarfile.open(fileobj=open_decoded_stream(raw, 'zstd'), mode='r|') as tar:
+                        yield from _iter_members(path, tar)
+            else:
+                with tarfile.open(path, mode='r|*') as tar:
+                    yield from _iter_members(path, tar)
+        elif os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for filename in sorted(files):
+                    full = os.path.join(root, filename)
+                    yield full, full, os.path.getmtime(full)
+        else:
+            yield path, path, os.path.getmtime(path)
+
+
+def _iter_members(path, tar):
+    for member in tar:
+        if member.isfile():
+            yield f"{path}{MEMBER_SEPARATOR}{member.name}", tar.extractfile(member).read(), member.mtime
+
+
+def _encoding_for(name):
+    return SUFFIX_ENCODINGS.get(os.path.splitext(name)[1].lower())
+
+
+def parse_source(name, payload, tagged=False):
+    """
+    Parse one dump the way ``parse_and_create_nodes_diagnostic`` does and
+    return ``(name, tables)``, each table a dict with its ``@network`` tag
+    (None unless ``tagged``), the ``(ip, mac, interface)`` entries and the
+    parse counters. Runs in worker processes, so it must not touch the ORM.
+    """
+    raw = open(payload, 'rb') if isinstance(payload, str) else io.BytesIO(payload)
+    with raw:
+        lines = iter_stream_lines(open_decoded_stream(raw, _encoding_for(name)))
+        groups = iter_tables(lines) if tagged else [(None, lines)]
+        tables = []
+        for tag, table_lines in groups:
+            stats = ParseStats(max_samples=0)
+            entries = []
+            skipped = 0
+            for entry in parse_arp_lines(table_lines, stats=stats):
+                if is_broadcast_or_multicast(entry.mac):
+                    skipped += 1
+                    continue
+                entries.append((entry.ip, entry.mac, entry.interface))
+            if tag is None and tagged and not stats.parsed_entries_count:
+                continue
+            tables.append({
+                'tag': tag,
+                'entries': entries,
+                'lines_total': stats.lines_total,
+                'parsed_entries_count': stats.parsed_entries_count,
+                'entries_skipped_broadcast': skipped,
+            })
+    return name, tables
+
+
+def iter_parsed(sources, tagged=False, jobs=1):
+    """
+    Parse ``(name, payload, mtime)`` sources in a pool of ``jobs`` processes
+    and yield ``(name, tables, mtime)`` in source order. At most ``2 * jobs`` sources are in flight, so tarball
+    members are not read far ahead of the writer.
+    """
+    if jobs <= 1:
+        for name, payload, mtime in sources:
+            yield (*parse_source(name, payload, tagged), mtime)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        in_flight = deque()
+        for name, payload, mtime in sources:
+            in_flight.append((pool.submit(parse_source, name, payload, tagged), mtime))
+            if len(in_flight) >= 2 * jobs:
+                future, mtime = in_flight.popleft()
+                yield (*future.result(), mtime)
+        while in_flight:
+            future, mtime = in_flight.popleft()
+            yield (*future.result(), mtime)
+
+
+def read_resume_state(path):
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path, encoding='utf-8') as fh:
+        return {line.rstrip('\n') for line in fh if line.strip()}
+
+
+class BackfillWriter:
+    """
+    Single writer for ``import_arp``: buffers parsed entries per network and
+    commits them with ``bulk_ingest_entries`` once ``batch_size`` entries are
+    pending. Each source becomes one scan per network in the observation
+    history, dated by the source's mtime. A source is appended to the resume
+    file only after the batch holding its last entry has been committed.
+    """
+
+    def __init__(self, resolve, batch_size=BACKFILL_BATCH_SIZE, dry_run=False, resume_path=None):
+        self.resolve = resolve
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.resume_path = resume_path
+        self.pending = {}
+        self.pending_count = 0
+        self.pending_sources = []
+        self.diag = {}
+        self.totals = {
+            'sources': 0,
+            'tables': 0,
+            'lines_total': 0,
+            'parsed_entries_count': 0,
+            'entries_skipped_broadcast': 0,
+            'rows_written': 0,
+            'batches_committed': 0,
+            'errors': [],
+        }
+
+    def add(self, name, tables, mtime=None):
+        self.totals['sources'] += 1
+        for table in tables:
+            self.totals['tables'] += 1
+            for key in ('lines_total', 'parsed_entries_count', 'entries_skipped_broadcast'):
+                self.totals[key] += table[key]
+            network = self.resolve(table['tag'])
+            if network is None:
+                self.totals['errors'].append(f"{name}: no network for tag {table['tag']!r}")
+                continue
+            if table['entries']:
+                _, entries, scans = self.pending.setdefault(network.pk, (network, [], []))
+                end = len(entries) + len(table['entries'])
+                if scans and scans[-1][0] == name:
+                    # another table of this source for the same network: still one scan
+                    scans[-1] = (name, mtime, scans[-1][2], end)
+                else:
+                    scans.append((name, mtime, len(entries), end))
+                entries.extend(table['entries'])
+                self.pending_count += len(table['entries'])
+        self.pending_sources.append(name)
+        if self.pending_count >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.dry_run:
+            # rows that would have been written, before the writer's address validation
+            self.totals['rows_written'] += self.pending_count
+        elif self.pending:
+            with transaction.atomic():
+                for network, entries, scans in self.pending.values():
+                    skipped_before = self.diag.get('entries_skipped_invalid', 0)
+                    nodes = bulk_ingest_entries(network, entries, self.diag)
+                    skipped = self.diag.get('entries_skipped_invalid', 0) - skipped_before
+                    self.totals['rows_written'] += len(entries) - skipped
+                    self._record_scans(network, entries, scans, {node.MacInt: node.pk for node in nodes})
+            self.totals['batches_committed'] += 1
+            logger.info("Backfill batch %d committed: %d entries from %d sources",
+                        self.totals['batches_committed'], self.pending_count, len(self.pending_sources))
+        if not self.dry_run and self.resume_path and self.pending_sources:
+            with open(self.resume_path, 'a', encoding='utf-8') as fh:
+                fh.writelines(f"{name}\n" for name in self.pending_sources)
+        self.pending = {}
+        self.pending_count = 0
+        self.pending_sources = []
+
+
+    @staticmethod
+    def _record_scans(network, entries, scans, pk_by_mac):
+        # the nodes were written once for the whole batch; each source still gets its own scan
+        for _name, mtime, start, end in scans:
+            ip_by_node = {}
+            for ip, mac, _ in entries[start:end]:
+                pk = pk_by_mac.get(mac_to_int(mac))
+                addr = parse_ip(ip)
+                if pk is not None and addr is not None:
+                    ip_by_node[pk] = str(addr)
+            taken_at = datetime.fromtimestamp(mtime, tz=timezone.utc) if mtime is not None else None
+            record_observations(start_scan(network, 'import', taken_at), ip_by_node)
+
+
+def import_sources(paths, resolve, tagged=False, jobs=1, batch_size=BACKFILL_BATCH_SIZE, dry_run=False,
+                   resume_path=None, progress=None):
+    """
+    Parse every dump under ``paths`` in parallel and write the entries through
+    one ``BackfillWriter``. ``resolve(tag)`` maps an ``@network`` tag (None for
+    untagged dumps) to a network or None. Sources listed in ``resume_path`` are
+    skipped. ``progress(name, tables)`` is called with each source's parsed
+    tables (see ``parse_source``) once the writer has taken them. Returns the
+    writer totals plus elapsed time and throughput.
+    """
+    started = time.perf_counter()
+    done = read_resume_state(resume_path)
+    sources = (source for source in iter_sources(paths) if source[0] not in done)
+    writer = BackfillWriter(resolve, batch_size=batch_size, dry_run=dry_run, resume_path=resume_path)
+
+    for name, tables, mtime in iter_parsed(sources, tagged=tagged, jobs=jobs):
+        writer.add(name, tables, mtime)
+        if progress is not None:
+            progress(name, tables)
+    writer.flush()
+
+    totals = writer.totals
+    totals['sources_already_done'] = len(done)
+    totals['elapsed_s'] = elapsed = time.perf_counter() - started
+    totals['lines_per_s'] = totals['lines_total'] / elapsed if elapsed else 0.0
+    totals['rows_per_s'] = totals['rows_written'] / elapsed if elapsed else 0.0
+    return totals
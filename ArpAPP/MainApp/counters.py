@@ -0,0 +1,81 @@
+from django.db.models import Case, Count, F, IntegerField, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import Networks, Project
+
+# Project.NumberOfNodes is the sum of its networks' NumberOfNodes, i.e. node attachments, not distinct nodes.
+
+
+def _plus(field, delta):
+    return Coalesce(F(field), Value(0)) + delta
+
+
+def _plus_each(field, deltas):
+    """``field`` plus a per-row delta from ``{pk: delta}``, for one UPDATE over all those rows."""
+    whens = [When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()]
+    return _plus(field, Case(*whens, default=Value(0), output_field=IntegerField()))
+
+
+def add_project_networks(project_pk, delta):
+    Project.objects.filter(pk=project_pk).update(NumberOfNetworks=_plus('NumberOfNetworks', delta))
+
+
+def add_project_nodes(project_pk, delta):
+    if delta:
+        Project.objects.filter(pk=project_pk).update(NumberOfNodes=_plus('NumberOfNodes', delta))
+
+
+def add_network_nodes(deltas):
+    """
+    Apply ``{network_pk: delta}`` attachment changes to Networks.NumberOfNodes
+    and to the NumberOfNodes of the owning projects: one SELECT for the owning
+    projects, then one CASE UPDATE for the networks and one for the projects,
+    however many networks change.
+    """
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    project_deltas = {}
+    for net_pk, project_pk in Networks.objects.filter(pk__in=deltas).values_list('pk', 'RelatedProject_id'):
+        project_deltas[project_pk] = project_deltas.get(project_pk, 0) + deltas[net_pk]
+    if not project_deltas:
+        return
+    Networks.objects.filter(pk__in=deltas).update(NumberOfNodes=_plus_each('NumberOfNodes', deltas))
+    project_deltas = {pk: delta for pk, delta in project_deltas.items() if delta}
+    if project_deltas:
+        Project.objects.filter(pk__in=project_deltas).update(NumberOfNodes=_plus_each('NumberOfNodes', project_deltas))
+
+
+def reconcile_counters(projects=None):
+    """
+    Recount every counter of ``projects`` (all projects by default) from the
+    underlying rows and store the ones that drifted. Returns
+    ``(networks_fixed, projects_fixed)``.
+    """
+    networks = Networks.objects.all()
+    project_qs = Project.objects.all()
+    if projects is not None:
+        networks = networks.filter(RelatedProject__in=projects)
+        project_qs = project_qs.filter(pk__in=[getattr(p, 'pk', p) for p in projects])
+
+    network_totals = {}
+    networks_fixed = []
+    for network in networks.annotate(attached=Count('Nodes')).only('pk', 'RelatedProject_id', 'NumberOfNodes'):
+        totals = network_totals.setdefault(network.RelatedProject_id, [0, 0])
+        totals[0] += 1
+        totals[1] += network.attached
+        if network.NumberOfNodes != network.attached:
+            network.NumberOfNodes = network.attached
+            networks_fixed.append(network)
+    Networks.objects.bulk_update(networks_fixed, ['NumberOfNodes'], batch_size=500)
+
+    projects_fixed = []
+    for project in project_qs.only('pk', 'NumberOfNetworks', 'NumberOfNodes'):
+        network_count, node_count = network_totals.get(project.pk, (0, 0))
+        if (project.NumberOfNetworks, project.NumberOfNodes) != (network_count, node_count):
+            project.NumberOfNetworks = network_count
+            project.NumberOfNodes = node_count
+            projects_fixed.append(project)
+    Project.objects.bulk_update(projects_fixed, ['NumberOfNetworks', 'NumberOfNodes'], batch_size=500)
+
+    return len(networks_fixed), len(projects_fixed)
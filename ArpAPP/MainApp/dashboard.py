@@ -0,0 +1,99 @@
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from .models import GraphImage, Networks, Node
+
+# Per-project dashboard summaries live in the cache under a key that embeds
+# the project's summary version. Writers only bump the version (after their
+# transaction commits); the next dashboard hit misses, recomputes and stores
+# the summary under the new key, and the old entry simply expires.
+
+SUMMARY_TIMEOUT = getattr(settings, 'ARP_DASHBOARD_CACHE_TIMEOUT', 300)
+
+
+def _version_key(project_pk):
+    return f'arp:project:{project_pk}:summary-version'
+
+
+def _summary_key(project_pk, version):
+    return f'arp:project:{project_pk}:summary:{version}'
+
+
+def _new_version():
+    # a version key evicted from the cache restarts above every version used before
+    return time.time_ns()
+
+
+def _bump(project_pks):
+    for pk in project_pks:
+        key = _version_key(pk)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _new_version(), None)
+
+
+def invalidate_project_summaries(project_pks):
+    """Make the cached summaries of ``project_pks`` stale once the current transaction commits."""
+    project_pks = {pk for pk in project_pks if pk is not None}
+    if project_pks:
+        transaction.on_commit(partial(_bump, project_pks))
+
+
+def _versions(project_pks):
+    keys = {_version_key(pk): pk for pk in project_pks}
+    found = cache.get_many(keys)
+    versions = {keys[key]: version for key, version in found.items()}
+    for key, pk in keys.items():
+        if pk not in versions:
+            cache.add(key, _new_version(), None)
+            versions[pk] = cache.get(key)
+    return versions
+
+
+def compute_project_summary(project_pk):
+    """Counts, vendor/type histograms and the latest graph image of a project, straight from the database."""
+    # the attachment counters are kept by ingest and the signals; no COUNT over the membership table
+    networks = [
+        {**row, 'NumberOfNodes': row['NumberOfNodes'] or 0}
+        for row in (Networks.objects.filter(RelatedProject_id=project_pk).order_by('pk')
+                    .values('pk', 'NetworkName', 'NetworkMask', 'NumberOfNodes'))
+    ]
+    nodes = Node.objects.filter(networks__RelatedProject_id=project_pk)
+    # a node attached to several networks of the project is counted once
+    vendors = list(nodes.values_list('Vendor').annotate(n=Count('pk', distinct=True)).order_by('-n', 'Vendor'))
+    types = list(nodes.values_list('Type').annotate(n=Count('pk', distinct=True)).order_by('-n', 'Type'))
+
+    image = (GraphImage.objects.filter(project_id=project_pk).exclude(image='')
+             .order_by('-created_at').values_list('image', flat=True).first())
+    return {
+        'networks': networks,
+        'network_count': len(networks),
+        'attached_count': sum(network['NumberOfNodes'] for network in networks),
+        'node_count': sum(n for _, n in vendors),
+        'vendors': [(vendor or 'Unknown', n) for vendor, n in vendors],
+        'types': [(node_type or 'unknown', n) for node_type, n in types],
+        'graph_url': GraphImage._meta.get_field('image').storage.url(image) if image else None,
+    }
+
+
+def project_summaries(project_pks):
+    """``{pk: summary}`` for ``project_pks``, computing and caching only the ones missing from the cache."""
+    versions = _versions(project_pks)
+    keys = {_summary_key(pk, version): pk for pk, version in versions.items()}
+    summaries = {keys[key]: summary for key, summary in cache.get_many(keys).items()}
+    missing = {key: pk for key, pk in keys.items() if pk not in summaries}
+    if missing:
+        computed = {key: compute_project_summary(pk) for key, pk in missing.items()}
+        cache.set_many(computed, SUMMARY_TIMEOUT)
+        summaries.update((missing[key], summary) for key, summary in computed.items())
+    return summaries
+
+
+def project_summary(project_pk):
+    return project_summaries([project_pk])[project_pk]
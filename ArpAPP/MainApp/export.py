@@ -0,0 +1,97 @@
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+from .graph_style import DEFAULT_LABEL_LIMIT, DEVICE_PALETTE, SWITCH_COLOR, type_color
+from .layout import GraphLayout, partition_edges
+
+SVG_WIDTH = 1400
+SVG_HEIGHT = 1000
+SVG_EDGE_CHUNK = 2000
+
+SVG_EDGE_STYLES = {
+    'attached': 'stroke="#000" stroke-width="1.2" stroke-opacity="0.95"',
+    'inter_switch': 'stroke="green" stroke-width="2" stroke-opacity="0.9"',
+    'virtual': 'stroke="gray" stroke-width="1" stroke-opacity="0.5" stroke-dasharray="1 3"',
+}
+
+
+def graph_to_json(G, layout: GraphLayout):
+    """
+    Column-oriented export of a graph from load_project_graph: node attribute
+    arrays in layout row order, and per-kind edge lists as row indices into
+    those arrays, with the precomputed positions.
+    """
+    attrs = [G.nodes[n] for n in layout.nodes]
+    edges = {
+        kind: {'source': us.tolist(), 'target': vs.tolist()}
+        for kind, (us, vs) in partition_edges(G, layout.index).items()
+    }
+    return {
+        'nodes': {
+            'id': [str(n) for n in layout.nodes],
+            'is_switch': layout.is_switch.tolist(),
+            'label': [a.get('label') or '' for a in attrs],
+            'ip': [a.get('IpAddress') for a in attrs],
+            'mac': [a.get('MacAddress') for a in attrs],
+            'vendor': [a.get('Vendor') for a in attrs],
+            'type': [a.get('Type') for a in attrs],
+            'x': np.round(layout.xy[:, 0], 4).tolist(),
+            'y': np.round(layout.xy[:, 1], 4).tolist(),
+        },
+        'edges': edges,
+        'palette': {'switch': SWITCH_COLOR, 'devices': DEVICE_PALETTE},
+    }
+
+
+def _to_canvas(xy, width, height, pad=20.0):
+    if not len(xy):
+        return xy
+    lo = xy.min(axis=0)
+    span = np.maximum(xy.max(axis=0) - lo, 1e-9)
+    scale = min((width - 2 * pad) / span[0], (height - 2 * pad) / span[1])
+    out = (xy - lo) * scale + pad
+    out[:, 1] = height - out[:, 1]
+    return np.round(out, 1)
+
+
+def iter_svg(G, layout: GraphLayout, label_limit=DEFAULT_LABEL_LIMIT, width=SVG_WIDTH, height=SVG_HEIGHT):
+    """Yield an SVG document in chunks: one path per edge kind chunk, one circle per node."""
+    xy = _to_canvas(layout.xy, width, height)
+    n = len(layout.nodes)
+    radius = max(1.5, min(14.0, 14.0 * (200.0 / max(1, n)) ** 0.5))
+
+    yield (f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" '
+           f'width="{width}" height="{height}" font-family="sans-serif" font-size="8">\n')
+
+    for kind, (us, vs) in partition_edges(G, layout.index).items():
+        style = SVG_EDGE_STYLES.get(kind, SVG_EDGE_STYLES['attached'])
+        yield f'<g class="edges {kind}" fill="none" {style}>\n'
+        for start in range(0, len(us), SVG_EDGE_CHUNK):
+            a = xy[us[start:start + SVG_EDGE_CHUNK]]
+            b = xy[vs[start:start + SVG_EDGE_CHUNK]]
+            d = ''.join(f'M{x1:g} {y1:g}L{x2:g} {y2:g}' for (x1, y1), (x2, y2) in zip(a.tolist(), b.tolist()))
+            yield f'<path d="{d}"/>\n'
+        yield '</g>\n'
+
+    label_all = n <= label_limit
+    yield '<g class="nodes" stroke="#fff" stroke-width="0.5">\n'
+    for i, node in enumerate(layout.nodes):
+        attrs = G.nodes[node]
+        is_switch = bool(layout.is_switch[i])
+        fill = SWITCH_COLOR if is_switch else type_color(attrs.get('Type'))
+        r = radius * 1.5 if is_switch else radius
+        label = attrs.get('label') or ''
+        x, y = xy[i]
+        yield (f'<circle cx="{x:g}" cy="{y:g}" r="{r:g}" fill="{fill}">'
+               f'<title>{escape(label)}</title></circle>\n')
+    yield '</g>\n'
+
+    yield '<g class="labels" text-anchor="middle">\n'
+    for i, node in enumerate(layout.nodes):
+        if not (label_all or layout.is_switch[i]):
+            continue
+        label = (G.nodes[node].get('label') or '').split('\n')[0]
+        x, y = xy[i]
+        yield f'<text x="{x:g}" y="{y:g}" dy="3">{escape(label)}</text>\n'
+    yield '</g>\n</svg>\n'
@@ -1,7 +1,41 @@
+import ipaddress
+
 from django import forms
 
+from .addresses import mac_prefix_range
+from .listing import NODE_PAGE_MAX, decode_cursor
+
 class ArpTableForm(forms.Form):
     arp_text = forms.CharField(
         widget=forms.Textarea(attrs={'rows': 15, 'cols': 80}),
         label="Paste ARP table here"
-    )
\ No newline at end of file
+    )
+
+class NodeFilterForm(forms.Form):
+    vendor = forms.CharField(required=False, label="Vendor contains")
+    type = forms.CharField(required=False, label="Type")
+    mac = forms.CharField(required=False, label="MAC prefix")
+    cidr = forms.CharField(required=False, label="Subnet (CIDR)")
+    after = forms.CharField(required=False, widget=forms.HiddenInput)
+    limit = forms.IntegerField(required=False, min_value=1, max_value=NODE_PAGE_MAX, widget=forms.HiddenInput)
+
+    def clean_mac(self):
+        prefix = self.cleaned_data['mac'].strip()
+        if prefix and mac_prefix_range(prefix) is None:
+            raise forms.ValidationError("Enter up to 12 hex digits, e.g. 00:1a:2b.")
+        return prefix
+
+    def clean_cidr(self):
+        cidr = self.cleaned_data['cidr'].strip()
+        if cidr:
+            try:
+                ipaddress.ip_network(cidr, strict=False)
+            except ValueError:
+                raise forms.ValidationError("Enter a subnet such as 10.0.0.0/16.")
+        return cidr
+
+    def clean_after(self):
+        after = self.cleaned_data['after'].strip()
+        if after and decode_cursor(after) is None:
+            raise forms.ValidationError("Invalid page cursor.")
+        return after
@@ -0,0 +1,92 @@
+import hashlib
+
+import networkx as nx
+
+from .addresses import int_to_mac
+from .graph_store import component_roots, rebuild_project_graph
+from .metrics import timed
+from .models import GraphEdge, Networks, ProjectGraph
+from .topology import FINGERPRINT_VERSION, GRAPH_BUILD_OPTIONS
+
+
+def load_project_graph(project):
+    """
+    Build the networkx graph of ``project`` from its persisted edges in three
+    queries (state, networks, edges joined with their nodes), rebuilding the
+    store first if it is missing or stale. Returns ``(G, diag)``: one
+    ``sw_<network pk>`` node per network, one node per attached device keyed
+    by its pk, and edges of kind attached, inter_switch or virtual; virtual
+    edges join the lowest switch of each component to that of the first
+    component.
+    """
+    state = ProjectGraph.objects.filter(project=project).first()
+    if state is None or state.stale:
+        state = rebuild_project_graph(project)
+
+    with timed('graph_build'):
+        return _graph_from_store(project, state)
+
+
+def _graph_from_store(project, state):
+    G = nx.Graph()
+    diag = {'devices': 0, 'switches': 0, 'edges': 0, 'virtual_edges_added': 0, 'version': state.version}
+
+    networks = list(Networks.objects.filter(RelatedProject=project).order_by('pk').values_list('pk', 'NetworkName'))
+    for net_pk, name in networks:
+        G.add_node(f"sw_{net_pk}", label=name or f"Network {net_pk}", is_switch=True, network_pk=net_pk)
+        diag['switches'] += 1
+
+    rows = (GraphEdge.objects.filter(project=project)
+            .order_by('kind', 'network_id', 'node_id', 'peer_id')
+            .values_list('kind', 'network_id', 'peer_id', 'node_id',
+                         'node__IpAddress', 'node__MacInt', 'node__Vendor', 'node__Type'))
+    for kind, net_pk, peer_pk, node_pk, ip, mac_int, vendor, dtype in rows:
+        sw_id = f"sw_{net_pk}"
+        if sw_id not in G:
+            continue
+        if kind == GraphEdge.KIND_ATTACHED:
+            if node_pk not in G:
+                mac = int_to_mac(mac_int)
+                G.add_node(node_pk,
+                           label=f"{ip or ''}\n{mac or ''}\n{vendor or ''} / {dtype or ''}",
+                           IpAddress=ip,
+                           MacAddress=mac,
+                           Vendor=vendor,
+                           Type=dtype,
+                           is_switch=False,
+                           django_pk=node_pk)
+            G.add_edge(node_pk, sw_id, kind=kind)
+        elif f"sw_{peer_pk}" in G:
+            G.add_edge(sw_id, f"sw_{peer_pk}", kind=kind)
+        diag['edges'] += 1
+
+    roots = component_roots(state.components, [net_pk for net_pk, _ in networks])
+    if len(roots) > 1 and G.number_of_nodes() > 0:
+        base = f"sw_{roots[0]}"
+        for net_pk in roots[1:]:
+            G.add_edge(base, f"sw_{net_pk}", kind='virtual')
+            diag['virtual_edges_added'] += 1
+
+    diag['devices'] = G.number_of_nodes() - diag['switches']
+    return G, diag
+
+
+def graph_fingerprint(G, options=None):
+    """
+    Deterministic SHA-256 over everything a rendered graph shows: nodes in
+    insertion order with their attributes, edges with their kinds, and the
+    build/render options. Equal fingerprints render identical images.
+    """
+    h = hashlib.sha256()
+
+    def feed(*values):
+        h.update(repr(values).encode('utf-8'))
+        h.update(b'\n')
+
+    feed('version', FINGERPRINT_VERSION)
+    feed('options', sorted((options or GRAPH_BUILD_OPTIONS).items()))
+    for n, attrs in G.nodes(data=True):
+        feed('node', n, sorted(attrs.items()))
+    for u, v, kind in G.edges(data='kind'):
+        feed('edge', u, v, kind)
+    return h.hexdigest()
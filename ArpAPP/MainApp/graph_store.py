@@ -0,0 +1,165 @@
+import logging
+
+from django.db import transaction
+from django.db.models import F
+
+from .metrics import timed
+from .models import ArpSegment, ArpSegmentMembership, GraphEdge, Networks, ProjectGraph
+from .topology import load_project_topology
+
+logger = logging.getLogger(__name__)
+
+# Every device in the graph hangs off a switch, so connectivity is decided at
+# switch level: two switches are joined by a node attached to both, or by an
+# inter_switch edge. The union-find in ProjectGraph.components therefore only
+# ever holds networks, and ingest, which only adds rows, can keep it current
+# with unions. Anything that removes rows marks the graph stale instead.
+
+EDGE_BATCH_SIZE = 900
+
+_attached = Networks.Nodes.through
+
+
+def _chunks(pks):
+    pks = sorted(pks)
+    for i in range(0, len(pks), EDGE_BATCH_SIZE):
+        yield pks[i:i + EDGE_BATCH_SIZE]
+
+
+def _find(parents, net_pk):
+    key = str(net_pk)
+    root = net_pk
+    while str(root) in parents and parents[str(root)] != root:
+        root = parents[str(root)]
+    # path compression
+    while key in parents and parents[key] != root:
+        parents[key], key = root, str(parents[key])
+    return root
+
+
+def _union(parents, a, b):
+    ra, rb = _find(parents, a), _find(parents, b)
+    if ra == rb:
+        return False
+    # the lower pk stays root, so components are named by their first network
+    if rb < ra:
+        ra, rb = rb, ra
+    parents[str(rb)] = ra
+    return True
+
+
+def component_roots(components, network_pks):
+    """The first of ``network_pks`` in each component of the ``components`` union-find, in order."""
+    parents = dict(components)
+    roots = []
+    seen = set()
+    for net_pk in network_pks:
+        root = _find(parents, net_pk)
+        if root not in seen:
+            seen.add(root)
+            roots.append(net_pk)
+    return roots
+
+
+def _inter_switch_edge(project_pk, a, b):
+    a, b = (a, b) if a < b else (b, a)
+    return GraphEdge(project_id=project_pk, kind=GraphEdge.KIND_INTER_SWITCH, network_id=a, peer_id=b)
+
+
+def mark_graph_stale(projects):
+    """Flag the persisted graphs of ``projects`` (pks or a queryset) for a rebuild on next load."""
+    ProjectGraph.objects.filter(project__in=projects).update(stale=True, version=F('version') + 1)
+
+
+def touch_graph_version(projects):
+    """Move the version of ``projects``' graphs for a change that only alters node or switch attributes."""
+    ProjectGraph.objects.filter(project__in=projects).update(version=F('version') + 1)
+
+
+@timed('graph_rebuild')
+@transaction.atomic
+def rebuild_project_graph(project):
+    """
+    Recompute ``project``'s edge rows and switch components from the ORM and
+    store them as a fresh, non-stale ``ProjectGraph``. Costs a full topology
+    load; only needed for a first load or after deletions.
+    """
+    topology = load_project_topology(project)
+    segment_networks = dict(ArpSegment.objects.filter(network__RelatedProject=project).values_list('pk', 'network_id'))
+
+    networks_of = {}
+    edges = []
+    parents = {}
+    for net_pk, node_pk in topology.attachments:
+        if node_pk not in topology.nodes:
+            continue
+        edges.append(GraphEdge(project=project, kind=GraphEdge.KIND_ATTACHED, network_id=net_pk, node_id=node_pk))
+        nets = networks_of.setdefault(node_pk, set())
+        for other in nets:
+            _union(parents, net_pk, other)
+        nets.add(net_pk)
+
+    switch_pairs = set()
+    for segment_pk, members in topology.segment_members.items():
+        net_pk = segment_networks.get(segment_pk)
+        for node_pk in members:
+            for other in networks_of.get(node_pk, ()):
+                if other != net_pk and net_pk is not None:
+                    switch_pairs.add((min(net_pk, other), max(net_pk, other)))
+    for a, b in sorted(switch_pairs):
+        edges.append(_inter_switch_edge(project.pk, a, b))
+        _union(parents, a, b)
+
+    GraphEdge.objects.filter(project=project).delete()
+    GraphEdge.objects.bulk_create(edges, batch_size=EDGE_BATCH_SIZE)
+    state, _ = ProjectGraph.objects.select_for_update().get_or_create(project=project)
+    state.components = parents
+    state.stale = False
+    state.version += 1
+    state.save()
+    return state
+
+
+def apply_network_delta(network, attached_pks, member_pks):
+    """
+    Fold one ingest batch into the persisted graph of ``network``'s project:
+    ``attached_pks`` are nodes newly attached to ``network``, ``member_pks``
+    nodes recorded as members of its ARP segments. Costs two queries per
+    chunk of those nodes plus the edge inserts, independent of the project size. A
+    project without a persisted graph, or with a stale one, is left for the
+    next load to rebuild. Must run inside the ingest transaction.
+    """
+    project_pk = network.RelatedProject_id
+    state = ProjectGraph.objects.select_for_update().filter(project_id=project_pk, stale=False).first()
+    if state is None:
+        return
+    attached_pks = set(attached_pks)
+    member_pks = set(member_pks)
+    changed = attached_pks | member_pks
+
+    edges = [GraphEdge(project_id=project_pk, kind=GraphEdge.KIND_ATTACHED, network_id=network.pk, node_id=pk)
+             for pk in attached_pks]
+    parents = state.components
+    bridged = set()
+    for chunk in _chunks(changed):
+        # other networks of this project the touched nodes are attached to
+        for node_pk, other in (_attached.objects
+                               .filter(node_id__in=chunk, networks__RelatedProject_id=project_pk)
+                               .exclude(networks_id=network.pk)
+                               .values_list('node_id', 'networks_id')):
+            _union(parents, network.pk, other)
+            if node_pk in member_pks:
+                bridged.add(other)
+    for chunk in _chunks(attached_pks):
+        # segments of other networks that already list the newly attached nodes
+        bridged.update(ArpSegmentMembership.objects
+                       .filter(node_id__in=chunk, segment__network__RelatedProject_id=project_pk)
+                       .exclude(segment__network_id=network.pk)
+                       .values_list('segment__network_id', flat=True))
+    for other in sorted(bridged):
+        _union(parents, network.pk, other)
+        edges.append(_inter_switch_edge(project_pk, network.pk, other))
+
+    GraphEdge.objects.bulk_create(edges, batch_size=EDGE_BATCH_SIZE, ignore_conflicts=True)
+    # the version also moves for attribute-only changes, such as a node's new IP
+    ProjectGraph.objects.filter(pk=state.pk).update(components=parents, version=F('version') + 1)
@@ -0,0 +1,13 @@
+import zlib
+
+# above this many nodes only switches are labelled; above it for switches too, nothing is
+DEFAULT_LABEL_LIMIT = 300
+
+SWITCH_COLOR = '#ffd166'
+DEVICE_PALETTE = ['#06a3ff', '#33d69f', '#ff6b6b', '#ffa94d', '#b197fc', '#f9c74f']
+
+
+def type_color(device_type):
+    # crc32 rather than hash(): str hashes differ between processes
+    t = (device_type or 'unknown').lower()
+    return DEVICE_PALETTE[zlib.crc32(t.encode('utf-8')) % len(DEVICE_PALETTE)]
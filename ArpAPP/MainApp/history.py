@@ -0,0 +1,131 @@
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Observation, Scan
+
+# Observations are run-length encoded per (network, node): a row covers the
+# consecutive scans first_scan..last_scan of its network in which the node had
+# the same IP. A scan that sees the pair again only moves last_scan/last_seen,
+# so history grows with the number of changes, not the number of scans.
+
+QUERY_CHUNK_SIZE = 900
+
+
+def _chunks(pks):
+    pks = sorted(pks)
+    for i in range(0, len(pks), QUERY_CHUNK_SIZE):
+        yield pks[i:i + QUERY_CHUNK_SIZE]
+
+
+def _insert_runs(scan, ip_by_node):
+    """
+    Insert one run starting and ending at ``scan`` per ``{node_pk: ip}`` with
+    a single executemany. bulk_create would build a model instance per row
+    and, on SQLite, split the rows into INSERTs of under 150 rows each; a
+    first scan of a large network writes a row for every node.
+    """
+    fields = {f.name: f for f in Observation._meta.concrete_fields if not f.primary_key}
+    qn = connection.ops.quote_name
+    sql = (f"INSERT INTO {qn(Observation._meta.db_table)} "
+           f"({', '.join(qn(f.column) for f in fields.values())}) "
+           f"VALUES ({', '.join(['%s'] * len(fields))})")
+    seen = fields['first_seen'].get_db_prep_value(scan.taken_at, connection)
+    ip_field = fields['ip']
+    constant = {'network': scan.network_id, 'first_scan': scan.pk, 'last_scan': scan.pk,
+                'first_seen': seen, 'last_seen': seen}
+    rows = []
+    for node_pk, ip in ip_by_node.items():
+        values = {**constant, 'node': node_pk, 'ip': ip_field.get_db_prep_value(ip, connection)}
+        rows.append([values[name] for name in fields])
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def start_scan(network, source='', taken_at=None):
+    """Create the next scan of ``network``, linked to its latest one."""
+    previous = Scan.objects.filter(network=network).order_by('-pk').first()
+    return Scan.objects.create(network=network, previous=previous, source=source,
+                               taken_at=taken_at or timezone.now())
+
+
+def record_observations(scan, ip_by_node):
+    """
+    Fold ``{node_pk: ip}`` seen in ``scan`` into the history of its network:
+    a node seen with the same IP in the previous scan extends that run, any
+    other node starts a new one. Several batches may record into one scan; a
+    node recorded again with another IP is corrected to the later IP. Costs
+    one lookup per chunk of nodes plus one UPDATE and one INSERT. Returns
+    ``(extended, started)``.
+    """
+    if not ip_by_node:
+        return 0, 0
+    last_scans = [scan.pk] if scan.previous_id is None else [scan.pk, scan.previous_id]
+    open_runs = {}
+    for chunk in _chunks(ip_by_node):
+        for run in (Observation.objects
+                    .filter(network_id=scan.network_id, node_id__in=chunk, last_scan_id__in=last_scans)
+                    .only('pk', 'node_id', 'ip', 'first_scan_id', 'last_scan_id')):
+            # a run already reaching this scan wins over the one ending at the previous scan
+            if run.node_id not in open_runs or run.last_scan_id == scan.pk:
+                open_runs[run.node_id] = run
+
+    extend = []
+    retract = []
+    relabel = []
+    new_runs = {}
+    for node_pk, ip in ip_by_node.items():
+        run = open_runs.get(node_pk)
+        if run is not None and run.ip == ip:
+            if run.last_scan_id != scan.pk:
+                extend.append(run.pk)
+            continue
+        if run is not None and run.last_scan_id == scan.pk:
+            # seen earlier in this scan with another IP; the later entry wins
+            if run.first_scan_id == scan.pk:
+                relabel.append((run.pk, ip))
+                continue
+            retract.append(run.pk)
+        new_runs[node_pk] = ip
+
+    for chunk in _chunks(extend):
+        Observation.objects.filter(pk__in=chunk).update(last_scan=scan, last_seen=scan.taken_at)
+    if retract:
+        previous = scan.previous
+        Observation.objects.filter(pk__in=retract).update(last_scan=previous, last_seen=previous.taken_at)
+    for pk, ip in relabel:
+        Observation.objects.filter(pk=pk).update(ip=ip)
+    if new_runs:
+        _insert_runs(scan, new_runs)
+    return len(extend), len(new_runs)
+
+
+def observed_in(scan):
+    """``(node_id, ip)`` rows of everything ``scan`` saw, as a queryset over the run index."""
+    return (Observation.objects
+            .filter(network_id=scan.network_id, last_scan_id__gte=scan.pk, first_scan_id__lte=scan.pk)
+            .values_list('node_id', 'ip'))
+
+
+def diff_scans(old, new):
+    """
+    What changed in a network between scans ``old`` and ``new``, as
+    ``{'added': [(node_pk, ip)], 'removed': [(node_pk, ip)], 'changed': [(node_pk, old_ip, new_ip)]}``.
+    Both sides are EXCEPT queries over the run index, so runs spanning both
+    scans, i.e. everything that did not change, are never fetched.
+    """
+    if old.network_id != new.network_id:
+        raise ValueError("scans of different networks cannot be compared")
+    # runs covering both scans are unchanged; excluding them first keeps the EXCEPT inputs small
+    spans_both = Q(first_scan_id__lte=min(old.pk, new.pk), last_scan_id__gte=max(old.pk, new.pk))
+    old_rows = observed_in(old).exclude(spans_both)
+    new_rows = observed_in(new).exclude(spans_both)
+    gone = dict(old_rows.difference(new_rows))
+    came = dict(new_rows.difference(old_rows))
+
+    changed = sorted((pk, gone[pk], came[pk]) for pk in gone.keys() & came.keys())
+    return {
+        'added': sorted((pk, ip) for pk, ip in came.items() if pk not in gone),
+        'removed': sorted((pk, ip) for pk, ip in gone.items() if pk not in came),
+        'changed': changed,
+    }
@@ -0,0 +1,216 @@
+import logging
+import time
+
+from MainApp.utils.oui import get_vendors_and_device_types
+from .addresses import ip_sort_key, mac_to_int, parse_ip
+from .counters import add_network_nodes
+from .dashboard import invalidate_project_summaries
+from .graph_store import apply_network_delta
+from .history import record_observations
+from .metrics import count_items, observe_stage, timed
+from .models import ArpSegment, ArpSegmentMembership, Node, Networks
+from .pg_ingest import copy_merge_enabled, copy_merge_nodes
+
+logger = logging.getLogger(__name__)
+
+# keeps every IN (...) list below SQLite's host parameter limit
+QUERY_CHUNK_SIZE = 900
+
+
+def _chunked(items, size=QUERY_CHUNK_SIZE):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _existing_nodes_by_mac(macs):
+    ints = {mac_to_int(mac): mac for mac in macs}
+    ints.pop(None, None)
+    existing = {}
+    for chunk in _chunked(ints):
+        for node in Node.objects.filter(MacInt__in=chunk):
+            existing[ints[node.MacInt]] = node
+    return existing
+
+
+def record_segment_members(network, members_by_interface):
+    """
+    Store ``{interface: node pks}`` as one membership row per (segment, node).
+    Segments are created on first sight; existing memberships are left alone.
+    Returns the number of segments touched.
+    """
+    members_by_interface = {iface: pks for iface, pks in members_by_interface.items() if iface and pks}
+    if not members_by_interface:
+        return 0
+
+    interfaces = list(members_by_interface)
+    segments = dict(
+        ArpSegment.objects.filter(network=network, interface__in=interfaces).values_list('interface', 'pk')
+    )
+    missing = [iface for iface in interfaces if iface not in segments]
+    if missing:
+        ArpSegment.objects.bulk_create(
+            [ArpSegment(network=network, interface=iface) for iface in missing],
+            ignore_conflicts=True,
+        )
+        segments.update(
+            ArpSegment.objects.filter(network=network, interface__in=missing).values_list('interface', 'pk')
+        )
+
+    ArpSegmentMembership.objects.bulk_create(
+        [
+            ArpSegmentMembership(segment_id=segments[iface], node_id=pk)
+            for iface, pks in members_by_interface.items()
+            for pk in set(pks)
+        ],
+        batch_size=QUERY_CHUNK_SIZE,
+        ignore_conflicts=True,
+    )
+    return len(segments)
+
+
+def _upsert_nodes(existing, latest_ip, vendor_types):
+    """
+    Create or update the nodes of ``{mac: ip}`` through the ORM, filling
+    ``existing`` (``{mac: node}``) with the new rows. Returns the created MACs.
+    """
+    to_create = []
+    to_update = []
+    update_fields = set()
+    for mac, ip in latest_ip.items():
+        vendor, guessed_type = vendor_types[mac]
+        node = existing.get(mac)
+        if node is None:
+            to_create.append(Node(MacAddress=mac, IpAddress=ip, IpSortKey=ip_sort_key(ip),
+                                  Vendor=vendor, Type=guessed_type))
+            continue
+
+        changed = []
+        if node.IpAddress != ip:
+            node.IpAddress = ip
+            node.IpSortKey = ip_sort_key(ip)
+            changed.extend(('IpAddress', 'IpSortKey'))
+        if vendor and node.Vendor != vendor:
+            node.Vendor = vendor
+            changed.append('Vendor')
+        if guessed_type and node.Type != guessed_type:
+            node.Type = guessed_type
+            changed.append('Type')
+        if changed:
+            to_update.append(node)
+            update_fields.update(changed)
+
+    if to_update:
+        Node.objects.bulk_update(to_update, sorted(update_fields), batch_size=QUERY_CHUNK_SIZE)
+
+    created_macs = {mac for mac in latest_ip if mac not in existing}
+    if to_create:
+        # a concurrent ingest may have inserted the same MAC meanwhile; its row is picked up below
+        Node.objects.bulk_create(to_create, batch_size=QUERY_CHUNK_SIZE, ignore_conflicts=True)
+        # re-read pks instead of relying on RETURNING support of the backend
+        existing.update(_existing_nodes_by_mac(created_macs))
+    return created_macs
+
+
+def bulk_ingest_entries(network, entries, diag, scan=None):
+    """
+    Write parsed (ip, mac, interface) entries for one network with a fixed
+    number of queries.
+
+    Entries are applied in paste order with the same rules as the old per-line
+    get_or_create path: the last IP seen for a MAC wins, vendor is only
+    overwritten by a known vendor, and each line gets a ``nodes_created`` record
+    when ``diag`` has that list. Counts are added to what ``diag`` already holds,
+    so one diag can collect several batches.
+    Hosts sharing an interface are recorded as members of that ARP segment,
+    and the new attachments and memberships are folded into the project's
+    persisted graph. With a ``scan``, every node's final IP is recorded in
+    the observation history of that scan. On PostgreSQL the nodes themselves
+    are written with COPY and one merge statement (see pg_ingest).
+    Entries whose MAC or IP cannot be stored as an address are skipped and
+    counted in ``entries_skipped_invalid``.
+    """
+    valid = []
+    mac_ints = {}
+    for ip, mac, interface in entries:
+        addr = parse_ip(ip)
+        mac_int = mac_to_int(mac)
+        if addr is None or mac_int is None:
+            continue
+        mac_ints[mac] = mac_int
+        valid.append((str(addr), mac, interface))
+    diag['entries_skipped_invalid'] = diag.get('entries_skipped_invalid', 0) + len(entries) - len(valid)
+    entries = valid
+    if not entries:
+        return []
+
+    latest_ip = {}
+    for ip, mac, _interface in entries:
+        latest_ip[mac] = ip
+
+    # db_write covers everything but the vendor lookup, which is its own stage
+    merge = copy_merge_enabled()
+    started = time.perf_counter()
+    existing = {} if merge else _existing_nodes_by_mac(latest_ip.keys())
+    read_seconds = time.perf_counter() - started
+    with timed('oui_lookup'):
+        by_int = get_vendors_and_device_types({mac_ints[mac] for mac in latest_ip})
+    vendor_types = {mac: by_int[mac_ints[mac]] for mac in latest_ip}
+    count_items('oui_lookup', len(latest_ip))
+    started = time.perf_counter()
+
+    if merge:
+        existing, created_macs = copy_merge_nodes(latest_ip, vendor_types)
+    else:
+        created_macs = _upsert_nodes(existing, latest_ip, vendor_types)
+    diag['nodes_new_count'] = diag.get('nodes_new_count', 0) + len(created_macs)
+
+    node_pks = [existing[mac].pk for mac in latest_ip]
+    through = Networks.Nodes.through
+    already_attached = set()
+    for chunk in _chunked(node_pks):
+        already_attached.update(
+            through.objects.filter(networks_id=network.pk, node_id__in=chunk)
+            .values_list('node_id', flat=True)
+        )
+    to_attach = [through(networks_id=network.pk, node_id=pk) for pk in node_pks if pk not in already_attached]
+    through.objects.bulk_create(to_attach, batch_size=QUERY_CHUNK_SIZE, ignore_conflicts=True)
+    # bulk_create skips m2m_changed, so the counters are moved here; reconcile_counters repairs races
+    add_network_nodes({network.pk: len(to_attach)})
+
+    records = diag.get('nodes_created')
+    seen = set()
+    nodes = []
+    members_by_interface = {}
+    for ip, mac, interface in entries:
+        node = existing[mac]
+        if interface:
+            members_by_interface.setdefault(interface, set()).add(node.pk)
+        first = mac not in seen
+        seen.add(mac)
+        attached = first and node.pk not in already_attached
+        if attached:
+            diag['nodes_attached_count'] = diag.get('nodes_attached_count', 0) + 1
+        if records is not None:
+            records.append({
+                'ip': ip,
+                'mac': mac,
+                'created': first and mac in created_macs,
+                'attached': attached,
+                'vendor': node.Vendor,
+                'type': node.Type,
+            })
+        if first:
+            nodes.append(node)
+
+    diag['segments_count'] = diag.get('segments_count', 0) + record_segment_members(network, members_by_interface)
+    apply_network_delta(network, [row.node_id for row in to_attach],
+                        {pk for pks in members_by_interface.values() for pk in pks})
+    if scan is not None:
+        extended, started_runs = record_observations(scan, {existing[mac].pk: ip for mac, ip in latest_ip.items()})
+        diag['observations_extended'] = diag.get('observations_extended', 0) + extended
+        diag['observations_started'] = diag.get('observations_started', 0) + started_runs
+    invalidate_project_summaries([network.RelatedProject_id])
+    observe_stage('db_write', read_seconds + time.perf_counter() - started)
+    count_items('db_write', len(entries))
+    return nodes
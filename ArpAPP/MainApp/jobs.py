@@ -0,0 +1,217 @@
+import hashlib
+import logging
+import multiprocessing
+import threading
+import uuid
+from datetime import timedelta
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .graph import graph_fingerprint, load_project_graph
+from .metrics import observe_stages, timed
+from .models import GraphImage, GraphRenderJob, ProjectGraph
+from .topology import GRAPH_BUILD_OPTIONS
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_dispatcher = None
+_process_pool = None
+
+
+def _worker_count():
+    return getattr(settings, 'GRAPH_RENDER_WORKERS', 2)
+
+
+def _job_timeout():
+    return timedelta(seconds=getattr(settings, 'GRAPH_JOB_TIMEOUT', 600))
+
+
+def expire_stale_jobs(project=None):
+    """
+    Fail jobs queued or running for longer than ``GRAPH_JOB_TIMEOUT``: their
+    worker was restarted or died, and nothing else would ever finish them.
+    """
+    now = timezone.now()
+    jobs = GraphRenderJob.objects.filter(status__in=GraphRenderJob.ACTIVE_STATUSES, created_at__lt=now - _job_timeout())
+    if project is not None:
+        jobs = jobs.filter(project=project)
+    return jobs.update(status=GraphRenderJob.STATUS_FAILED, error="Render timed out; its worker is gone.",
+                       finished_at=now)
+
+
+def _get_dispatcher():
+    global _dispatcher
+    with _lock:
+        if _dispatcher is None:
+            _dispatcher = ThreadPoolExecutor(max_workers=_worker_count(), thread_name_prefix='graph-render')
+        return _dispatcher
+
+
+def _get_process_pool():
+    global _process_pool
+    with _lock:
+        if _process_pool is None:
+            # spawn: forking a threaded server process that has matplotlib loaded is not safe
+            _process_pool = ProcessPoolExecutor(max_workers=_worker_count(),
+                                                mp_context=multiprocessing.get_context('spawn'))
+        return _process_pool
+
+
+def _reset_process_pool():
+    global _process_pool
+    with _lock:
+        pool, _process_pool = _process_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def render_options():
+    # part of the fingerprint, so a changed setting re-renders instead of reusing old images
+    options = {}
+    if hasattr(settings, 'GRAPH_LABEL_LIMIT'):
+        options['label_limit'] = settings.GRAPH_LABEL_LIMIT
+    return options
+
+
+def _fingerprint_options():
+    return {**GRAPH_BUILD_OPTIONS, **render_options()}
+
+
+def graph_key(version):
+    """What an image was drawn from, as far as a request can tell without loading the graph."""
+    options = hashlib.sha256(repr(sorted(_fingerprint_options().items())).encode('utf-8')).hexdigest()[:16]
+    return f"{version}:{options}"
+
+
+@timed('render')
+def _render(G):
+    from .rendering import render_project_graph_png, render_project_graph_png_timed
+
+    options = render_options()
+    if getattr(settings, 'GRAPH_RENDER_PROCESSES', True):
+        try:
+            image_data, stages = _get_process_pool().submit(render_project_graph_png_timed, G, **options).result()
+        except (BrokenProcessPool, OSError, NotImplementedError):
+            logger.warning("Graph render process pool unavailable, rendering in thread", exc_info=True)
+            _reset_process_pool()
+        else:
+            # layout ran in the worker; its timing only reaches /metrics from here
+            observe_stages(stages)
+            return image_data
+    return render_project_graph_png(G, **options)
+
+
+def _latest_image(project):
+    return GraphImage.objects.filter(project=project).order_by('-created_at').first()
+
+
+def _current_job(project):
+    """
+    The done job of the latest image when that image still shows the project's
+    graph version, or the done job that found the graph empty at that version.
+    """
+    state = ProjectGraph.objects.filter(project=project).values_list('version', 'stale').first()
+    if state is None or state[1]:
+        return None
+    key = graph_key(state[0])
+    latest = _latest_image(project)
+    if latest is None or latest.graph_key != key:
+        return (GraphRenderJob.objects.filter(project=project, status=GraphRenderJob.STATUS_DONE, graph=None,
+                                              graph_key=key)
+                .order_by('-pk').first())
+    job = (GraphRenderJob.objects.filter(graph=latest, status=GraphRenderJob.STATUS_DONE)
+           .select_related('graph').order_by('-pk').first())
+    if job is None:
+        now = timezone.now()
+        job = GraphRenderJob.objects.create(project=project, status=GraphRenderJob.STATUS_DONE, graph=latest,
+                                            started_at=now, finished_at=now)
+    return job
+
+
+def enqueue_graph_render(project):
+    """
+    Queue a graph render for ``project`` and return ``(job, created)``.
+
+    When the project's latest image was drawn at the current graph version,
+    the done job that produced it is returned; the request never loads the
+    graph itself, the worker compares full fingerprints. While a job for the
+    project is queued or running in any server process, that job is returned
+    instead of starting another one: the database allows one active job per
+    project.
+    """
+    expire_stale_jobs(project)
+    job = _current_job(project)
+    if job is not None:
+        return job, False
+
+    active = GraphRenderJob.objects.filter(project=project, status__in=GraphRenderJob.ACTIVE_STATUSES)
+    job = active.first()
+    if job is not None:
+        return job, False
+    try:
+        with transaction.atomic():
+            job = GraphRenderJob.objects.create(project=project)
+    except IntegrityError:
+        # another worker queued one between the lookup and the insert
+        job = active.first()
+        if job is None:
+            raise
+        return job, False
+
+    transaction.on_commit(lambda: _get_dispatcher().submit(_run_job, job.pk, project.pk))
+    return job, True
+
+
+def _run_job(job_pk, project_pk):
+    close_old_connections()
+    try:
+        job = GraphRenderJob.objects.select_related('project').get(pk=job_pk)
+        started = (GraphRenderJob.objects.filter(pk=job_pk, status=GraphRenderJob.STATUS_QUEUED)
+                   .update(status=GraphRenderJob.STATUS_RUNNING, started_at=timezone.now()))
+        if not started:
+            # expired while it waited for a worker
+            return
+
+        # fingerprint what is actually drawn; an ingest may have landed since the job was queued
+        G, diag = load_project_graph(job.project)
+        fingerprint = graph_fingerprint(G, _fingerprint_options())
+        key = graph_key(diag['version'])
+        graph_obj = _latest_image(job.project)
+        if graph_obj is not None and graph_obj.fingerprint == fingerprint:
+            # same drawing at a newer version: let the next request short-cut on the key
+            if graph_obj.graph_key != key:
+                GraphImage.objects.filter(pk=graph_obj.pk).update(graph_key=key)
+            GraphRenderJob.objects.filter(pk=job_pk).update(status=GraphRenderJob.STATUS_DONE, graph=graph_obj,
+                                                            finished_at=timezone.now())
+            return
+
+        if G.number_of_nodes() == 0:
+            # nothing to draw, and the previous image no longer shows the project; the key
+            # on the job lets requests at this version reuse it instead of queueing again
+            logger.info("Graph job %s: no nodes for project %s", job_pk, project_pk)
+            GraphRenderJob.objects.filter(pk=job_pk).update(status=GraphRenderJob.STATUS_DONE, graph=None,
+                                                            graph_key=key, finished_at=timezone.now())
+            return
+
+        image_data = _render(G)
+        filename = f"{uuid.uuid4().hex}.png"
+        with timed('save'):
+            graph_obj = GraphImage.objects.create(project=job.project, fingerprint=fingerprint, graph_key=key)
+            graph_obj.image.save(filename, ContentFile(image_data, name=filename), save=True)
+        logger.info("Generated star-style graph for project %s: nodes=%d, diag=%s",
+                    project_pk, G.number_of_nodes(), diag)
+
+        GraphRenderJob.objects.filter(pk=job_pk).update(status=GraphRenderJob.STATUS_DONE, graph=graph_obj,
+                                                        finished_at=timezone.now())
+    except Exception as e:
+        logger.exception("Graph job %s for project %s failed", job_pk, project_pk)
+        GraphRenderJob.objects.filter(pk=job_pk).update(status=GraphRenderJob.STATUS_FAILED, error=str(e),
+                                                        finished_at=timezone.now())
+    finally:
+        connection.close()
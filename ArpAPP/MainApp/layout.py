@@ -0,0 +1,123 @@
+import math
+from typing import Dict, List, NamedTuple
+
+import networkx as nx
+import numpy as np
+
+from .metrics import timed
+
+LAYOUT_SEED = 42
+# groups up to this size sit on a ring around their switch, larger ones on a sunflower spiral
+RING_MAX_MEMBERS = 48
+RING_BASE_RADIUS = 0.5
+RING_STEP = 0.15
+SPIRAL_SPACING = 0.3
+GOLDEN_ANGLE = math.pi * (3.0 - math.sqrt(5.0))
+
+
+class GraphLayout(NamedTuple):
+    # node ids in row order of ``xy``
+    nodes: List
+    # node id -> row in ``xy``
+    index: Dict
+    # (n, 2) float array of positions
+    xy: np.ndarray
+    # (n,) bool array, True for switch rows
+    is_switch: np.ndarray
+
+    def as_dict(self):
+        return dict(zip(self.nodes, map(tuple, self.xy.tolist())))
+
+
+def _group_offsets(rank, size):
+    """Offsets of each member around its switch, computed for all members at once."""
+    rank = rank.astype(np.float64)
+    size = size.astype(np.float64)
+    ring = size <= RING_MAX_MEMBERS
+
+    radius = np.where(
+        ring,
+        RING_BASE_RADIUS + RING_STEP * np.maximum(0.0, size - 1.0),
+        RING_BASE_RADIUS + SPIRAL_SPACING * np.sqrt(rank + 1.0),
+    )
+    angle = np.where(ring, 2.0 * np.pi * rank / np.maximum(1.0, size), rank * GOLDEN_ANGLE)
+    return np.column_stack((radius * np.cos(angle), radius * np.sin(angle))), radius
+
+
+def _switch_positions(G, switches, seed):
+    if not switches:
+        return np.zeros((0, 2))
+    if len(switches) == 1:
+        return np.zeros((1, 2))
+    pos = nx.spring_layout(G.subgraph(switches), seed=seed, k=1.0)
+    return np.array([pos[sw] for sw in switches], dtype=np.float64)
+
+
+@timed('layout')
+def compute_layout(G, seed: int = LAYOUT_SEED) -> GraphLayout:
+    """
+    Star layout for a graph from load_project_graph: switches are placed by a
+    seeded spring layout, every device around the switch it is attached to,
+    and devices without a switch on a spiral beside the picture. Apart from the
+    small switch-only spring layout, all positions come from array operations,
+    and the same graph and seed always give the same result.
+    """
+    nodes = list(G.nodes)
+    index = {n: i for i, n in enumerate(nodes)}
+    is_switch = np.fromiter((bool(G.nodes[n].get('is_switch')) for n in nodes), dtype=bool, count=len(nodes))
+    xy = np.zeros((len(nodes), 2), dtype=np.float64)
+
+    switches = [n for n, flag in zip(nodes, is_switch) if flag]
+    switch_xy = _switch_positions(G, switches, seed)
+
+    # owner switch of every device: the last switch (in graph order) it hangs off
+    owner = {}
+    for s_idx, sw in enumerate(switches):
+        for nbr in G.neighbors(sw):
+            if not G.nodes[nbr].get('is_switch'):
+                owner[nbr] = s_idx
+
+    devices = np.fromiter((index[d] for d in owner), dtype=np.int64, count=len(owner))
+    owners = np.fromiter(owner.values(), dtype=np.int64, count=len(owner))
+
+    if len(devices):
+        order = np.argsort(owners, kind='stable')
+        devices, owners = devices[order], owners[order]
+        sizes = np.bincount(owners, minlength=len(switches))
+        starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        rank = np.arange(len(owners)) - starts[owners]
+        offsets, radius = _group_offsets(rank, sizes[owners])
+
+        # spread switches so that neighbouring device groups do not overlap
+        group_radius = np.zeros(len(switches))
+        np.maximum.at(group_radius, owners, radius)
+        switch_xy = switch_xy * max(1.0, 2.0 * float(group_radius.max()))
+        xy[devices] = switch_xy[owners] + offsets
+
+    if switches:
+        xy[[index[sw] for sw in switches]] = switch_xy
+
+    placed = np.zeros(len(nodes), dtype=bool)
+    placed[devices] = True
+    placed[is_switch] = True
+    loose = np.flatnonzero(~placed)
+    if len(loose):
+        right = float(xy[placed, 0].max()) + 1.0 if placed.any() else 0.0
+        k = np.arange(len(loose), dtype=np.float64)
+        r = SPIRAL_SPACING * np.sqrt(k + 1.0)
+        xy[loose, 0] = right + r.max() + r * np.cos(k * GOLDEN_ANGLE)
+        xy[loose, 1] = r * np.sin(k * GOLDEN_ANGLE)
+
+    return GraphLayout(nodes, index, xy, is_switch)
+
+
+def partition_edges(G, index):
+    """Split edges by kind in one pass: ``{kind: (u_rows, v_rows)}`` as int arrays."""
+    rows = {}
+    for u, v, kind in G.edges(data='kind'):
+        pair = rows.get(kind)
+        if pair is None:
+            pair = rows[kind] = ([], [])
+        pair[0].append(index[u])
+        pair[1].append(index[v])
+    return {kind: (np.asarray(us, dtype=np.int64), np.asarray(vs, dtype=np.int64)) for kind, (us, vs) in rows.items()}
@@ -0,0 +1,60 @@
+from django.db.models import Q
+
+from .addresses import IP_SORT_KEY_LENGTH, int_to_mac, mac_prefix_range, network_key_range
+
+NODE_PAGE_SIZE = 100
+NODE_PAGE_MAX = 1000
+
+_HEX_DIGITS = frozenset('0123456789abcdef')
+
+
+def encode_cursor(node):
+    """Opaque keyset cursor ``<IpSortKey>.<pk>`` pointing just past ``node``."""
+    return f"{node.IpSortKey}.{node.pk}"
+
+
+def decode_cursor(cursor):
+    key, sep, pk = (cursor or '').rpartition('.')
+    if not sep or not pk.isdigit() or len(key) > IP_SORT_KEY_LENGTH or not _HEX_DIGITS.issuperset(key):
+        return None
+    return key, int(pk)
+
+
+def filter_nodes(nodes, vendor='', type='', mac='', cidr=''):
+    """Apply the node list filters; MAC prefix and subnet become index range scans."""
+    if vendor:
+        nodes = nodes.filter(Vendor__icontains=vendor)
+    if type:
+        nodes = nodes.filter(Type__iexact=type)
+    if mac:
+        nodes = nodes.filter(MacInt__range=mac_prefix_range(mac))
+    if cidr:
+        nodes = nodes.filter(IpSortKey__range=network_key_range(cidr))
+    return nodes
+
+
+def node_page(nodes, after='', limit=NODE_PAGE_SIZE):
+    """
+    One page of ``nodes`` in (IpSortKey, pk) order starting after the
+    ``after`` cursor. Returns ``(nodes, next_cursor)``; the cursor is None on
+    the last page. Each page costs one query with a LIMIT, however deep it is.
+    """
+    position = decode_cursor(after) if after else None
+    if position is not None:
+        key, pk = position
+        nodes = nodes.filter(Q(IpSortKey__gt=key) | Q(IpSortKey=key, pk__gt=pk))
+    page = list(nodes.order_by('IpSortKey', 'pk')[:limit + 1])
+    if len(page) > limit:
+        page = page[:limit]
+        return page, encode_cursor(page[-1])
+    return page, None
+
+
+def node_payload(node):
+    return {
+        'id': node.pk,
+        'ip': node.IpAddress,
+        'mac': int_to_mac(node.MacInt),
+        'vendor': node.Vendor,
+        'type': node.Type,
+    }
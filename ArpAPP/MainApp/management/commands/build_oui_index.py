@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from MainApp.utils.oui import OuiIndex, build_oui_index
+
+
+class Command(BaseCommand):
+    help = "Compile the MAC vendor CSV into the memory-mapped OUI index used for vendor lookups."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--csv', dest='csv_path', default=None,
+                            help="Vendor CSV to compile (defaults to the bundled export).")
+        parser.add_argument('--output', dest='index_path', default=None,
+                            help="Index file to write (defaults to <csv>.idx).")
+
+    def handle(self, *args, csv_path=None, index_path=None, **options):
+        started = time.perf_counter()
+        path = build_oui_index(csv_path, index_path)
+        elapsed = time.perf_counter() - started
+        with open(path, 'rb') as fh:
+            prefixes = len(OuiIndex(fh.read()))
+        self.stdout.write(self.style.SUCCESS(f"Wrote {path}: {prefixes} prefixes in {elapsed:.2f}s"))
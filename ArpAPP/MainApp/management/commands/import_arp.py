@@ -0,0 +1,69 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from MainApp.backfill import BACKFILL_BATCH_SIZE, import_sources
+from MainApp.models import Networks, Project
+from MainApp.uploads import resolve_network_tags
+
+
+class Command(BaseCommand):
+    help = ("Back-fill archived ARP dumps from files, directories or tarballs: parse them in a process pool "
+            "and write them through a single batching writer.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help="Dump files, directories or tarballs to import.")
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('--network', dest='network_id', type=int,
+                            help="Import every dump into this network.")
+        target.add_argument('--project', dest='project_id', type=int,
+                            help="Dumps are split by '@network <id or name>' lines into this project's networks.")
+        parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+                            help="Parser processes (defaults to the CPU count; 1 parses in-process).")
+        parser.add_argument('--batch-size', dest='batch_size', type=int, default=BACKFILL_BATCH_SIZE,
+                            help=f"Entries per commit (default {BACKFILL_BATCH_SIZE}).")
+        parser.add_argument('--resume', dest='resume_path', default=None,
+                            help="State file: sources listed there are skipped, committed sources are appended.")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Parse and count only; nothing is written.")
+
+    def handle(self, *args, paths=(), network_id=None, project_id=None, jobs=1, batch_size=BACKFILL_BATCH_SIZE,
+               resume_path=None, dry_run=False, verbosity=1, **options):
+        for path in paths:
+            if not os.path.exists(path):
+                raise CommandError(f"{path} does not exist")
+
+        if network_id is not None:
+            network = Networks.objects.filter(pk=network_id).first()
+            if network is None:
+                raise CommandError(f"Network {network_id} does not exist")
+
+            def resolve(tag):
+                return network
+        else:
+            project = Project.objects.filter(pk=project_id).first()
+            if project is None:
+                raise CommandError(f"Project {project_id} does not exist")
+            networks = resolve_network_tags(project)
+            resolve = networks.get
+
+        def progress(name, tables):
+            if verbosity >= 2:
+                counts = {key: sum(table[key] for table in tables)
+                          for key in ('lines_total', 'parsed_entries_count', 'entries_skipped_broadcast')}
+                self.stdout.write(f"{name}: {len(tables)} tables, {counts['lines_total']} lines, "
+                                  f"{counts['parsed_entries_count']} entries "
+                                  f"({counts['entries_skipped_broadcast']} broadcast skipped)")
+
+        totals = import_sources(paths, resolve, tagged=project_id is not None, jobs=max(jobs, 1),
+                                batch_size=batch_size, dry_run=dry_run, resume_path=resume_path, progress=progress)
+
+        for error in totals['errors']:
+            self.stderr.write(error)
+        mode = "Parsed (dry run)" if dry_run else "Imported"
+        self.stdout.write(self.style.SUCCESS(
+            f"{mode} {totals['sources']} sources ({totals['sources_already_done']} already done) in "
+            f"{totals['elapsed_s']:.2f}s: {totals['lines_total']} lines, {totals['rows_written']} rows, "
+            f"{totals['batches_committed']} batches; "
+            f"{totals['lines_per_s']:.0f} lines/s, {totals['rows_per_s']:.0f} rows/s"
+        ))
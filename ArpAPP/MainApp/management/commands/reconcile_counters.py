@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from MainApp.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = "Recount the project and network node/network counters and repair any that drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', dest='project_ids', type=int, action='append', default=None,
+                            help="Only reconcile this project (repeatable); all projects by default.")
+
+    def handle(self, *args, project_ids=None, **options):
+        started = time.perf_counter()
+        networks_fixed, projects_fixed = reconcile_counters(project_ids)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Reconciled counters in {elapsed:.2f}s: {networks_fixed} networks and {projects_fixed} projects fixed"
+        ))
@@ -0,0 +1,179 @@
+import itertools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Values live in the memory of the process that recorded them, so each server
+# worker exposes its own series. Work done in a helper process (the graph
+# render pool) is timed there under collect_stages() and replayed by the
+# parent with observe_stages().
+
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _label_text(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in (*zip(names, values), *extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_label_text(self.labelnames, key)} {_number(value)}"
+
+
+class Histogram:
+    """Fixed-bucket histogram; ``observe`` is one bisect and one increment under a lock."""
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets=SECONDS_BUCKETS, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        # labels -> [per-bucket counts (last one is +Inf), sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][slot] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            series = sorted((key, (list(counts), total, n)) for key, (counts, total, n) in self._series.items())
+        for key, (counts, total, n) in series:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                le = bound if bound == '+Inf' else _number(float(bound))
+                yield f"{self.name}_bucket{_label_text(self.labelnames, key, [('le', le)])} {cumulative}"
+            yield f"{self.name}_sum{_label_text(self.labelnames, key)} {_number(float(total))}"
+            yield f"{self.name}_count{_label_text(self.labelnames, key)} {n}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, help_text, labelnames=()):
+        metric = Counter(name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, buckets=SECONDS_BUCKETS, labelnames=()):
+        metric = Histogram(name, help_text, buckets, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format (0.0.4)."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'arp_stage_seconds', "Time spent in each pipeline stage.", labelnames=('stage',))
+STAGE_ITEMS = REGISTRY.counter(
+    'arp_stage_items_total', "Items handled per pipeline stage (lines parsed, MACs looked up, rows written).",
+    labelnames=('stage',))
+REQUEST_SECONDS = REGISTRY.histogram(
+    'arp_request_seconds', "Request latency per view.", labelnames=('view', 'method'))
+REQUEST_QUERIES = REGISTRY.histogram(
+    'arp_request_queries', "SQL queries issued per request.", QUERY_BUCKETS, labelnames=('view', 'method'))
+REQUESTS = REGISTRY.counter(
+    'arp_requests_total', "Requests served per view and status code.", labelnames=('view', 'method', 'status'))
+
+
+_collecting = threading.local()
+
+
+@contextmanager
+def collect_stages():
+    """Also gather every stage timing recorded by this thread in the block, as a list of ``(stage, seconds)``."""
+    outer = getattr(_collecting, 'stages', None)
+    stages = _collecting.stages = []
+    try:
+        yield stages
+    finally:
+        _collecting.stages = outer
+        if outer is not None:
+            outer.extend(stages)
+
+
+@contextmanager
+def timed(stage):
+    """Record the duration of the block in ``arp_stage_seconds{stage=...}``, also when it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
+
+
+def observe_stage(stage, seconds):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    stages = getattr(_collecting, 'stages', None)
+    if stages is not None:
+        stages.append((stage, seconds))
+
+
+def observe_stages(stages):
+    """Record ``(stage, seconds)`` pairs gathered by collect_stages() in another process."""
+    for stage, seconds in stages:
+        observe_stage(stage, seconds)
+
+
+def count_items(stage, amount):
+    if amount:
+        STAGE_ITEMS.inc(amount, stage=stage)
+
+
+class Sampler:
+    """``sample()`` is true once every ``every`` calls, starting with the first."""
+
+    def __init__(self, every):
+        self.every = max(int(every), 1)
+        self._calls = itertools.count()
+
+    def sample(self):
+        return next(self._calls) % self.every == 0
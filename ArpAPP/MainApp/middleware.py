@@ -0,0 +1,39 @@
+import time
+
+from django.db import connections
+
+from .metrics import REQUEST_QUERIES, REQUEST_SECONDS, REQUESTS
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class RequestMetricsMiddleware:
+    """
+    Aggregate latency, SQL query count and status of every request into the
+    histograms served by the metrics view. Queries are counted with an
+    execute wrapper, which works with DEBUG off.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = _QueryCounter()
+        started = time.perf_counter()
+        with connections['default'].execute_wrapper(counter):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match is not None and match.view_name else 'unresolved'
+        REQUEST_SECONDS.observe(elapsed, view=view, method=request.method)
+        REQUEST_QUERIES.observe(counter.count, view=view, method=request.method)
+        REQUESTS.inc(view=view, method=request.method, status=response.status_code)
+        return response
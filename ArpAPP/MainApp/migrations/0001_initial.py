@@ -0,0 +1,118 @@
+# Generated by Django 5.2.18 on 2026-10-17 16:00
+
+import MainApp.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GraphImage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.ImageField(upload_to=MainApp.models.graph_image_upload_path)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('fingerprint', models.CharField(blank=True, db_index=True, default='', max_length=64)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Networks',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('NetworkName', models.TextField(blank=True, null=True)),
+                ('NetworkMask', models.TextField(blank=True, null=True)),
+                ('NumberOfNodes', models.IntegerField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArpSegment',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('interface', models.TextField()),
+                ('network', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='segments', to='MainApp.networks')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Node',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('MacAddress', models.TextField(blank=True, null=True)),
+                ('IpAddress', models.TextField()),
+                ('Vendor', models.TextField(blank=True, null=True)),
+                ('Type', models.TextField(blank=True, null=True)),
+                ('observable_nodes', models.ManyToManyField(blank=True, related_name='observed_by', to='MainApp.node')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='networks',
+            name='Nodes',
+            field=models.ManyToManyField(blank=True, to='MainApp.node'),
+        ),
+        migrations.CreateModel(
+            name='ArpSegmentMembership',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('segment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='MainApp.arpsegment')),
+                ('node', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='segment_memberships', to='MainApp.node')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='arpsegment',
+            name='members',
+            field=models.ManyToManyField(related_name='arp_segments', through='MainApp.ArpSegmentMembership', to='MainApp.node'),
+        ),
+        migrations.CreateModel(
+            name='Project',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('Name', models.TextField(blank=True, null=True)),
+                ('NumberOfNetworks', models.IntegerField(blank=True, null=True)),
+                ('NumberOfNodes', models.IntegerField(blank=True, null=True)),
+                ('Networks', models.ManyToManyField(blank=True, to='MainApp.networks')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='networks',
+            name='RelatedProject',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='networks', to='MainApp.project'),
+        ),
+        migrations.CreateModel(
+            name='GraphRenderJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=16)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('graph', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to='MainApp.graphimage')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='graph_jobs', to='MainApp.project')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='graphimage',
+            name='project',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='graphs', to='MainApp.project'),
+        ),
+        migrations.AddConstraint(
+            model_name='arpsegmentmembership',
+            constraint=models.UniqueConstraint(fields=('segment', 'node'), name='unique_segment_member'),
+        ),
+        migrations.AddConstraint(
+            model_name='arpsegment',
+            constraint=models.UniqueConstraint(fields=('network', 'interface'), name='unique_segment_per_network_interface'),
+        ),
+    ]
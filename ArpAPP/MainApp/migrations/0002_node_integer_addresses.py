@@ -0,0 +1,168 @@
+import ipaddress
+import logging
+import re
+
+from django.db import migrations, models
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 900
+
+# Frozen copies of the MainApp.addresses helpers this migration needs, so a
+# later change there cannot change what the migration does.
+
+_MAC_HEX = re.compile(r'[0-9a-f]')
+
+
+def _mac_to_int(mac):
+    digits = ''.join(_MAC_HEX.findall((mac or '').strip().lower()))
+    return int(digits, 16) if len(digits) == 12 else None
+
+
+def _int_to_mac(value):
+    digits = f'{value:012x}'
+    return ':'.join(digits[i:i + 2] for i in range(0, 12, 2))
+
+
+def _parse_ip(ip):
+    try:
+        return ipaddress.ip_address((ip or '').strip())
+    except ValueError:
+        return None
+
+
+def _ip_sort_key(addr):
+    # IPv4 keyed as ::ffff:a.b.c.d, 32 hex digits
+    value = (0xFFFF << 32 | int(addr)) if addr.version == 4 else int(addr)
+    return f'{value:032x}'
+
+
+def _merge_duplicates(apps, keep_pk, duplicate_pks):
+    """Move every relation of ``duplicate_pks`` onto ``keep_pk``, then drop the duplicates."""
+    Node = apps.get_model('MainApp', 'Node')
+    Networks = apps.get_model('MainApp', 'Networks')
+    ArpSegmentMembership = apps.get_model('MainApp', 'ArpSegmentMembership')
+
+    attached = Networks.Nodes.through
+    for net_pk in set(attached.objects.filter(node_id__in=duplicate_pks).values_list('networks_id', flat=True)):
+        attached.objects.get_or_create(networks_id=net_pk, node_id=keep_pk)
+
+    for segment_pk in set(ArpSegmentMembership.objects.filter(node_id__in=duplicate_pks)
+                          .values_list('segment_id', flat=True)):
+        ArpSegmentMembership.objects.get_or_create(segment_id=segment_pk, node_id=keep_pk)
+
+    observable = Node.observable_nodes.through
+    for a, b in observable.objects.filter(from_node_id__in=duplicate_pks).values_list('from_node_id', 'to_node_id'):
+        if b != keep_pk:
+            observable.objects.get_or_create(from_node_id=keep_pk, to_node_id=b)
+    for a, b in observable.objects.filter(to_node_id__in=duplicate_pks).values_list('from_node_id', 'to_node_id'):
+        if a != keep_pk:
+            observable.objects.get_or_create(from_node_id=a, to_node_id=keep_pk)
+
+    Node.objects.filter(pk__in=duplicate_pks).delete()
+
+
+def text_to_integer_addresses(apps, schema_editor):
+    """
+    Convert every node's MAC text to MacInt and canonicalize its IP. Text that
+    is not a MAC or an IP cannot survive the new columns: the MAC is dropped
+    and the IP set to NULL (PostgreSQL would refuse the cast to inet), and
+    each such node is logged with its old value.
+    """
+    Node = apps.get_model('MainApp', 'Node')
+
+    first_by_mac = {}
+    duplicates = {}
+    batch = []
+    dropped_macs = dropped_ips = 0
+    for node in Node.objects.order_by('pk').only('pk', 'MacAddress', 'IpAddress').iterator(chunk_size=BATCH_SIZE):
+        mac_int = _mac_to_int(node.MacAddress)
+        if mac_int is not None:
+            keep_pk = first_by_mac.setdefault(mac_int, node.pk)
+            if keep_pk != node.pk:
+                # the oldest row for a MAC wins, as with the old get_or_create lookups
+                duplicates.setdefault(keep_pk, []).append(node.pk)
+                continue
+        elif node.MacAddress:
+            dropped_macs += 1
+            logger.warning("Node %s: MAC %r is not a 48-bit address and is dropped", node.pk, node.MacAddress)
+        addr = _parse_ip(node.IpAddress)
+        if addr is None:
+            dropped_ips += 1
+            logger.warning("Node %s: IP %r is not an address and is set to NULL", node.pk, node.IpAddress)
+        node.MacInt = mac_int
+        node.IpAddress = str(addr) if addr is not None else None
+        node.IpSortKey = _ip_sort_key(addr) if addr is not None else ''
+        batch.append(node)
+        if len(batch) >= BATCH_SIZE:
+            Node.objects.bulk_update(batch, ['MacInt', 'IpAddress', 'IpSortKey'])
+            batch = []
+    if batch:
+        Node.objects.bulk_update(batch, ['MacInt', 'IpAddress', 'IpSortKey'])
+
+    for keep_pk, duplicate_pks in duplicates.items():
+        _merge_duplicates(apps, keep_pk, duplicate_pks)
+    if dropped_macs or dropped_ips or duplicates:
+        logger.warning("Node address migration: %d unparsable MACs dropped, %d invalid IPs set to NULL, "
+                       "%d duplicate nodes merged", dropped_macs, dropped_ips,
+                       sum(len(pks) for pks in duplicates.values()))
+
+
+def integer_to_text_addresses(apps, schema_editor):
+    Node = apps.get_model('MainApp', 'Node')
+    batch = []
+    for node in Node.objects.exclude(MacInt=None).only('pk', 'MacInt').iterator(chunk_size=BATCH_SIZE):
+        node.MacAddress = _int_to_mac(node.MacInt)
+        batch.append(node)
+        if len(batch) >= BATCH_SIZE:
+            Node.objects.bulk_update(batch, ['MacAddress'])
+            batch = []
+    if batch:
+        Node.objects.bulk_update(batch, ['MacAddress'])
+    Node.objects.filter(IpAddress=None).update(IpAddress='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MainApp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='node',
+            name='MacInt',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='node',
+            name='IpSortKey',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        # nullable while the data is converted, so invalid IPs can be cleared before the cast
+        migrations.AlterField(
+            model_name='node',
+            name='IpAddress',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.RunPython(text_to_integer_addresses, integer_to_text_addresses),
+        migrations.RemoveField(
+            model_name='node',
+            name='MacAddress',
+        ),
+        migrations.AlterField(
+            model_name='node',
+            name='MacInt',
+            field=models.PositiveBigIntegerField(blank=True, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='node',
+            name='IpSortKey',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=32),
+        ),
+        migrations.AlterField(
+            model_name='node',
+            name='IpAddress',
+            field=models.GenericIPAddressField(blank=True, db_index=True, null=True),
+        ),
+    ]
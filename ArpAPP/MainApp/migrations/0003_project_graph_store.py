@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MainApp', '0002_node_integer_addresses'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectGraph',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('stale', models.BooleanField(default=False)),
+                ('components', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='graph_state', to='MainApp.project')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='GraphEdge',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('attached', 'Attached'), ('inter_switch', 'Inter-switch')], max_length=16)),
+                ('network', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='graph_edges', to='MainApp.networks')),
+                ('node', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='graph_edges', to='MainApp.node')),
+                ('peer', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='MainApp.networks')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='graph_edges', to='MainApp.project')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['project', 'kind'], name='graph_edge_project_kind')],
+                'constraints': [models.UniqueConstraint(fields=('network', 'node'), name='unique_attached_edge'), models.UniqueConstraint(fields=('network', 'peer'), name='unique_inter_switch_edge')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MainApp', '0003_project_graph_store'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Scan',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(blank=True, default='', max_length=32)),
+                ('taken_at', models.DateTimeField(db_index=True)),
+                ('network', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scans', to='MainApp.networks')),
+                ('previous', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='MainApp.scan')),
+            ],
+            options={
+                'ordering': ['-pk'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Observation',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ip', models.GenericIPAddressField()),
+                ('first_seen', models.DateTimeField()),
+                ('last_seen', models.DateTimeField()),
+                ('network', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='observations', to='MainApp.networks')),
+                ('node', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='observations', to='MainApp.node')),
+                ('first_scan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='MainApp.scan')),
+                ('last_scan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='MainApp.scan')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['network', 'last_scan', 'first_scan'], name='observation_network_span'), models.Index(fields=['node', 'last_scan'], name='observation_node_last_scan')],
+            },
+        ),
+    ]
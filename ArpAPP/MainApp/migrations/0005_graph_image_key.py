@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MainApp', '0004_observation_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='graphimage',
+            name='graph_key',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
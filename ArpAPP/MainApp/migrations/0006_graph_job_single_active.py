@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:35
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fail_duplicate_active_jobs(apps, schema_editor):
+    """Keep the newest queued/running job per project; the older ones could only ever be polled forever."""
+    GraphRenderJob = apps.get_model('MainApp', 'GraphRenderJob')
+    seen = set()
+    duplicates = []
+    for pk, project_pk in (GraphRenderJob.objects.filter(status__in=('queued', 'running'))
+                           .order_by('-created_at', '-pk').values_list('pk', 'project_id')):
+        if project_pk in seen:
+            duplicates.append(pk)
+        seen.add(project_pk)
+    GraphRenderJob.objects.filter(pk__in=duplicates).update(
+        status='failed', error="Superseded by a newer render of the project.", finished_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MainApp', '0005_graph_image_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(fail_duplicate_active_jobs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='graphrenderjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ('queued', 'running'))), fields=('project',), name='graph_job_one_active_per_project'),
+        ),
+    ]
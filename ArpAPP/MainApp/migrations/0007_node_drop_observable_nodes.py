@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:54
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MainApp', '0006_graph_job_single_active'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='node',
+            name='observable_nodes',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MainApp', '0007_node_drop_observable_nodes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='graphrenderjob',
+            name='graph_key',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -2,6 +2,8 @@ from django.db import models
 import uuid
 import os
 
+from .addresses import IP_SORT_KEY_LENGTH, int_to_mac, ip_sort_key, mac_to_int
+
 
 class Project(models.Model):
     Name = models.TextField(blank=True, null=True)
@@ -19,17 +21,126 @@ class Networks(models.Model):
 
 
 class Node(models.Model):
-    MacAddress = models.TextField(blank=True, null=True)
-    IpAddress = models.TextField()
+    # 48-bit MAC as an integer; MacAddress is its text form
+    MacInt = models.PositiveBigIntegerField(unique=True, blank=True, null=True)
+    IpAddress = models.GenericIPAddressField(blank=True, null=True, db_index=True)
+    # ip_sort_key(IpAddress); bulk writers that skip save() must set it themselves
+    IpSortKey = models.CharField(max_length=IP_SORT_KEY_LENGTH, blank=True, default='', db_index=True)
     Vendor = models.TextField(blank=True, null=True)
     Type = models.TextField(blank=True, null=True)
-    observable_nodes = models.ManyToManyField(
-        'self',
-        symmetrical=False,
-        blank=True,
-        related_name='observed_by'
-    )
 
+    @property
+    def MacAddress(self):
+        return int_to_mac(self.MacInt)
+
+    @MacAddress.setter
+    def MacAddress(self, value):
+        self.MacInt = mac_to_int(value)
+
+    def save(self, *args, **kwargs):
+        self.IpSortKey = ip_sort_key(self.IpAddress)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'IpAddress' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'IpSortKey'}
+        super().save(*args, **kwargs)
+
+
+# hosts seen behind one interface of a network's ARP dumps; members are mutual observable neighbours
+class ArpSegment(models.Model):
+    network = models.ForeignKey(Networks, on_delete=models.CASCADE, related_name='segments')
+    interface = models.TextField()
+    members = models.ManyToManyField(Node, through='ArpSegmentMembership', related_name='arp_segments')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['network', 'interface'], name='unique_segment_per_network_interface'),
+        ]
+
+    def __str__(self):
+        return f"Segment {self.interface} of network {self.network_id}"
+
+
+class ArpSegmentMembership(models.Model):
+    segment = models.ForeignKey(ArpSegment, on_delete=models.CASCADE, related_name='memberships')
+    node = models.ForeignKey(Node, on_delete=models.CASCADE, related_name='segment_memberships')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['segment', 'node'], name='unique_segment_member'),
+        ]
+
+
+# Persisted project topology kept up to date by ingest deltas; see graph_store.
+class ProjectGraph(models.Model):
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, related_name='graph_state')
+    # bumped by every delta or rebuild
+    version = models.PositiveIntegerField(default=0)
+    # set by deletions, which union-find cannot undo; the next load rebuilds from the ORM
+    stale = models.BooleanField(default=False)
+    # union-find over switches: {str(network_pk): parent network_pk}; absent networks are their own root
+    components = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Graph state v{self.version} for project {self.project_id}"
+
+
+class GraphEdge(models.Model):
+    KIND_ATTACHED = 'attached'
+    KIND_INTER_SWITCH = 'inter_switch'
+    KIND_CHOICES = [
+        (KIND_ATTACHED, 'Attached'),
+        (KIND_INTER_SWITCH, 'Inter-switch'),
+    ]
+
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='graph_edges')
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    network = models.ForeignKey(Networks, on_delete=models.CASCADE, related_name='graph_edges')
+    # set for attached edges
+    node = models.ForeignKey(Node, on_delete=models.CASCADE, null=True, blank=True, related_name='graph_edges')
+    # set for inter_switch edges, with network_id < peer_id
+    peer = models.ForeignKey(Networks, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['network', 'node'], name='unique_attached_edge'),
+            models.UniqueConstraint(fields=['network', 'peer'], name='unique_inter_switch_edge'),
+        ]
+        indexes = [
+            models.Index(fields=['project', 'kind'], name='graph_edge_project_kind'),
+        ]
+
+
+# One ingest of one network's ARP table; observations reference scans by pk order.
+class Scan(models.Model):
+    network = models.ForeignKey(Networks, on_delete=models.CASCADE, related_name='scans')
+    # the network's scan before this one; a run of observations only continues across this link
+    previous = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    source = models.CharField(max_length=32, blank=True, default='')
+    taken_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ['-pk']
+
+    def __str__(self):
+        return f"Scan {self.pk} of network {self.network_id} @ {self.taken_at}"
+
+
+# A run of consecutive scans of one network in which a node kept the same IP.
+class Observation(models.Model):
+    network = models.ForeignKey(Networks, on_delete=models.CASCADE, related_name='observations')
+    node = models.ForeignKey(Node, on_delete=models.CASCADE, related_name='observations')
+    ip = models.GenericIPAddressField()
+    first_scan = models.ForeignKey(Scan, on_delete=models.CASCADE, related_name='+')
+    last_scan = models.ForeignKey(Scan, on_delete=models.CASCADE, related_name='+')
+    first_seen = models.DateTimeField()
+    last_seen = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['network', 'last_scan', 'first_scan'], name='observation_network_span'),
+            models.Index(fields=['node', 'last_scan'], name='observation_node_last_scan'),
+        ]
 
 
 def graph_image_upload_path(instance, filename):
@@ -44,9 +155,48 @@ class GraphImage(models.Model):
     project = models.ForeignKey('Project', on_delete=models.CASCADE, related_name='graphs')
     image = models.ImageField(upload_to=graph_image_upload_path)
     created_at = models.DateTimeField(auto_now_add=True)
+    # graph.graph_fingerprint() of what was drawn; equal fingerprints render identical images
+    fingerprint = models.CharField(max_length=64, blank=True, default='', db_index=True)
+    # ProjectGraph.version and render options it was drawn at (jobs.graph_key); cheap to compare per request
+    graph_key = models.CharField(max_length=64, blank=True, default='')
 
     class Meta:
         ordering = ['-created_at']
 
     def __str__(self):
         return f"Graph {self.pk} for project {self.project.pk} @ {self.created_at}"
+
+
+class GraphRenderJob(models.Model):
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+
+    project = models.ForeignKey('Project', on_delete=models.CASCADE, related_name='graph_jobs')
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    graph = models.ForeignKey(GraphImage, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    error = models.TextField(blank=True, default='')
+    # jobs.graph_key of an empty graph, which has no image to carry it
+    graph_key = models.CharField(max_length=64, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            # coalesces render requests across server processes
+            models.UniqueConstraint(fields=['project'], condition=models.Q(status__in=('queued', 'running')),
+                                    name='graph_job_one_active_per_project'),
+        ]
+
+    def __str__(self):
+        return f"Graph job {self.pk} for project {self.project_id}: {self.status}"
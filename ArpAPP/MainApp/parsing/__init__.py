@@ -0,0 +1,27 @@
+from .formats import (
+    DEFAULT_FORMATS,
+    ArpFormat,
+    BsdArpFormat,
+    CiscoArpFormat,
+    LinuxIpNeighFormat,
+    MikrotikArpFormat,
+    WindowsArpFormat,
+    register_format,
+)
+from .parser import (
+    BROADCAST_MAC,
+    ArpEntry,
+    ParseStats,
+    is_broadcast_or_multicast,
+    iter_text_lines,
+    normalize_mac,
+    parse_arp_lines,
+)
+from .stream import (
+    SUPPORTED_ENCODINGS,
+    TABLE_DIRECTIVE,
+    UnsupportedEncoding,
+    iter_stream_lines,
+    iter_tables,
+    open_decoded_stream,
+)
@@ -0,0 +1,152 @@
+import re
+
+# parse_line() results besides an entry tuple
+INTERFACE = 'interface'
+IGNORED = 'ignored'
+
+IPV4 = r'(?:[0-9]{1,3}\.){3}[0-9]{1,3}'
+MAC = r'[0-9A-Fa-f]{1,4}(?:[:.-][0-9A-Fa-f]{1,4}){2,5}'
+
+
+class ArpFormat:
+    """
+    One dump layout. ``parse_line`` gets a stripped, non-empty line plus the
+    per-parse ``state`` dict and returns ``(ip, mac_raw, kind, interface)``,
+    ``INTERFACE`` for a section header, ``IGNORED`` for a known non-entry line,
+    or ``None`` when the line is not in this format.
+    """
+    name = ''
+
+    def parse_line(self, line, state):
+        raise NotImplementedError
+
+
+class WindowsArpFormat(ArpFormat):
+    """``arp -a`` on Windows, including localized column headers."""
+    name = 'windows'
+
+    _interface = re.compile(r'(' + IPV4 + r')\s*---')
+    _header = re.compile(r'\b(address|адрес|internet|интерфейс|physical|тип)\b', re.IGNORECASE)
+    _entry = re.compile(r'(' + IPV4 + r')\s+([0-9A-Fa-f:-]{11,50})\s*(\S*)')
+    _any_ip = re.compile(IPV4)
+
+    def parse_line(self, line, state):
+        m = self._interface.search(line)
+        if m:
+            state['windows_interface'] = m.group(1)
+            return INTERFACE
+        m = self._entry.match(line)
+        if m:
+            interface = state.get('windows_interface')
+            if interface is None:
+                return None
+            ip, mac_raw, kind = m.groups()
+            return ip, mac_raw, kind, interface
+        if self._header.search(line) and not self._any_ip.search(line):
+            return IGNORED
+        return None
+
+
+class LinuxIpNeighFormat(ArpFormat):
+    """``ip neigh`` / ``ip -4 neigh show``."""
+    name = 'linux-ip-neigh'
+
+    _entry = re.compile(r'(' + IPV4 + r')\s+dev\s+(\S+)\s+lladdr\s+(' + MAC + r')\s*(\S*)')
+    _unresolved = re.compile(IPV4 + r'\s+dev\s+\S+\s+(?:FAILED|INCOMPLETE)\b')
+
+    def parse_line(self, line, state):
+        m = self._entry.match(line)
+        if m:
+            ip, interface, mac_raw, kind = m.groups()
+            return ip, mac_raw, kind.lower(), interface
+        if self._unresolved.match(line):
+            return IGNORED
+        return None
+
+
+class BsdArpFormat(ArpFormat):
+    """``arp -an`` as printed by Linux net-tools and the BSDs."""
+    name = 'arp-an'
+
+    _entry = re.compile(
+        r'\S+\s+\((' + IPV4 + r')\)\s+at\s+(' + MAC + r'|<incomplete>)'
+        r'(?:\s+\[(\w+)\])?(?:.*?\son\s+(\S+))?'
+    )
+
+    def parse_line(self, line, state):
+        m = self._entry.match(line)
+        if not m:
+            return None
+        ip, mac_raw, kind, interface = m.groups()
+        if mac_raw == '<incomplete>':
+            return IGNORED
+        return ip, mac_raw, kind or '', interface
+
+
+class CiscoArpFormat(ArpFormat):
+    """``show ip arp`` on IOS / IOS-XE."""
+    name = 'cisco'
+
+    _entry = re.compile(
+        r'Internet\s+(' + IPV4 + r')\s+\S+\s+'
+        r'([0-9A-Fa-f]{4}\.[0-9A-Fa-f]{4}\.[0-9A-Fa-f]{4}|Incomplete)\s+(\S+)(?:\s+(\S+))?',
+        re.IGNORECASE,
+    )
+    _header = re.compile(r'Protocol\s+Address\s+Age', re.IGNORECASE)
+
+    def parse_line(self, line, state):
+        m = self._entry.match(line)
+        if m:
+            ip, mac_raw, kind, interface = m.groups()
+            if mac_raw.lower() == 'incomplete':
+                return IGNORED
+            return ip, mac_raw, kind, interface
+        if self._header.match(line):
+            return IGNORED
+        return None
+
+
+class MikrotikArpFormat(ArpFormat):
+    """RouterOS ``/ip arp print``, ``print terse`` and ``export``."""
+    name = 'mikrotik'
+
+    _table_entry = re.compile(r'\d+\s+(?:([A-Z]+)\s+)?(' + IPV4 + r')\s+(' + MAC + r')\s+(\S+)')
+    _address = re.compile(r'(?<![-\w])address=(' + IPV4 + r')')
+    _mac = re.compile(r'mac-address=(' + MAC + r')')
+    _interface = re.compile(r'interface=("[^"]*"|\S+)')
+    _header = re.compile(r'(?:Flags:|Columns:|#\s+ADDRESS\b|/ip arp\b)', re.IGNORECASE)
+
+    def parse_line(self, line, state):
+        if 'address=' in line:
+            ip = self._address.search(line)
+            mac = self._mac.search(line)
+            if not (ip and mac):
+                return IGNORED
+            interface = self._interface.search(line)
+            return (ip.group(1), mac.group(1), 'static' if line.startswith('add ') else 'dynamic',
+                    interface.group(1).strip('"') if interface else None)
+        m = self._table_entry.match(line)
+        if m:
+            flags, ip, mac_raw, interface = m.groups()
+            return ip, mac_raw, 'dynamic' if flags and 'D' in flags else 'static', interface
+        if self._header.match(line):
+            return IGNORED
+        return None
+
+
+DEFAULT_FORMATS = [
+    WindowsArpFormat(),
+    LinuxIpNeighFormat(),
+    BsdArpFormat(),
+    CiscoArpFormat(),
+    MikrotikArpFormat(),
+]
+
+
+def register_format(fmt, first=False):
+    """Add a format to the auto-detection list used when no explicit list is given."""
+    if first:
+        DEFAULT_FORMATS.insert(0, fmt)
+    else:
+        DEFAULT_FORMATS.append(fmt)
+    return fmt
@@ -0,0 +1,120 @@
+import io
+import re
+from collections import Counter
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+from .formats import DEFAULT_FORMATS, IGNORED, INTERFACE
+
+BROADCAST_MAC = "ff:ff:ff:ff:ff:ff"
+
+_MAC_SPLIT = re.compile(r'[^0-9a-fA-F]+')
+
+
+class ArpEntry(NamedTuple):
+    ip: str
+    mac: str
+    mac_raw: str
+    kind: str
+    interface: Optional[str]
+    format: str
+    line_no: int
+    raw: str
+
+
+class ParseStats:
+    """Counters and a bounded sample of lines, filled while a parse is consumed."""
+
+    def __init__(self, max_samples=8):
+        self.max_samples = max_samples
+        self.lines_total = 0
+        self.iface_detected_count = 0
+        self.parsed_entries_count = 0
+        self.unmatched_count = 0
+        self.formats = Counter()
+        self.samples = []
+
+    def add_sample(self, sample):
+        if len(self.samples) < self.max_samples:
+            self.samples.append(sample)
+
+
+def normalize_mac(mac):
+    mac = (mac or "").strip().lower()
+    parts = [p for p in _MAC_SPLIT.split(mac) if p != '']
+    if len(parts) == 6:
+        return ':'.join(p.zfill(2) for p in parts)
+    if len(parts) == 3 and all(len(p) <= 4 for p in parts):
+        # Cisco dotted notation: 0011.2233.4455
+        digits = ''.join(p.zfill(4) for p in parts)
+        return ':'.join(digits[i:i + 2] for i in range(0, 12, 2))
+    if len(parts) == 1 and len(parts[0]) == 12:
+        return ':'.join(parts[0][i:i + 2] for i in range(0, 12, 2))
+    return mac
+
+
+def is_broadcast_or_multicast(mac):
+    if not mac:
+        return True
+    mac = mac.lower()
+    if mac == BROADCAST_MAC:
+        return True
+    try:
+        first_octet = int(mac.split(':')[0], 16)
+        return bool(first_octet & 1)
+    except Exception:
+        return True
+
+
+def iter_text_lines(text):
+    """Iterate a pasted block line by line without building a list of lines."""
+    return iter(io.StringIO(text))
+
+
+def parse_arp_lines(lines: Iterable[str], formats=None, stats: ParseStats = None) -> Iterator[ArpEntry]:
+    """
+    Yield an ``ArpEntry`` for every ARP line in ``lines``.
+
+    The layout is detected per line: the format that matched the previous line
+    is tried first, so a dump in a single layout costs one precompiled match per
+    line, while concatenated dumps from different devices still parse. Only the
+    current line is held in memory.
+    """
+    formats = list(formats or DEFAULT_FORMATS)
+    stats = stats if stats is not None else ParseStats()
+    state = {}
+    last = formats[0] if formats else None
+
+    for line_no, raw_line in enumerate(lines, 1):
+        stats.lines_total += 1
+        line = raw_line.strip()
+        if not line:
+            continue
+
+        result = last.parse_line(line, state) if last is not None else None
+        fmt = last
+        if result is None:
+            for candidate in formats:
+                if candidate is last:
+                    continue
+                result = candidate.parse_line(line, state)
+                if result is not None:
+                    fmt = last = candidate
+                    break
+
+        if result is None:
+            stats.unmatched_count += 1
+            stats.add_sample({'raw_unmatched': raw_line.rstrip('\r\n')})
+            continue
+        if result is INTERFACE:
+            stats.iface_detected_count += 1
+            continue
+        if result is IGNORED:
+            continue
+
+        ip, mac_raw, kind, interface = result
+        mac = normalize_mac(mac_raw)
+        stats.parsed_entries_count += 1
+        stats.formats[fmt.name] += 1
+        raw = raw_line.rstrip('\r\n')
+        stats.add_sample({'raw': raw, 'ip': ip, 'mac_raw': mac_raw, 'mac_norm': mac, 'type': kind})
+        yield ArpEntry(ip, mac, mac_raw, kind or '', interface, fmt.name, line_no, raw)
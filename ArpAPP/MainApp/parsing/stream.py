@@ -0,0 +1,88 @@
+import codecs
+import gzip
+import itertools
+import re
+from typing import Iterable, Iterator, Optional, Tuple
+
+READ_CHUNK_SIZE = 64 * 1024
+# longer lines are cut here so that a body without newlines cannot grow the buffer
+MAX_LINE_LENGTH = 64 * 1024
+
+SUPPORTED_ENCODINGS = ('identity', 'gzip', 'zstd')
+
+# "@network <id or name>" starts the table of that network in a multi-table upload;
+# the name is the rest of the line, or a double-quoted string to keep outer spaces
+TABLE_DIRECTIVE = re.compile(r'^\s*@network\s+(?:"([^"]*)"|(.*?))\s*$')
+
+
+class UnsupportedEncoding(ValueError):
+    pass
+
+
+def open_decoded_stream(fileobj, content_encoding=None):
+    """
+    Wrap a readable binary stream so that ``read(n)`` returns decompressed
+    bytes, for ``Content-Encoding`` identity, gzip (multi-member too) or zstd.
+    zstd needs the optional ``zstandard`` package.
+    """
+    encoding = (content_encoding or 'identity').strip().lower()
+    if encoding in ('identity', ''):
+        return fileobj
+    if encoding in ('gzip', 'x-gzip'):
+        return gzip.GzipFile(fileobj=fileobj, mode='rb')
+    if encoding == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise UnsupportedEncoding("zstd bodies need the 'zstandard' package")
+        return zstandard.ZstdDecompressor().stream_reader(fileobj, read_across_frames=True)
+    raise UnsupportedEncoding(f"unsupported Content-Encoding {content_encoding!r}")
+
+
+def iter_stream_lines(stream, chunk_size=READ_CHUNK_SIZE, max_line=MAX_LINE_LENGTH,
+                      encoding='utf-8') -> Iterator[str]:
+    """Decode ``stream`` incrementally and yield its lines; at most one chunk plus one line is buffered."""
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    pending = ''
+    while True:
+        chunk = stream.read(chunk_size)
+        text = decoder.decode(chunk or b'', final=not chunk)
+        if text:
+            pending += text
+            lines = pending.splitlines(keepends=True)
+            pending = ''
+            if lines and not lines[-1].endswith(('\n', '\r')):
+                pending = lines.pop()
+            yield from lines
+            while len(pending) > max_line:
+                yield pending[:max_line]
+                pending = pending[max_line:]
+        if not chunk:
+            break
+    if pending:
+        yield pending
+
+
+def _directive_tag(match):
+    quoted, bare = match.groups()
+    return quoted if quoted is not None else bare
+
+
+def iter_tables(lines: Iterable[str]) -> Iterator[Tuple[Optional[str], Iterator[str]]]:
+    """
+    Split a multi-table upload at ``@network <id or name>`` lines and yield
+    ``(tag, lines)`` per table; lines before the first directive get tag None.
+    Like ``itertools.groupby``, each table's lines must be consumed before the
+    next table is requested.
+    """
+    state = {'table': 0, 'tag': None}
+
+    def tagged(line):
+        match = TABLE_DIRECTIVE.match(line)
+        if match:
+            state['table'] += 1
+            state['tag'] = _directive_tag(match)
+        return state['table'], state['tag']
+
+    for (_, tag), group in itertools.groupby(lines, key=tagged):
+        yield tag, (line for line in group if not TABLE_DIRECTIVE.match(line))
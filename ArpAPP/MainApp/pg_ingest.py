@@ -0,0 +1,102 @@
+import io
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .addresses import ip_sort_key, mac_to_int
+from .models import Node
+
+# Node upserts for PostgreSQL: the batch is streamed into a session-local
+# staging table with COPY and folded into the node table by one
+# INSERT ... ON CONFLICT, instead of a bulk_update CASE per column plus a
+# bulk_create and a re-read. The rules match bulk_ingest_entries: the IP is
+# always replaced, vendor and type only by known values.
+
+STAGING_TABLE = 'arp_node_staging'
+STAGING_COLUMNS = ('mac', 'ip', 'ip_sort_key', 'vendor', 'type')
+
+
+def copy_merge_enabled():
+    return connection.vendor == 'postgresql' and getattr(settings, 'ARP_PG_COPY_INGEST', True)
+
+
+def _copy_text(value):
+    if value is None:
+        return r'\N'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def _copy_rows(cursor, rows):
+    sql = f"COPY {STAGING_TABLE} ({', '.join(STAGING_COLUMNS)}) FROM STDIN"
+    raw = cursor.cursor
+    if hasattr(raw, 'copy'):
+        # psycopg 3
+        with raw.copy(sql) as copy:
+            for row in rows:
+                copy.write_row(row)
+        return
+    # psycopg2
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(_copy_text(value) for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+    raw.copy_expert(sql, buffer)
+
+
+def _merge_sql():
+    qn = connection.ops.quote_name
+    fields = {name: qn(Node._meta.get_field(name).column) for name in ('MacInt', 'IpAddress', 'IpSortKey', 'Vendor', 'Type')}
+    table = qn(Node._meta.db_table)
+    pk = qn(Node._meta.pk.column)
+    return f"""
+        INSERT INTO {table} AS node ({fields['MacInt']}, {fields['IpAddress']}, {fields['IpSortKey']},
+                                     {fields['Vendor']}, {fields['Type']})
+        SELECT mac, ip::inet, ip_sort_key, vendor, type FROM {STAGING_TABLE}
+        ON CONFLICT ({fields['MacInt']}) DO UPDATE SET
+            {fields['IpAddress']} = EXCLUDED.{fields['IpAddress']},
+            {fields['IpSortKey']} = EXCLUDED.{fields['IpSortKey']},
+            {fields['Vendor']} = CASE WHEN EXCLUDED.{fields['Vendor']} <> ''
+                                      THEN EXCLUDED.{fields['Vendor']} ELSE node.{fields['Vendor']} END,
+            {fields['Type']} = CASE WHEN EXCLUDED.{fields['Type']} <> ''
+                                    THEN EXCLUDED.{fields['Type']} ELSE node.{fields['Type']} END
+        RETURNING node.{pk}, node.{fields['MacInt']}, node.{fields['Vendor']}, node.{fields['Type']}, (xmax = 0)
+    """
+
+
+def copy_merge_nodes(latest_ip, vendor_types):
+    """
+    Upsert ``{mac: ip}`` with ``{mac: (vendor, type)}`` in three statements
+    (TRUNCATE, COPY, merge). Returns ``(nodes_by_mac, created_macs)`` in the
+    shape the ORM path of bulk_ingest_entries produces.
+    """
+    rows = {}
+    macs_by_int = {}
+    for mac, ip in latest_ip.items():
+        mac_int = mac_to_int(mac)
+        vendor, guessed_type = vendor_types[mac]
+        # one staging row per MAC: ON CONFLICT cannot touch a row twice in one statement
+        rows[mac_int] = (mac_int, ip, ip_sort_key(ip), vendor, guessed_type)
+        macs_by_int.setdefault(mac_int, []).append(mac)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING_TABLE} "
+            f"(mac bigint, ip text, ip_sort_key text, vendor text, type text) ON COMMIT DELETE ROWS"
+        )
+        # the surrounding transaction may already have merged a batch into it
+        cursor.execute(f"TRUNCATE {STAGING_TABLE}")
+        _copy_rows(cursor, rows.values())
+        cursor.execute(_merge_sql())
+        merged = cursor.fetchall()
+
+    nodes = {}
+    created_macs = set()
+    for pk, mac_int, vendor, node_type, created in merged:
+        ip = rows[mac_int][1]
+        node = Node(pk=pk, MacInt=mac_int, IpAddress=ip, IpSortKey=rows[mac_int][2], Vendor=vendor, Type=node_type)
+        for mac in macs_by_int[mac_int]:
+            nodes[mac] = node
+            if created:
+                created_macs.add(mac)
+    return nodes, created_macs
@@ -0,0 +1,89 @@
+import io
+
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+
+from .graph_style import DEFAULT_LABEL_LIMIT, SWITCH_COLOR, type_color
+from .layout import compute_layout, partition_edges
+from .metrics import collect_stages
+
+# Kept free of Django imports, like layout, graph_style and metrics which it pulls in:
+# the render pool's spawned processes import this module without Django being set up.
+
+FIGSIZE = (14, 10)
+DPI = 150
+
+SWITCH_SIZE = 1600
+DEVICE_SIZE = 700
+
+EDGE_STYLES = {
+    'attached': dict(linewidths=1.2, linestyles='solid', alpha=0.95, colors='black'),
+    'inter_switch': dict(linewidths=2.0, linestyles='solid', alpha=0.9, colors='green'),
+    'virtual': dict(linewidths=1.0, linestyles='dotted', alpha=0.5, colors='gray'),
+}
+
+
+def _size_scale(node_count):
+    # keep the total inked area roughly constant once the canvas gets crowded
+    return min(1.0, (200.0 / max(1, node_count)) ** 0.5)
+
+
+def render_project_graph_png(G, label_limit=DEFAULT_LABEL_LIMIT, figsize=FIGSIZE, dpi=DPI):
+    """Lay out and draw a graph from load_project_graph, returning PNG bytes."""
+    layout = compute_layout(G)
+    xy = layout.xy
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    ax = fig.add_axes((0, 0, 1, 1))
+    ax.set_axis_off()
+
+    if len(xy):
+        lo = xy.min(axis=0)
+        hi = xy.max(axis=0)
+        margin = np.maximum((hi - lo) * 0.05, 0.5)
+        ax.set_xlim(lo[0] - margin[0], hi[0] + margin[0])
+        ax.set_ylim(lo[1] - margin[1], hi[1] + margin[1])
+
+    for kind, (us, vs) in partition_edges(G, layout.index).items():
+        style = EDGE_STYLES.get(kind, EDGE_STYLES['attached'])
+        ax.add_collection(LineCollection(np.stack((xy[us], xy[vs]), axis=1), zorder=1, **style))
+
+    scale = _size_scale(len(layout.nodes))
+    switch_rows = np.flatnonzero(layout.is_switch)
+    device_rows = np.flatnonzero(~layout.is_switch)
+    if len(device_rows):
+        colors = [type_color(G.nodes[layout.nodes[i]].get('Type')) for i in device_rows]
+        ax.scatter(xy[device_rows, 0], xy[device_rows, 1], s=DEVICE_SIZE * scale, c=colors, zorder=2)
+    if len(switch_rows):
+        ax.scatter(xy[switch_rows, 0], xy[switch_rows, 1], s=SWITCH_SIZE * scale, c=SWITCH_COLOR, zorder=2)
+
+    if len(layout.nodes) <= label_limit:
+        label_rows = range(len(layout.nodes))
+    elif len(switch_rows) <= label_limit:
+        label_rows = switch_rows
+    else:
+        label_rows = ()
+    for i in label_rows:
+        attrs = G.nodes[layout.nodes[i]]
+        label = attrs.get('label') or (f"SW {attrs.get('network_pk')}" if attrs.get('is_switch') else '')
+        ax.text(xy[i, 0], xy[i, 1], label, fontsize=8, ha='center', va='center', zorder=3)
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=dpi)
+    return buf.getvalue()
+
+
+def render_project_graph_png_timed(G, **options):
+    """
+    ``render_project_graph_png`` for the render pool: returns ``(png, stages)``
+    with the stage timings recorded while drawing, for the parent process to
+    record; the worker's own metrics are never scraped.
+    """
+    with collect_stages() as stages:
+        png = render_project_graph_png(G, **options)
+    return png, stages
@@ -0,0 +1,31 @@
+from itertools import combinations, groupby
+
+from .models import ArpSegmentMembership, Node
+
+
+def iter_segment_members(segments=None):
+    """Yield ``(segment_pk, [node pks])`` streaming over the membership table in segment order."""
+    rows = ArpSegmentMembership.objects.all()
+    if segments is not None:
+        rows = rows.filter(segment__in=segments)
+    rows = rows.order_by('segment_id', 'node_id').values_list('segment_id', 'node_id').iterator()
+    for segment_pk, group in groupby(rows, key=lambda row: row[0]):
+        yield segment_pk, [node_pk for _, node_pk in group]
+
+
+def iter_observable_pairs(segments=None):
+    """
+    Yield ``(a, b)`` node pk pairs with ``a < b`` for every two nodes sharing a
+    segment. Pairs are produced on demand from the membership rows and never
+    stored; a pair seen in several segments is yielded once per segment.
+    """
+    for _, members in iter_segment_members(segments):
+        yield from combinations(members, 2)
+
+
+def observable_neighbours(node):
+    """Nodes that share at least one segment with ``node``."""
+    return (Node.objects
+            .filter(segment_memberships__segment__memberships__node=node)
+            .exclude(pk=node.pk)
+            .distinct())
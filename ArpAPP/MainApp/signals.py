@@ -0,0 +1,102 @@
+from django.db.models import Count
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.dispatch import receiver
+
+from .counters import add_network_nodes, add_project_networks, add_project_nodes
+from .dashboard import invalidate_project_summaries
+from .graph_store import mark_graph_stale, touch_graph_version
+from .models import ArpSegment, GraphImage, Networks, Node
+
+# Keep the Project/Networks counters, the persisted graphs and the cached
+# dashboard summaries in step with ORM-level changes. The bulk ingest writes
+# through rows directly and applies its own deltas.
+
+_attached = Networks.Nodes.through
+
+
+def _attachments_by_network(rows):
+    return dict(rows.values('networks_id').annotate(n=Count('pk')).values_list('networks_id', 'n'))
+
+
+def _projects_of(rows):
+    return set(rows.values_list('networks__RelatedProject_id', flat=True))
+
+
+def _project_of_networks(network_pks):
+    return set(Networks.objects.filter(pk__in=network_pks).values_list('RelatedProject_id', flat=True))
+
+
+@receiver(post_save, sender=Networks)
+def network_created(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        add_project_networks(instance.RelatedProject_id, 1)
+    else:
+        # a renamed switch is drawn with its new label
+        touch_graph_version([instance.RelatedProject_id])
+    invalidate_project_summaries([instance.RelatedProject_id])
+
+
+@receiver(post_save, sender=Node)
+def node_saved(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        projects = _projects_of(_attached.objects.filter(node_id=instance.pk))
+        touch_graph_version(projects)
+        invalidate_project_summaries(projects)
+
+
+@receiver(post_save, sender=GraphImage)
+def graph_image_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_project_summaries([instance.project_id])
+
+
+@receiver(pre_delete, sender=Networks)
+def network_deleted(sender, instance, **kwargs):
+    add_project_networks(instance.RelatedProject_id, -1)
+    add_project_nodes(instance.RelatedProject_id, -_attached.objects.filter(networks_id=instance.pk).count())
+    mark_graph_stale([instance.RelatedProject_id])
+    invalidate_project_summaries([instance.RelatedProject_id])
+
+
+@receiver(pre_delete, sender=ArpSegment)
+def segment_deleted(sender, instance, **kwargs):
+    mark_graph_stale(Networks.objects.filter(pk=instance.network_id).values('RelatedProject_id'))
+
+
+@receiver(pre_delete, sender=GraphImage)
+def graph_image_deleted(sender, instance, **kwargs):
+    invalidate_project_summaries([instance.project_id])
+
+
+@receiver(pre_delete, sender=Node)
+def node_deleted(sender, instance, **kwargs):
+    rows = _attached.objects.filter(node_id=instance.pk)
+    add_network_nodes({net_pk: -n for net_pk, n in _attachments_by_network(rows).items()})
+    projects = _projects_of(rows)
+    mark_graph_stale(projects)
+    invalidate_project_summaries(projects)
+
+
+@receiver(m2m_changed, sender=_attached)
+def network_nodes_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    own = {'node_id': instance.pk} if reverse else {'networks_id': instance.pk}
+    if action == 'post_add' and pk_set:
+        if reverse:
+            add_network_nodes({net_pk: 1 for net_pk in pk_set})
+            projects = _project_of_networks(pk_set)
+        else:
+            add_network_nodes({instance.pk: len(pk_set)})
+            projects = [instance.RelatedProject_id]
+        mark_graph_stale(projects)
+        invalidate_project_summaries(projects)
+    elif action in ('pre_remove', 'pre_clear'):
+        # counted before the delete so that only rows that actually exist are subtracted
+        rows = _attached.objects.filter(**own)
+        if action == 'pre_remove':
+            rows = rows.filter(**{'networks_id__in' if reverse else 'node_id__in': pk_set})
+        add_network_nodes({net_pk: -n for net_pk, n in _attachments_by_network(rows).items()})
+        projects = _projects_of(rows)
+        mark_graph_stale(projects)
+        invalidate_project_summaries(projects)
@@ -0,0 +1,92 @@
+import ipaddress
+from bisect import bisect_right
+
+from .addresses import ip_to_int, network_int_range
+
+
+def parse_network_mask(mask):
+    """
+    ``ipaddress`` network for a ``Networks.NetworkMask`` value, or None.
+    Accepts ``10.0.0.0/24``, ``10.0.0.0/255.255.255.0`` and ``10.0.0.0 255.255.255.0``;
+    host bits are ignored.
+    """
+    text = ' '.join((mask or '').split())
+    if not text:
+        return None
+    parts = text.split(' ')
+    if len(parts) == 2:
+        text = '/'.join(parts)
+    elif len(parts) != 1:
+        return None
+    try:
+        return ipaddress.ip_network(text, strict=False)
+    except ValueError:
+        return None
+
+
+class SubnetIndex:
+    """
+    Sorted interval index over a project's networks, parsed from ``NetworkMask``.
+
+    CIDR blocks either nest or are disjoint, so the address space is cut into
+    non-overlapping runs, each owned by the most specific network covering it.
+    ``lookup`` is then one bisect, O(log n) in the number of networks. Of two
+    networks with the same block, the lower pk owns it. Networks whose mask
+    does not parse are listed in ``invalid``.
+    """
+
+    def __init__(self, networks):
+        self.invalid = []
+        blocks = []
+        for network in networks:
+            net = parse_network_mask(network.NetworkMask)
+            if net is None:
+                self.invalid.append(network)
+                continue
+            first, last = network_int_range(net)
+            blocks.append((first, last, network))
+        # outer blocks before inner ones; among equal blocks the lowest pk is pushed last and owns it
+        blocks.sort(key=lambda b: (b[0], -b[1], -b[2].pk))
+
+        self._starts = []
+        self._ends = []
+        self._owners = []
+        stack = []
+        pos = 0
+        for first, last, network in blocks:
+            while stack and stack[-1][1] < first:
+                pos = self._close(stack.pop(), pos)
+            if stack and pos < first:
+                self._emit(pos, first - 1, stack[-1][2])
+            stack.append((first, last, network))
+            pos = first
+        while stack:
+            pos = self._close(stack.pop(), pos)
+
+    def _close(self, block, pos):
+        _, last, network = block
+        if pos <= last:
+            self._emit(pos, last, network)
+            pos = last + 1
+        return pos
+
+    def _emit(self, first, last, network):
+        if self._owners and self._owners[-1] is network and self._ends[-1] + 1 == first:
+            self._ends[-1] = last
+            return
+        self._starts.append(first)
+        self._ends.append(last)
+        self._owners.append(network)
+
+    def __len__(self):
+        return len(self._owners)
+
+    def lookup(self, ip):
+        """Most specific network containing ``ip`` (text or ``ipaddress`` object), or None."""
+        value = ip_to_int(ip)
+        if value is None:
+            return None
+        i = bisect_right(self._starts, value) - 1
+        if i >= 0 and value <= self._ends[i]:
+            return self._owners[i]
+        return None
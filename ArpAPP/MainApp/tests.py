@@ -1,3 +1,1106 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+from concurrent.futures import Future
+from datetime import timedelta
+import os
+import re
+import stat
+import tempfile
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.urls import reverse
+
+from .addresses import mac_to_int
+from .counters import add_network_nodes, reconcile_counters
+from .dashboard import compute_project_summary
+from .graph import graph_fingerprint, load_project_graph
+from .graph_store import rebuild_project_graph, touch_graph_version
+from .history import diff_scans, record_observations, start_scan
+from .ingest import _existing_nodes_by_mac, _upsert_nodes, bulk_ingest_entries
+from .jobs import _render, _run_job, enqueue_graph_render, expire_stale_jobs, graph_key
+from .layout import compute_layout
+from .listing import decode_cursor, encode_cursor, node_page
+from .metrics import REGISTRY
+from .models import GraphEdge, GraphImage, GraphRenderJob, Networks, Node, Observation, Project, ProjectGraph, Scan
+from .parsing import ParseStats, is_broadcast_or_multicast, iter_tables, iter_text_lines, normalize_mac, \
+    parse_arp_lines
+from .pg_ingest import copy_merge_nodes
+from .segments import iter_observable_pairs, observable_neighbours
+from .subnets import SubnetIndex
+from .uploads import ingest_by_subnet, ingest_tables
+from .utils.device_types import DEFAULT_VENDOR_TYPE_RULES, classify_vendor, compile_rules, load_rules_file, \
+    reload_rules
+from .utils.oui import build_oui_index, get_vendor_and_device_type, get_vendors_and_device_types
+from .views import ArpTableCreateNodesView
+
+ARP_TEXT = (
+    "10.0.0.1 dev eth0 lladdr 00:11:22:33:44:55 REACHABLE\n"
+    "10.0.0.2 dev eth0 lladdr 00:11:22:33:44:66 REACHABLE\n"
+)
+
+
+def _make_network(mask='10.0.0.0/24', name='net'):
+    project = Project.objects.create(Name='test')
+    return Networks.objects.create(RelatedProject=project, NetworkName=name, NetworkMask=mask)
+
+
+class PasteIngestTests(TestCase):
+
+    def test_failed_ingest_is_reported_in_diag(self):
+        network = _make_network()
+
+        def fail(*args, **kwargs):
+            # what a constraint error inside bulk_create does to the open transaction
+            with transaction.atomic(savepoint=False):
+                raise IntegrityError('boom')
+
+        with mock.patch('MainApp.ingest.apply_network_delta', side_effect=fail), \
+                self.assertLogs('MainApp.views.arp', 'ERROR'):
+            diag = ArpTableCreateNodesView().parse_and_create_nodes_diagnostic(ARP_TEXT, network)
+
+        self.assertEqual(diag['errors'], ['boom'])
+        self.assertEqual(diag['network_nodes_count'], 0)
+        self.assertFalse(Node.objects.exists())
+
+    def test_diag_matches_per_line_ingest(self):
+        # what the old get_or_create-per-line loop reported for the same paste
+        network = _make_network('192.168.1.0/24')
+        known = Node.objects.create(MacAddress='00:11:22:33:44:01', IpAddress='192.168.1.99', Vendor='Acme', Type='pc')
+        attached = Node.objects.create(MacAddress='00:11:22:33:44:02', IpAddress='192.168.1.2', Vendor='Acme',
+                                       Type='pc')
+        network.Nodes.add(attached)
+        paste = (
+            "Interface: 192.168.1.10 --- 0x4\n"
+            "  Internet Address      Physical Address      Type\n"
+            "  192.168.1.1           00-11-22-33-44-01     dynamic\n"
+            "  192.168.1.2           00-11-22-33-44-02     dynamic\n"
+            "  192.168.1.3           00-11-22-33-44-03     dynamic\n"
+            "  192.168.1.4           00-11-22-33-44-03     dynamic\n"
+            "  192.168.1.255         ff-ff-ff-ff-ff-ff     static\n"
+            "\n"
+        )
+        vendors = {mac_to_int(mac): result for mac, result in (
+            ('00:11:22:33:44:01', (None, 'unknown')), ('00:11:22:33:44:02', ('Acme', 'pc')),
+            ('00:11:22:33:44:03', ('Other', 'router')))}
+        with mock.patch('MainApp.ingest.get_vendors_and_device_types', side_effect=lambda macs: vendors):
+            diag = ArpTableCreateNodesView().parse_and_create_nodes_diagnostic(paste, network)
+
+        self.assertEqual({key: diag[key] for key in ('lines_total', 'iface_detected_count', 'parsed_entries_count',
+                                                     'entries_skipped_broadcast', 'nodes_attached_count', 'errors')},
+                         {'lines_total': 8, 'iface_detected_count': 1, 'parsed_entries_count': 5,
+                          'entries_skipped_broadcast': 1, 'nodes_attached_count': 2, 'errors': []})
+        self.assertEqual(diag['nodes_created'], [
+            # an unknown vendor keeps the stored one, but 'unknown' is a type like any other
+            {'ip': '192.168.1.1', 'mac': '00:11:22:33:44:01', 'created': False, 'attached': True,
+             'vendor': 'Acme', 'type': 'unknown'},
+            {'ip': '192.168.1.2', 'mac': '00:11:22:33:44:02', 'created': False, 'attached': False,
+             'vendor': 'Acme', 'type': 'pc'},
+            {'ip': '192.168.1.3', 'mac': '00:11:22:33:44:03', 'created': True, 'attached': True,
+             'vendor': 'Other', 'type': 'router'},
+            {'ip': '192.168.1.4', 'mac': '00:11:22:33:44:03', 'created': False, 'attached': False,
+             'vendor': 'Other', 'type': 'router'},
+        ])
+        self.assertEqual(diag['network_nodes_count'], 3)
+        known.refresh_from_db()
+        self.assertEqual((str(known.IpAddress), known.Vendor), ('192.168.1.1', 'Acme'))
+        self.assertEqual(str(Node.objects.get(MacInt=mac_to_int('00:11:22:33:44:03')).IpAddress), '192.168.1.4')
+
+
+def _parse(text):
+    stats = ParseStats()
+    entries = [(e.ip, e.mac, e.kind, e.interface, e.format) for e in parse_arp_lines(iter_text_lines(text), stats=stats)]
+    return entries, stats
+
+
+class ArpFormatTests(SimpleTestCase):
+
+    def test_windows(self):
+        entries, stats = _parse(
+            "Interface: 192.168.1.10 --- 0x4\n"
+            "  Internet Address      Physical Address      Type\n"
+            "  192.168.1.1           00-11-22-33-44-55     dynamic\n"
+        )
+        self.assertEqual(entries, [('192.168.1.1', '00:11:22:33:44:55', 'dynamic', '192.168.1.10', 'windows')])
+        self.assertEqual((stats.iface_detected_count, stats.unmatched_count), (1, 0))
+
+    def test_windows_localized_header(self):
+        entries, stats = _parse(
+            "Интерфейс: 10.0.0.5 --- 0xb\n"
+            "  адрес в Интернете      Физический адрес      Тип\n"
+            "  10.0.0.1              aa-bb-cc-dd-ee-ff     динамический\n"
+        )
+        self.assertEqual(entries, [('10.0.0.1', 'aa:bb:cc:dd:ee:ff', 'динамический', '10.0.0.5', 'windows')])
+        self.assertEqual(stats.unmatched_count, 0)
+
+    def test_windows_entry_without_interface_is_unmatched(self):
+        entries, stats = _parse("  192.168.1.1           00-11-22-33-44-55     dynamic\n")
+        self.assertEqual((entries, stats.unmatched_count), ([], 1))
+
+    def test_linux_ip_neigh(self):
+        entries, _ = _parse(
+            "10.0.0.1 dev eth0 lladdr 00:11:22:33:44:55 REACHABLE\n"
+            "10.0.0.2 dev eth0  FAILED\n"
+            "10.0.0.3 dev eth1 lladdr 0:1b:21:a:b:c STALE\n"
+        )
+        self.assertEqual(entries, [
+            ('10.0.0.1', '00:11:22:33:44:55', 'reachable', 'eth0', 'linux-ip-neigh'),
+            ('10.0.0.3', '00:1b:21:0a:0b:0c', 'stale', 'eth1', 'linux-ip-neigh'),
+        ])
+
+    def test_arp_an(self):
+        entries, _ = _parse(
+            "? (10.0.0.1) at 00:11:22:33:44:55 [ether] on eth0\n"
+            "gw.lan (10.0.0.2) at <incomplete> on eth0\n"
+            "? (10.0.0.3) at 0:1b:21:a:b:c on em0 expires in 1190 seconds [ethernet]\n"
+        )
+        self.assertEqual(entries, [
+            ('10.0.0.1', '00:11:22:33:44:55', 'ether', 'eth0', 'arp-an'),
+            ('10.0.0.3', '00:1b:21:0a:0b:0c', '', 'em0', 'arp-an'),
+        ])
+
+    def test_cisco(self):
+        entries, stats = _parse(
+            "Protocol  Address          Age (min)  Hardware Addr   Type   Interface\n"
+            "Internet  10.0.0.1                -   0011.2233.4455  ARPA   Vlan10\n"
+            "Internet  10.0.0.2               12   Incomplete      ARPA\n"
+        )
+        self.assertEqual(entries, [('10.0.0.1', '00:11:22:33:44:55', 'ARPA', 'Vlan10', 'cisco')])
+        self.assertEqual(stats.unmatched_count, 0)
+
+    def test_mikrotik_table_and_export(self):
+        entries, stats = _parse(
+            "Flags: D - DYNAMIC\n"
+            "Columns: ADDRESS, MAC-ADDRESS, INTERFACE\n"
+            "#   ADDRESS      MAC-ADDRESS        INTERFACE\n"
+            "0 D 10.0.0.1     00:11:22:33:44:55  bridge\n"
+            "/ip arp\n"
+            'add address=10.0.0.2 interface="lan 2" mac-address=00:11:22:33:44:66\n'
+        )
+        self.assertEqual(entries, [
+            ('10.0.0.1', '00:11:22:33:44:55', 'dynamic', 'bridge', 'mikrotik'),
+            ('10.0.0.2', '00:11:22:33:44:66', 'static', 'lan 2', 'mikrotik'),
+        ])
+        self.assertEqual(stats.unmatched_count, 0)
+
+    def test_concatenated_dumps_switch_format_per_line(self):
+        entries, stats = _parse(
+            "10.0.0.1 dev eth0 lladdr 00:11:22:33:44:55 REACHABLE\n"
+            "Internet  10.0.0.2                -   0011.2233.4466  ARPA   Vlan10\n"
+            "not an arp line\n"
+        )
+        self.assertEqual([e[4] for e in entries], ['linux-ip-neigh', 'cisco'])
+        self.assertEqual(dict(stats.formats), {'linux-ip-neigh': 1, 'cisco': 1})
+        self.assertEqual(stats.unmatched_count, 1)
+        self.assertEqual(stats.samples[-1], {'raw_unmatched': 'not an arp line'})
+
+
+class NormalizeMacTests(SimpleTestCase):
+
+    def test_notations(self):
+        for raw in ('00:11:22:33:44:55', '00-11-22-33-44-55', '0011.2233.4455', '001122334455', '00:11:22:33:44:55 '):
+            with self.subTest(raw=raw):
+                self.assertEqual(normalize_mac(raw), '00:11:22:33:44:55')
+
+    def test_cisco_dotted_pads_short_groups(self):
+        self.assertEqual(normalize_mac('11.2233.AbCd'), '00:11:22:33:ab:cd')
+
+    def test_unparseable_is_returned_lowercased(self):
+        self.assertEqual(normalize_mac(' NOT-A-MAC '), 'not-a-mac')
+        self.assertEqual(normalize_mac(None), '')
+
+    def test_broadcast_and_multicast(self):
+        self.assertTrue(is_broadcast_or_multicast('ff:ff:ff:ff:ff:ff'))
+        self.assertTrue(is_broadcast_or_multicast('01:00:5e:00:00:01'))
+        self.assertFalse(is_broadcast_or_multicast('00:11:22:33:44:55'))
+
+
+class TableDirectiveTests(SimpleTestCase):
+
+    def tables(self, text):
+        return [(tag, list(lines)) for tag, lines in iter_tables(text.splitlines(keepends=True))]
+
+    def test_names_with_spaces_and_quotes(self):
+        tables = self.tables('@network core switch\na\n@network " padded "\nb\n@network 7\nc\n')
+        self.assertEqual(tables, [('core switch', ['a\n']), (' padded ', ['b\n']), ('7', ['c\n'])])
+
+    def test_lines_before_first_directive_are_untagged(self):
+        self.assertEqual(self.tables('a\n@network x\nb\n'), [(None, ['a\n']), ('x', ['b\n'])])
+
+    def test_empty_and_repeated_tables(self):
+        self.assertEqual(self.tables('@network x\n@network y\nb\n@network x\nc\n'),
+                         [('x', []), ('y', ['b\n']), ('x', ['c\n'])])
+
+    def test_tables_are_streamed(self):
+        tables = iter_tables(iter(['@network a\n', '1\n', '2\n', '@network b\n', '3\n']))
+        tag, lines = next(tables)
+        self.assertEqual((tag, next(lines)), ('a', '1\n'))
+        self.assertEqual(list(lines), ['2\n'])
+        tag, lines = next(tables)
+        self.assertEqual((tag, list(lines)), ('b', ['3\n']))
+
+
+@override_settings(ARP_INGEST_TOKENS=['s3cret'])
+class BulkIngestAuthTests(TestCase):
+
+    def setUp(self):
+        self.network = _make_network(name='core switch')
+        self.url = reverse('MainApp:project_bulk_ingest', kwargs={'project_id': self.network.RelatedProject_id})
+        self.body = gzip.compress(('@network core switch\n' + ARP_TEXT).encode())
+
+    def post(self, **headers):
+        return self.client.post(self.url, self.body, content_type='text/plain',
+                                HTTP_CONTENT_ENCODING='gzip', **headers)
+
+    def test_rejects_missing_and_wrong_tokens(self):
+        self.assertEqual(self.post().status_code, 401)
+        self.assertEqual(self.post(HTTP_AUTHORIZATION='Bearer nope').status_code, 401)
+        self.assertFalse(Node.objects.exists())
+
+    def test_accepts_configured_token(self):
+        response = self.post(HTTP_AUTHORIZATION='Bearer s3cret')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.network.Nodes.count(), 2)
+
+    @override_settings(ARP_INGEST_TOKENS=[])
+    def test_disabled_without_tokens(self):
+        self.assertEqual(self.post(HTTP_AUTHORIZATION='Bearer s3cret').status_code, 401)
+
+
+class GraphDeltaTests(TestCase):
+
+    def snapshot(self):
+        edges = set(GraphEdge.objects.filter(project=self.project)
+                    .values_list('kind', 'network_id', 'node_id', 'peer_id'))
+        G, _ = load_project_graph(self.project)
+        return edges, graph_fingerprint(G)
+
+    def test_ingest_deltas_match_a_rebuild(self):
+        self.project = Project.objects.create(Name='delta')
+        a, b, c, d = (Networks.objects.create(RelatedProject=self.project, NetworkName=name, NetworkMask=mask)
+                      for name, mask in (('a', '10.0.1.0/24'), ('b', '10.0.2.0/24'), ('c', '10.0.3.0/24'),
+                                         ('d', '10.0.4.0/24')))
+        rebuild_project_graph(self.project)
+
+        batches = [
+            (a, [('10.0.1.1', '00:00:00:00:01:01', 'eth0'), ('10.0.1.2', '00:00:00:00:01:02', 'eth0')]),
+            # a host already on a, now also in b's segment: joins a and b
+            (b, [('10.0.2.2', '00:00:00:00:01:02', 'eth1'), ('10.0.2.3', '00:00:00:00:01:03', 'eth1')]),
+            # a component of its own, linked by a virtual edge
+            (c, [('10.0.3.4', '00:00:00:00:01:04', '')]),
+            (d, [('10.0.4.5', '00:00:00:00:01:05', 'eth2')]),
+            # d's segment member newly attached to a: bridges d
+            (a, [('10.0.1.5', '00:00:00:00:01:05', ''), ('10.0.1.1', '00:00:00:00:01:01', 'eth0')]),
+        ]
+        for network, entries in batches:
+            with self.captureOnCommitCallbacks(execute=True):
+                bulk_ingest_entries(network, entries, {})
+        state = ProjectGraph.objects.get(project=self.project)
+        self.assertFalse(state.stale)
+        self.assertEqual(state.version, 1 + len(batches))
+        delta = self.snapshot()
+
+        rebuild_project_graph(self.project)
+        self.assertEqual(self.snapshot(), delta)
+        self.assertEqual(sorted(kind for kind, *_ in delta[0]).count(GraphEdge.KIND_INTER_SWITCH), 2)
+
+
+class SegmentPairTests(TestCase):
+
+    def setUp(self):
+        self.network = _make_network()
+        bulk_ingest_entries(self.network, [
+            ('10.0.0.1', '00:00:00:00:00:01', 'eth0'),
+            ('10.0.0.2', '00:00:00:00:00:02', 'eth0'),
+            ('10.0.0.3', '00:00:00:00:00:03', 'eth0'),
+            ('10.0.0.4', '00:00:00:00:00:04', 'eth1'),
+        ], {})
+        self.pk = {n.MacInt & 0xff: n.pk for n in Node.objects.all()}
+
+    def test_pairs_are_ordered_and_per_segment(self):
+        pairs = list(iter_observable_pairs())
+        self.assertTrue(all(a < b for a, b in pairs))
+        self.assertEqual(set(pairs), {(self.pk[1], self.pk[2]), (self.pk[1], self.pk[3]), (self.pk[2], self.pk[3])})
+        self.assertEqual(len(pairs), 3)
+
+    def test_pairs_limited_to_segments(self):
+        eth1 = self.network.segments.filter(interface='eth1')
+        self.assertEqual(list(iter_observable_pairs(eth1)), [])
+
+    def test_neighbours(self):
+        node = Node.objects.get(pk=self.pk[1])
+        self.assertEqual(set(observable_neighbours(node).values_list('pk', flat=True)), {self.pk[2], self.pk[3]})
+        lone = Node.objects.get(pk=self.pk[4])
+        self.assertFalse(observable_neighbours(lone).exists())
+
+
+class SubnetIndexTests(TestCase):
+
+    def setUp(self):
+        self.project = Project.objects.create(Name='subnets')
+
+    def network(self, name, mask):
+        return Networks.objects.create(RelatedProject=self.project, NetworkName=name, NetworkMask=mask)
+
+    def index(self):
+        return SubnetIndex(self.project.networks.order_by('pk'))
+
+    def test_most_specific_network_wins(self):
+        inner = self.network('inner', '10.1.2.0/24')
+        outer = self.network('outer', '10.0.0.0/8')
+        middle = self.network('middle', '10.1.0.0 255.255.0.0')
+        index = self.index()
+        self.assertEqual([index.lookup(ip) for ip in ('10.1.2.3', '10.1.3.3', '10.2.0.1', '10.1.255.255',
+                                                      '11.0.0.1')],
+                         [inner, middle, outer, middle, None])
+
+    def test_lower_pk_owns_a_shared_block(self):
+        first = self.network('first', '192.168.0.0/24')
+        self.network('second', '192.168.0.7/255.255.255.0')
+        self.assertEqual(self.index().lookup('192.168.0.1'), first)
+
+    def test_unparsable_masks_are_invalid(self):
+        good = self.network('good', '10.0.0.0/24')
+        bad = [self.network('bad', mask) for mask in ('', '10.0.0.0/33', 'not a mask at all')]
+        index = self.index()
+        self.assertEqual(index.invalid, bad)
+        self.assertEqual(index.lookup('10.0.0.1'), good)
+
+    def test_ipv6_alongside_ipv4(self):
+        v4 = self.network('v4', '10.0.0.0/24')
+        v6 = self.network('v6', '2001:db8::/64')
+        index = self.index()
+        self.assertEqual((index.lookup('10.0.0.9'), index.lookup('2001:db8::9'), index.lookup('2001:db9::1')),
+                         (v4, v6, None))
+
+    def test_ingest_by_subnet(self):
+        lan = self.network('lan', '10.0.0.0/24')
+        v6 = self.network('v6', '2001:db8::/64')
+        self.network('bad', 'nope')
+        dump = (
+            "10.0.0.1 dev eth0 lladdr 00:00:00:00:03:01 REACHABLE\n"
+            "172.16.0.1 dev eth0 lladdr 00:00:00:00:03:03 REACHABLE\n"
+            "10.0.0.2 dev eth0 lladdr 00:00:00:00:03:04 REACHABLE\n"
+        )
+        summary = ingest_by_subnet(self.project, iter_text_lines(dump), batch_size=2)
+
+        self.assertEqual(len(summary['errors']), 1)
+        self.assertEqual((summary['entries_total'], summary['entries_unassigned']), (3, 1))
+        self.assertIn('172.16.0.1', summary['unassigned_samples'][0])
+        self.assertEqual({diag['network_id']: diag['parsed_entries_count'] for diag in summary['tables']},
+                         {lan.pk: 2})
+        self.assertEqual(lan.Nodes.count(), 2)
+        # the dump formats are IPv4 only; an IPv6 network next to them just stays empty
+        self.assertFalse(v6.Nodes.exists())
+        self.assertFalse(Node.objects.filter(IpAddress='172.16.0.1').exists())
+
+
+class GraphExportViewTests(TestCase):
+
+    def setUp(self):
+        self.network = _make_network()
+        self.project = self.network.RelatedProject
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_ingest_entries(self.network, [('10.0.0.1', '00:11:22:33:44:55', 'eth0'),
+                                               ('10.0.0.2', '00:11:22:33:44:66', 'eth0')], {})
+        self.json_url = reverse('MainApp:project_graph_json', kwargs={'project_id': self.project.pk})
+        self.svg_url = reverse('MainApp:project_graph_svg', kwargs={'project_id': self.project.pk})
+
+    def test_json_shape(self):
+        response = self.client.get(self.json_url)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(set(data), {'nodes', 'edges', 'palette'})
+        nodes = data['nodes']
+        self.assertEqual(len(nodes['id']), 3)
+        self.assertTrue(all(len(column) == 3 for column in nodes.values()))
+        self.assertEqual(sorted(nodes['mac'], key=str), ['00:11:22:33:44:55', '00:11:22:33:44:66', None])
+        self.assertEqual(len(data['edges']['attached']['source']), 2)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_svg_shape(self):
+        response = self.client.get(self.svg_url)
+        self.assertEqual((response.status_code, response['Content-Type']), (200, 'image/svg+xml'))
+        body = b''.join(response.streaming_content).decode('utf-8')
+        self.assertTrue(body.lstrip().startswith('<svg'))
+        self.assertTrue(body.rstrip().endswith('</svg>'))
+        self.assertEqual(body.count('<circle'), 3)
+        self.assertNotEqual(response['ETag'], self.client.get(self.json_url)['ETag'])
+
+    def test_matching_etag_is_not_modified(self):
+        etag = self.client.get(self.json_url)['ETag']
+        response = self.client.get(self.json_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_weak_etag_from_gzip_is_not_modified(self):
+        response = self.client.get(self.json_url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(set(json.loads(gzip.decompress(response.content))), {'nodes', 'edges', 'palette'})
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        response = self.client.get(self.json_url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_ingest_changes_the_etag(self):
+        etag = self.client.get(self.json_url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_ingest_entries(self.network, [('10.0.0.3', '00:11:22:33:44:77', 'eth0')], {})
+        response = self.client.get(self.json_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()['nodes']['id']), 4)
+
+
+class ScanHistoryTests(TestCase):
+
+    def setUp(self):
+        self.network = _make_network()
+        self.nodes = [Node.objects.create(MacAddress=f'00:00:00:00:02:0{i}', IpAddress=f'10.0.0.{i}')
+                      for i in range(1, 5)]
+
+    def scan(self, ips):
+        scan = start_scan(self.network, 'test')
+        record_observations(scan, {self.nodes[i].pk: ip for i, ip in ips.items()})
+        return scan
+
+    def test_diff_scans(self):
+        n1, n2, n3, n4 = (node.pk for node in self.nodes)
+        first = self.scan({0: '10.0.0.1', 1: '10.0.0.2', 3: '10.0.0.4'})
+        second = self.scan({0: '10.0.0.1', 1: '10.0.0.20', 2: '10.0.0.3', 3: '10.0.0.4'})
+        third = self.scan({0: '10.0.0.1', 3: '10.0.0.4'})
+
+        self.assertEqual(diff_scans(first, second),
+                         {'added': [(n3, '10.0.0.3')], 'removed': [], 'changed': [(n2, '10.0.0.2', '10.0.0.20')]})
+        self.assertEqual(diff_scans(second, third),
+                         {'added': [], 'removed': [(n2, '10.0.0.20'), (n3, '10.0.0.3')], 'changed': []})
+        self.assertEqual(diff_scans(first, third), {'added': [], 'removed': [(n2, '10.0.0.2')], 'changed': []})
+        self.assertEqual(diff_scans(third, first), {'added': [(n2, '10.0.0.2')], 'removed': [], 'changed': []})
+        # unchanged nodes stay one run each
+        self.assertEqual(Observation.objects.filter(node_id__in=[n1, n4]).count(), 2)
+        run = Observation.objects.get(node_id=n3)
+        self.assertEqual((run.first_seen, run.last_seen, run.first_scan_id, run.last_scan_id),
+                         (second.taken_at, second.taken_at, second.pk, second.pk))
+
+    def test_scans_of_different_networks_are_refused(self):
+        other = start_scan(_make_network(name='other'), 'test')
+        with self.assertRaises(ValueError):
+            diff_scans(self.scan({0: '10.0.0.1'}), other)
+
+    def test_upload_records_one_scan_per_network(self):
+        other = Networks.objects.create(RelatedProject=self.network.RelatedProject, NetworkName='empty',
+                                        NetworkMask='10.0.1.0/24')
+        previous = self.scan({0: '10.0.0.1', 1: '10.0.0.2'})
+        upload = (
+            "@network net\n10.0.0.1 dev eth0 lladdr 00:00:00:00:02:01 REACHABLE\n"
+            "@network empty\n"
+            "@network net\n10.0.0.2 dev eth0 lladdr 00:00:00:00:02:02 REACHABLE\n"
+            "@network net\n"
+        )
+        summary = ingest_tables(self.network.RelatedProject, iter_text_lines(upload))
+
+        self.assertEqual(summary['errors'], [])
+        scans = list(Scan.objects.filter(network=self.network).exclude(pk=previous.pk))
+        self.assertEqual(len(scans), 1)
+        self.assertEqual({diag.get('scan_id') for diag in summary['tables']}, {scans[0].pk, None})
+        self.assertFalse(Scan.objects.filter(network=other).exists())
+        self.assertEqual(diff_scans(previous, scans[0]), {'added': [], 'removed': [], 'changed': []})
+
+    def test_empty_paste_records_no_scan(self):
+        ArpTableCreateNodesView().parse_and_create_nodes_diagnostic("nothing to see\n", self.network)
+        self.assertFalse(Scan.objects.exists())
+
+
+class GraphJobReuseTests(TestCase):
+
+    def setUp(self):
+        self.network = _make_network()
+        self.project = self.network.RelatedProject
+        ArpTableCreateNodesView().parse_and_create_nodes_diagnostic(ARP_TEXT, self.network)
+        state = rebuild_project_graph(self.project)
+        self.image = GraphImage.objects.create(project=self.project, graph_key=graph_key(state.version))
+        self.job = GraphRenderJob.objects.create(project=self.project, status=GraphRenderJob.STATUS_DONE,
+                                                 graph=self.image)
+
+    def test_current_image_returns_its_job_without_loading_the_graph(self):
+        with mock.patch('MainApp.jobs.load_project_graph') as load, mock.patch('MainApp.jobs._get_dispatcher'):
+            for _ in range(3):
+                job, created = enqueue_graph_render(self.project)
+                self.assertEqual((job.pk, created), (self.job.pk, False))
+        load.assert_not_called()
+        self.assertEqual(GraphRenderJob.objects.count(), 1)
+
+    def test_new_version_queues_a_render(self):
+        touch_graph_version([self.project.pk])
+        with mock.patch('MainApp.jobs._get_dispatcher') as dispatcher, \
+                self.captureOnCommitCallbacks(execute=True):
+            job, created = enqueue_graph_render(self.project)
+        self.assertTrue(created)
+        self.assertEqual(job.status, GraphRenderJob.STATUS_QUEUED)
+        dispatcher.return_value.submit.assert_called_once()
+
+    def test_empty_graph_drops_the_old_image_and_is_reused(self):
+        Networks.objects.filter(RelatedProject=self.project).delete()
+        with mock.patch('MainApp.jobs._get_dispatcher'), self.captureOnCommitCallbacks(execute=True):
+            job, created = enqueue_graph_render(self.project)
+        self.assertTrue(created)
+        # the worker closes its connection when done; that would end the test's transaction
+        with mock.patch('MainApp.jobs.connection'), mock.patch('MainApp.jobs.close_old_connections'):
+            _run_job(job.pk, self.project.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, GraphRenderJob.STATUS_DONE)
+        self.assertIsNone(job.graph)
+
+        with mock.patch('MainApp.jobs._get_dispatcher') as dispatcher:
+            for _ in range(3):
+                self.assertEqual(enqueue_graph_render(self.project), (job, False))
+        dispatcher.assert_not_called()
+
+
+class NodePageTests(TestCase):
+
+    def setUp(self):
+        # shared IPs, both families and an address-less node, in no particular pk order
+        for mac, ip in (('00:00:00:00:00:01', '10.0.0.2'), ('00:00:00:00:00:02', '::1'),
+                        ('00:00:00:00:00:03', '10.0.0.2'), ('00:00:00:00:00:04', None),
+                        ('00:00:00:00:00:05', '10.0.0.10'), ('00:00:00:00:00:06', '10.0.0.2'),
+                        ('00:00:00:00:00:07', '9.255.255.255')):
+            Node.objects.create(MacAddress=mac, IpAddress=ip)
+        self.ordered = list(Node.objects.order_by('IpSortKey', 'pk').values_list('pk', flat=True))
+
+    def walk(self, limit):
+        pages = []
+        cursor = ''
+        while True:
+            page, cursor = node_page(Node.objects.all(), after=cursor, limit=limit)
+            pages.append([node.pk for node in page])
+            if cursor is None:
+                return pages
+
+    def test_order_is_numeric_with_ipv4_before_ipv6(self):
+        ips = [Node.objects.get(pk=pk).IpAddress for pk in self.ordered]
+        self.assertEqual(ips, [None, '::1', '9.255.255.255', '10.0.0.2', '10.0.0.2', '10.0.0.2', '10.0.0.10'])
+
+    def test_pages_split_equal_keys_without_gaps_or_repeats(self):
+        for limit in range(1, 9):
+            with self.subTest(limit=limit):
+                pages = self.walk(limit)
+                self.assertEqual([pk for page in pages for pk in page], self.ordered)
+                self.assertTrue(all(len(page) == limit for page in pages[:-1]))
+
+    def test_full_last_page_has_no_cursor(self):
+        page, cursor = node_page(Node.objects.all(), limit=len(self.ordered))
+        self.assertEqual((len(page), cursor), (len(self.ordered), None))
+        page, cursor = node_page(Node.objects.all(), limit=len(self.ordered) - 1)
+        self.assertEqual(cursor, encode_cursor(page[-1]))
+
+    def test_cursor_past_the_end_is_an_empty_page(self):
+        self.assertEqual(node_page(Node.objects.all(), after='f' * 32 + '.0'), ([], None))
+
+    def test_malformed_cursor_restarts_at_the_first_page(self):
+        for cursor in ('junk', '.', 'zz.1', '0a.', '0a.-1', 'a' * 33 + '.1'):
+            with self.subTest(cursor=cursor):
+                self.assertIsNone(decode_cursor(cursor))
+                page, _ = node_page(Node.objects.all(), after=cursor, limit=2)
+                self.assertEqual([node.pk for node in page], self.ordered[:2])
+
+
+class OuiIndexFileTests(SimpleTestCase):
+
+    def test_index_is_readable_by_other_users(self):
+        with tempfile.TemporaryDirectory() as directory:
+            csv_path = os.path.join(directory, 'vendors.csv')
+            with open(csv_path, 'w', encoding='utf-8') as fh:
+                fh.write('Mac Prefix,Vendor Name,Private,Block Type\n00:1B:21,Intel Corporate,false,MA-L\n')
+            old_umask = os.umask(0o022)
+            try:
+                index_path = build_oui_index(csv_path)
+            finally:
+                os.umask(old_umask)
+            self.assertEqual(stat.S_IMODE(os.stat(index_path).st_mode), 0o644)
+
+
+class OuiLookupTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.csv_path = os.path.join(directory.name, 'vendors.csv')
+        with open(self.csv_path, 'w', encoding='utf-8') as fh:
+            fh.write(
+                'Mac Prefix,Vendor Name,Private,Block Type\n'
+                '00:1B:C5,Large Block,false,MA-L\n'
+                '00:1B:C5:1,Medium Block,false,MA-M\n'
+                '00:1B:C5:00:0,Small Block,false,MA-S\n'
+            )
+        patcher = mock.patch.dict('MainApp.utils.oui._indexes', clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_longest_prefix_wins(self):
+        macs = {
+            '00:1b:c5:00:00:01': 'Small Block',
+            '00:1b:c5:00:10:00': 'Large Block',
+            '00:1b:c5:1a:bc:de': 'Medium Block',
+            '00:1b:c5:ff:ff:ff': 'Large Block',
+            '00:1b:c6:00:00:01': None,
+        }
+        self.assertEqual({mac: get_vendor_and_device_type(mac, self.csv_path)[0] for mac in macs}, macs)
+        batch = get_vendors_and_device_types(macs, self.csv_path)
+        self.assertEqual({mac: vendor for mac, (vendor, _) in batch.items()}, macs)
+
+    def test_every_stored_notation_is_looked_up(self):
+        for mac in ('001bc5000001', '001b.c500.0001', '00-1B-C5-00-00-01', mac_to_int('00:1b:c5:00:00:01')):
+            self.assertEqual(get_vendor_and_device_type(mac, self.csv_path)[0], 'Small Block', mac)
+            self.assertEqual(get_vendors_and_device_types([mac], self.csv_path)[mac][0], 'Small Block', mac)
+
+
+class LayoutTests(SimpleTestCase):
+
+    def graph(self):
+        import networkx as nx
+
+        G = nx.Graph()
+        for sw in ('sw1', 'sw2', 'sw3'):
+            G.add_node(sw, is_switch=True)
+        G.add_edges_from([('sw1', 'sw2'), ('sw2', 'sw3')], kind='inter_switch')
+        # a small ring group, a spiral-sized group and a device shared by two switches
+        for i in range(5):
+            G.add_edge('sw1', f'a{i}', kind='attached')
+        for i in range(60):
+            G.add_edge('sw2', f'b{i}', kind='attached')
+        G.add_edge('sw3', 'a0', kind='attached')
+        G.add_node('loose1')
+        G.add_node('loose2')
+        return G
+
+    def test_layout_is_deterministic_and_places_every_node(self):
+        import numpy as np
+
+        G = self.graph()
+        first, second = compute_layout(G), compute_layout(G)
+        self.assertEqual(first.nodes, second.nodes)
+        self.assertTrue((first.xy == second.xy).all())
+        self.assertTrue((first.is_switch == second.is_switch).all())
+
+        self.assertEqual(set(first.nodes), set(G.nodes))
+        self.assertEqual(first.xy.shape, (G.number_of_nodes(), 2))
+        self.assertEqual({first.nodes[i]: i for i in range(len(first.nodes))}, first.index)
+        self.assertTrue(np.isfinite(first.xy).all())
+        self.assertEqual(len(set(map(tuple, first.xy.tolist()))), G.number_of_nodes())
+        self.assertEqual(int(first.is_switch.sum()), 3)
+
+    def test_empty_and_switchless_graphs(self):
+        import networkx as nx
+        import numpy as np
+
+        self.assertEqual(compute_layout(nx.Graph()).xy.shape, (0, 2))
+        G = nx.Graph()
+        G.add_nodes_from(['x', 'y'])
+        layout = compute_layout(G)
+        self.assertEqual(layout.xy.shape, (2, 2))
+        self.assertTrue(np.isfinite(layout.xy).all())
+
+
+class DeviceTypeRuleTests(SimpleTestCase):
+
+    VENDORS = [
+        'Cisco Systems, Inc', 'Huawei Cisco joint venture', 'HP Inc.', 'Apple Dell reseller', 'Canon Inc.',
+        'MikroTik RouterBOARD', 'Palo Alto Networks', 'Acme Corp', 'Nobody', '', 'line\nbreak cisco',
+    ]
+
+    def test_compiled_rules_pick_the_first_matching_rule(self):
+        rules = [(r'inc\b', 'first'), *DEFAULT_VENDOR_TYPE_RULES, (r'^acme', 'acme'), (r'o', 'anything with o')]
+        matcher = compile_rules(rules)
+        for vendor in self.VENDORS:
+            m = matcher.match(vendor.lower())
+            one_by_one = next((i for i, (pattern, _) in enumerate(rules) if re.search(pattern, vendor.lower())), None)
+            self.assertEqual(int(m.lastgroup[1:]) if m else None, one_by_one, vendor)
+        self.assertIsNone(compile_rules([]))
+
+    def test_override_file_rules_come_first(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'rules.csv')
+        with open(path, 'w', encoding='utf-8') as fh:
+            fh.write('# site overrides\npattern,device_type\n\n'
+                     'cisco,core-switch\n# acme,ignored\nacme,camera\n,empty\n')
+        self.assertEqual(load_rules_file(path), [('cisco', 'core-switch'), ('acme', 'camera')])
+        self.assertEqual(load_rules_file(os.path.join(directory.name, 'missing.csv')), [])
+
+        self.addCleanup(reload_rules)
+        reload_rules(path)
+        self.assertEqual(classify_vendor('Cisco Systems, Inc'), 'core-switch')
+        self.assertEqual(classify_vendor('Acme Corp'), 'camera')
+        self.assertEqual(classify_vendor('Juniper Networks'), 'router/switch')
+
+
+class GraphJobCoalescingTests(TestCase):
+
+    def setUp(self):
+        self.project = _make_network().RelatedProject
+
+    def test_active_job_of_another_process_is_returned(self):
+        # queued by another server process: nothing in this process knows about it
+        active = GraphRenderJob.objects.create(project=self.project)
+        with mock.patch('MainApp.jobs._get_dispatcher') as dispatcher:
+            job, created = enqueue_graph_render(self.project)
+        self.assertEqual((job.pk, created), (active.pk, False))
+        dispatcher.assert_not_called()
+
+    def test_database_allows_one_active_job_per_project(self):
+        GraphRenderJob.objects.create(project=self.project)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            GraphRenderJob.objects.create(project=self.project, status=GraphRenderJob.STATUS_RUNNING)
+
+    @override_settings(GRAPH_JOB_TIMEOUT=60)
+    def test_stale_active_job_is_failed_and_replaced(self):
+        stale = GraphRenderJob.objects.create(project=self.project, status=GraphRenderJob.STATUS_RUNNING)
+        GraphRenderJob.objects.filter(pk=stale.pk).update(created_at=timezone.now() - timedelta(minutes=5))
+
+        with mock.patch('MainApp.jobs._get_dispatcher'), self.captureOnCommitCallbacks(execute=True):
+            job, created = enqueue_graph_render(self.project)
+
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, GraphRenderJob.STATUS_FAILED)
+        self.assertTrue(created)
+        self.assertNotEqual(job.pk, stale.pk)
+        self.assertEqual(expire_stale_jobs(self.project), 0)
+
+    @override_settings(GRAPH_JOB_TIMEOUT=60)
+    def test_status_of_a_stale_job_turns_failed(self):
+        stale = GraphRenderJob.objects.create(project=self.project)
+        GraphRenderJob.objects.filter(pk=stale.pk).update(created_at=timezone.now() - timedelta(minutes=5))
+        url = reverse('MainApp:project_graph_job', kwargs={'project_id': self.project.pk, 'job_id': stale.pk})
+        self.assertEqual(self.client.get(url).json()['status'], GraphRenderJob.STATUS_FAILED)
+
+
+class NodeAddressMigrationTests(TransactionTestCase):
+    migrate_from = [('MainApp', '0001_initial')]
+    migrate_to = [('MainApp', '0002_node_integer_addresses')]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        latest = executor.loader.graph.leaf_nodes('MainApp')
+        executor.migrate(self.migrate_from)
+        self.addCleanup(lambda: MigrationExecutor(connection).migrate(latest))
+        apps = executor.loader.project_state(self.migrate_from).apps
+        Node = apps.get_model('MainApp', 'Node')
+        Networks = apps.get_model('MainApp', 'Networks')
+        Project = apps.get_model('MainApp', 'Project')
+
+        network = Networks.objects.create(RelatedProject=Project.objects.create(Name='p'), NetworkName='n',
+                                          NetworkMask='10.0.0.0/24')
+        self.kept = Node.objects.create(MacAddress='00:11:22:33:44:55', IpAddress='10.0.0.1')
+        self.duplicate = Node.objects.create(MacAddress='0011.2233.4455', IpAddress='10.0.0.2')
+        self.bad_mac = Node.objects.create(MacAddress='incomplete', IpAddress=' 10.0.0.3 ')
+        self.bad_ip = Node.objects.create(MacAddress='00-11-22-33-44-66', IpAddress='10.0.0.300')
+        network.Nodes.add(self.duplicate)
+
+    def migrate(self):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(self.migrate_to)
+        return executor.loader.project_state(self.migrate_to).apps
+
+    def test_addresses_are_converted(self):
+        with self.assertLogs('MainApp.migrations.0002_node_integer_addresses', 'WARNING') as logs:
+            apps = self.migrate()
+        Node = apps.get_model('MainApp', 'Node')
+        rows = {pk: (mac, str(ip) if ip else ip, key)
+                for pk, mac, ip, key in Node.objects.values_list('pk', 'MacInt', 'IpAddress', 'IpSortKey')}
+
+        self.assertEqual(rows, {
+            self.kept.pk: (0x001122334455, '10.0.0.1', '00000000000000000000ffff0a000001'),
+            self.bad_mac.pk: (None, '10.0.0.3', '00000000000000000000ffff0a000003'),
+            self.bad_ip.pk: (0x001122334466, None, ''),
+        })
+        # the duplicate's network membership moved to the surviving node
+        self.assertEqual(list(apps.get_model('MainApp', 'Networks').Nodes.through.objects
+                              .values_list('node_id', flat=True)), [self.kept.pk])
+        self.assertEqual(len(logs.records), 3)
+        self.assertIn("'incomplete'", logs.output[0])
+        self.assertIn("'10.0.0.300'", logs.output[1])
+        self.assertIn('1 unparsable MACs dropped, 1 invalid IPs set to NULL, 1 duplicate nodes merged',
+                      logs.output[2])
+
+
+class ImportArpCommandTests(TestCase):
+
+    def test_verbose_output_counts_each_source(self):
+        network = _make_network()
+        with tempfile.TemporaryDirectory() as directory:
+            paths = []
+            for name, text in (('a.txt', ARP_TEXT), ('b.txt', ARP_TEXT.splitlines(keepends=True)[0])):
+                paths.append(os.path.join(directory, name))
+                with open(paths[-1], 'w', encoding='utf-8') as fh:
+                    fh.write(text)
+            out = io.StringIO()
+            call_command('import_arp', *paths, network_id=network.pk, jobs=1, verbosity=2, stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[:2], [
+            f"{paths[0]}: 1 tables, 2 lines, 2 entries (0 broadcast skipped)",
+            f"{paths[1]}: 1 tables, 1 lines, 1 entries (0 broadcast skipped)",
+        ])
+        self.assertIn("Imported 2 sources", lines[2])
+
+    def test_repeated_network_in_a_source_is_one_scan(self):
+        network = _make_network()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'dump.txt')
+            with open(path, 'w', encoding='utf-8') as fh:
+                fh.write("@network net\n" + ARP_TEXT + "@network net\n" + ARP_TEXT)
+            call_command('import_arp', path, project_id=network.RelatedProject_id, jobs=1, stdout=io.StringIO())
+        self.assertEqual(Scan.objects.filter(network=network).count(), 1)
+        self.assertEqual(Observation.objects.filter(network=network).count(), 2)
+
+
+class ProjectSummaryTests(TestCase):
+
+    def test_network_counts_come_from_the_counters(self):
+        network = _make_network()
+        ArpTableCreateNodesView().parse_and_create_nodes_diagnostic(ARP_TEXT, network)
+        summary = compute_project_summary(network.RelatedProject_id)
+        self.assertEqual([row['NumberOfNodes'] for row in summary['networks']], [2])
+        self.assertEqual((summary['network_count'], summary['attached_count'], summary['node_count']), (1, 2, 2))
+
+        # a drifted counter shows until reconcile_counters repairs it
+        Networks.objects.filter(pk=network.pk).update(NumberOfNodes=5)
+        self.assertEqual(compute_project_summary(network.RelatedProject_id)['attached_count'], 5)
+        self.assertEqual(reconcile_counters(), (1, 0))
+        self.assertEqual(compute_project_summary(network.RelatedProject_id)['attached_count'], 2)
+
+
+class CounterSignalTests(TestCase):
+
+    def setUp(self):
+        self.project = Project.objects.create(Name='counters')
+        self.a, self.b = (Networks.objects.create(RelatedProject=self.project, NetworkName=name, NetworkMask=mask)
+                          for name, mask in (('a', '10.0.1.0/24'), ('b', '10.0.2.0/24')))
+        self.n1, self.n2, self.n3 = (Node.objects.create(MacAddress=f'00:00:00:00:04:0{i}', IpAddress=f'10.0.1.{i}')
+                                     for i in (1, 2, 3))
+        self.a.Nodes.add(self.n1, self.n2)
+        self.b.Nodes.add(self.n1)
+
+    def counts(self):
+        networks = dict(self.project.networks.values_list('NetworkName', 'NumberOfNodes'))
+        project = Project.objects.values_list('NumberOfNetworks', 'NumberOfNodes').get(pk=self.project.pk)
+        return networks, project
+
+    def test_add(self):
+        self.assertEqual(self.counts(), ({'a': 2, 'b': 1}, (2, 3)))
+        self.n3.networks_set.add(self.a, self.b)
+        self.assertEqual(self.counts(), ({'a': 3, 'b': 2}, (2, 5)))
+
+    def test_node_delete(self):
+        self.n1.delete()
+        self.assertEqual(self.counts(), ({'a': 1, 'b': 0}, (2, 1)))
+        self.assertEqual(reconcile_counters([self.project]), (0, 0))
+
+    def test_network_delete(self):
+        self.a.delete()
+        self.assertEqual(self.counts(), ({'b': 1}, (1, 1)))
+        self.assertEqual(reconcile_counters([self.project]), (0, 0))
+
+    def test_remove(self):
+        # a node that is not attached is not subtracted
+        self.a.Nodes.remove(self.n2, self.n3)
+        self.assertEqual(self.counts(), ({'a': 1, 'b': 1}, (2, 2)))
+        self.n1.networks_set.remove(self.b)
+        self.assertEqual(self.counts(), ({'a': 1, 'b': 0}, (2, 1)))
+        self.assertEqual(reconcile_counters([self.project]), (0, 0))
+
+    def test_clear(self):
+        self.n1.networks_set.clear()
+        self.assertEqual(self.counts(), ({'a': 1, 'b': 0}, (2, 1)))
+        self.a.Nodes.clear()
+        self.assertEqual(self.counts(), ({'a': 0, 'b': 0}, (2, 0)))
+        self.assertEqual(reconcile_counters([self.project]), (0, 0))
+
+    def test_add_network_nodes_is_one_update_per_table(self):
+        other = Networks.objects.create(RelatedProject=Project.objects.create(Name='other'), NetworkName='c')
+        with self.assertNumQueries(3):
+            add_network_nodes({self.a.pk: 2, self.b.pk: -1, other.pk: 4, 0: 7})
+        self.assertEqual(self.counts(), ({'a': 4, 'b': 0}, (2, 4)))
+        other.refresh_from_db()
+        self.assertEqual((other.NumberOfNodes, other.RelatedProject.NumberOfNodes), (4, 4))
+        with self.assertNumQueries(0):
+            add_network_nodes({self.a.pk: 0})
+
+
+class RenderTimingTests(SimpleTestCase):
+
+    def stage_count(self, stage):
+        # _count sample of the stage's series
+        prefix = f'arp_stage_seconds_count{{stage="{stage}"}} '
+        return next((int(line[len(prefix):]) for line in REGISTRY.render().splitlines() if line.startswith(prefix)), 0)
+
+    def test_worker_returns_its_stage_timings(self):
+        import networkx as nx
+
+        from .rendering import render_project_graph_png_timed
+
+        G = nx.Graph()
+        G.add_node('sw_1', label='net', is_switch=True, network_pk=1)
+        G.add_node(1, label='10.0.0.1', Type='pc', is_switch=False)
+        G.add_edge(1, 'sw_1', kind='attached')
+        png, stages = render_project_graph_png_timed(G)
+        self.assertTrue(png.startswith(b'\x89PNG'))
+        self.assertEqual([stage for stage, _ in stages], ['layout'])
+
+    def test_pool_render_records_worker_stages_in_the_parent(self):
+        done = Future()
+        done.set_result((b'png', [('layout', 0.25)]))
+        before = self.stage_count('layout')
+        with mock.patch('MainApp.jobs._get_process_pool') as pool:
+            pool.return_value.submit.return_value = done
+            self.assertEqual(_render(object()), b'png')
+        self.assertEqual(self.stage_count('layout'), before + 1)
+
+
+_SAMPLE = re.compile(r'([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{((?:[a-zA-Z_]\w*="(?:[^"\\\n]|\\[\\n"])*",?)*)\})? (\S+)')
+_LABEL = re.compile(r'([a-zA-Z_]\w*)="((?:[^"\\\n]|\\[\\n"])*)"')
+
+
+def _parse_prometheus(text):
+    """
+    ``{(name, labels): value}`` from Prometheus text format 0.0.4, failing on
+    anything malformed: samples must follow the HELP and TYPE of their metric.
+    """
+    samples = {}
+    types = {}
+    current = None
+    assert text.endswith('\n')
+    for line in text[:-1].split('\n'):
+        if line.startswith('# HELP '):
+            current = line.split(' ')[2]
+            continue
+        if line.startswith('# TYPE '):
+            _, _, name, kind = line.split(' ')
+            assert name == current and kind in ('counter', 'histogram'), line
+            types[name] = kind
+            continue
+        m = _SAMPLE.fullmatch(line)
+        assert m, line
+        name, labels, value = m.groups()
+        suffixes = ('_bucket', '_sum', '_count') if types.get(current) == 'histogram' else ('',)
+        assert name in {current + suffix for suffix in suffixes}, line
+        samples[name, tuple(_LABEL.findall(labels or ''))] = float(value)
+    return samples
+
+
+class MetricsTests(TestCase):
+
+    def series(self, name, **labels):
+        """Value of the sample whose labels include ``labels``, 0 when absent."""
+        wanted = set(labels.items())
+        return next((value for (sample, sample_labels), value in _parse_prometheus(REGISTRY.render()).items()
+                     if sample == name and wanted <= {(k, v) for k, v in sample_labels}), 0)
+
+    def test_metrics_view_serves_prometheus_text(self):
+        project = _make_network().RelatedProject
+        self.client.get(reverse('MainApp:project_graph_json', kwargs={'project_id': project.pk}))
+        response = self.client.get(reverse('MainApp:metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        samples = _parse_prometheus(response.content.decode('utf-8'))
+        names = {name for name, _ in samples}
+        self.assertTrue({'arp_requests_total', 'arp_request_seconds_bucket', 'arp_request_queries_count'} <= names)
+
+        # histogram buckets are cumulative and end at the count
+        for (name, labels), value in samples.items():
+            if not name.endswith('_count'):
+                continue
+            base = name[:-len('_count')]
+            buckets = [v for (n, l), v in samples.items() if n == f'{base}_bucket' and
+                       [pair for pair in l if pair[0] != 'le'] == list(labels)]
+            self.assertEqual(buckets, sorted(buckets))
+            self.assertEqual(buckets[-1], value)
+
+    def test_label_values_are_escaped(self):
+        from .metrics import Registry
+
+        registry = Registry()
+        registry.counter('test_total', "Test.", labelnames=('name',)).inc(name='a "b"\\c\nd')
+        self.assertEqual(_parse_prometheus(registry.render()),
+                         {('test_total', (('name', 'a \\"b\\"\\\\c\\nd'),)): 1.0})
+
+    def test_middleware_records_queries_and_status(self):
+        project = _make_network().RelatedProject
+        view = 'MainApp:project_graph_json'
+        url = reverse(view, kwargs={'project_id': project.pk})
+        before = (self.series('arp_requests_total', view=view, method='GET', status='200'),
+                  self.series('arp_request_queries_count', view=view, method='GET'),
+                  self.series('arp_request_queries_sum', view=view, method='GET'))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        after = (self.series('arp_requests_total', view=view, method='GET', status='200'),
+                 self.series('arp_request_queries_count', view=view, method='GET'),
+                 self.series('arp_request_queries_sum', view=view, method='GET'))
+        self.assertGreater(len(queries), 0)
+        self.assertEqual([b - a for a, b in zip(before, after)], [1, 1, len(queries)])
+
+        missing = self.series('arp_requests_total', view=view, method='GET', status='404')
+        self.client.get(reverse(view, kwargs={'project_id': project.pk + 1000}))
+        self.assertEqual(self.series('arp_requests_total', view=view, method='GET', status='404'), missing + 1)
+
+        unresolved = self.series('arp_requests_total', view='unresolved', method='GET', status='404')
+        self.client.get('/no/such/page/')
+        self.assertEqual(self.series('arp_requests_total', view='unresolved', method='GET', status='404'),
+                         unresolved + 1)
+
+
+@skipUnless(connection.vendor == 'postgresql', "COPY merge needs PostgreSQL (ARP_DATABASE=postgresql)")
+class CopyMergeTests(TestCase):
+    LATEST_IP = {
+        # new, known vendor
+        '00:00:00:00:03:01': '10.0.0.1',
+        # new, unknown vendor
+        '00:00:00:00:03:02': '10.0.0.2',
+        # existing: new IP, empty vendor and type keep the stored ones
+        '00:00:00:00:03:03': '10.0.0.30',
+        # existing: same IP, new vendor
+        '00:00:00:00:03:04': '10.0.0.4',
+        # existing, IPv6
+        '00:00:00:00:03:05': 'fe80::1',
+    }
+    VENDOR_TYPES = {
+        '00:00:00:00:03:01': ('Cisco Systems, Inc', 'router'),
+        '00:00:00:00:03:02': (None, 'unknown'),
+        '00:00:00:00:03:03': ('', ''),
+        '00:00:00:00:03:04': ('Intel Corporate', 'pc'),
+        '00:00:00:00:03:05': (None, ''),
+    }
+
+    def setUp(self):
+        for mac, ip, vendor, node_type in (('00:00:00:00:03:03', '10.0.0.3', 'Acme', 'printer'),
+                                           ('00:00:00:00:03:04', '10.0.0.4', '', None),
+                                           ('00:00:00:00:03:05', '10.0.0.5', 'Acme', 'pc')):
+            Node.objects.create(MacAddress=mac, IpAddress=ip, Vendor=vendor, Type=node_type)
+
+    def merged_with(self, upsert):
+        # each path runs on the same starting rows and is rolled back afterwards
+        with transaction.atomic():
+            nodes, created = upsert()
+            returned = {mac: (node.MacInt, str(node.IpAddress), node.IpSortKey, node.Vendor, node.Type)
+                        for mac, node in nodes.items()}
+            stored = sorted(Node.objects.values_list('MacInt', 'IpAddress', 'IpSortKey', 'Vendor', 'Type'))
+            transaction.set_rollback(True)
+        return returned, set(created), stored
+
+    def test_copy_merge_matches_the_orm_path(self):
+        def orm():
+            existing = _existing_nodes_by_mac(self.LATEST_IP)
+            created = _upsert_nodes(existing, self.LATEST_IP, self.VENDOR_TYPES)
+            return existing, created
+
+        expected = self.merged_with(orm)
+        self.assertEqual(self.merged_with(lambda: copy_merge_nodes(self.LATEST_IP, self.VENDOR_TYPES)), expected)
+        self.assertEqual(expected[1], {'00:00:00:00:03:01', '00:00:00:00:03:02'})
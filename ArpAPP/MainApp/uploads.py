@@ -0,0 +1,197 @@
+import logging
+import time
+
+from django.db import transaction
+
+from .history import start_scan
+from .ingest import bulk_ingest_entries
+from .parsing import ParseStats, is_broadcast_or_multicast, iter_tables, parse_arp_lines
+from .subnets import SubnetIndex
+
+logger = logging.getLogger(__name__)
+
+# entries written per transaction; bounds both memory and lock time
+INGEST_BATCH_SIZE = 5000
+
+
+def _table_diag(tag):
+    return {
+        'network': tag,
+        'network_id': None,
+        'lines_total': 0,
+        'iface_detected_count': 0,
+        'parsed_entries_count': 0,
+        'entries_skipped_broadcast': 0,
+        'entries_skipped_invalid': 0,
+        'nodes_new_count': 0,
+        'nodes_attached_count': 0,
+        'batches_committed': 0,
+        'formats': {},
+        'samples': [],
+        'errors': [],
+    }
+
+
+def resolve_network_tags(project):
+    """``@network`` tags may be a network pk or its name; pks win on conflicts."""
+    networks = list(project.networks.order_by('pk'))
+    by_tag = {}
+    for network in networks:
+        if network.NetworkName:
+            by_tag.setdefault(network.NetworkName, network)
+    for network in networks:
+        by_tag[str(network.pk)] = network
+    return by_tag
+
+
+def _commit_batch(network, batch, diag, scans):
+    """
+    Write ``batch`` in its own transaction, recording it in the upload's
+    scan of ``network`` (``scans`` maps network pks to them). The scan is
+    started with the first batch that commits, so a network whose tables
+    were empty or failed gets no empty scan that would read as everything
+    removed.
+    """
+    scan = scans.get(network.pk)
+    try:
+        with transaction.atomic():
+            if scan is None:
+                scan = start_scan(network, 'upload')
+            bulk_ingest_entries(network, batch, diag, scan=scan)
+        scans[network.pk] = scan
+        diag['scan_id'] = scan.pk
+        diag['batches_committed'] += 1
+    except Exception as e:
+        diag['errors'].append(f"batch of {len(batch)} entries failed: {e}")
+        logger.exception("Bulk ingest batch for network %s failed", network.pk)
+
+
+def _ingest_table(network, lines, diag, batch_size, scans):
+    stats = ParseStats()
+    batch = []
+    try:
+        for entry in parse_arp_lines(lines, stats=stats):
+            if is_broadcast_or_multicast(entry.mac):
+                diag['entries_skipped_broadcast'] += 1
+                continue
+            batch.append((entry.ip, entry.mac, entry.interface))
+            if len(batch) >= batch_size:
+                _commit_batch(network, batch, diag, scans)
+                batch = []
+    finally:
+        # what was parsed before a broken stream is still written
+        if batch:
+            _commit_batch(network, batch, diag, scans)
+        diag['lines_total'] = stats.lines_total
+        diag['iface_detected_count'] = stats.iface_detected_count
+        diag['parsed_entries_count'] = stats.parsed_entries_count
+        diag['formats'] = dict(stats.formats)
+        diag['samples'] = stats.samples
+
+
+def ingest_tables(project, lines, batch_size=INGEST_BATCH_SIZE):
+    """
+    Ingest a multi-table upload (see ``iter_tables``) into ``project``'s
+    networks while ``lines`` is being read. Entries are written in
+    transactions of ``batch_size``, so memory and lock time stay bounded no
+    matter how large the upload is. Returns a summary with one diagnostics
+    dict per table; a stream that breaks off is reported in ``errors`` after
+    everything before it has been written. Every network gets one scan per
+    upload, however many tables name it.
+    """
+    started = time.perf_counter()
+    networks = resolve_network_tags(project)
+    summary = {'tables': [], 'errors': []}
+    scans = {}
+
+    try:
+        for tag, table_lines in iter_tables(lines):
+            diag = _table_diag(tag)
+            network = networks.get(tag)
+            if network is None:
+                counts = [0, 0]
+                for line in table_lines:
+                    counts[0] += 1
+                    counts[1] += bool(line.strip())
+                if tag is None and not counts[1]:
+                    continue
+                diag['lines_total'] = counts[0]
+                diag['errors'].append("no @network line before this table" if tag is None
+                                      else f"unknown network {tag!r} in project {project.pk}")
+                summary['tables'].append(diag)
+            else:
+                diag['network_id'] = network.pk
+                summary['tables'].append(diag)
+                _ingest_table(network, table_lines, diag, batch_size, scans)
+    except Exception as e:
+        summary['errors'].append(f"upload aborted: {e}")
+        logger.exception("Bulk ingest upload for project %s aborted", project.pk)
+
+    summary['lines_total'] = sum(diag['lines_total'] for diag in summary['tables'])
+    summary['entries_total'] = sum(diag['parsed_entries_count'] for diag in summary['tables'])
+    summary['elapsed_s'] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+def ingest_by_subnet(project, lines, batch_size=INGEST_BATCH_SIZE):
+    """
+    Ingest untagged dumps into ``project``, sending every entry to the most
+    specific network whose ``NetworkMask`` contains its IP (see
+    ``SubnetIndex``), so one router dump fills all networks in a single pass.
+    Entries are written per network in transactions of up to ``batch_size``.
+    Returns a summary with one diagnostics dict per network that received
+    entries; entries outside every subnet are counted in ``entries_unassigned``.
+    """
+    started = time.perf_counter()
+    index = SubnetIndex(project.networks.order_by('pk'))
+    summary = {
+        'tables': [],
+        'errors': [f"network {network.pk} has no usable subnet mask {network.NetworkMask!r}"
+                   for network in index.invalid],
+        'entries_unassigned': 0,
+        'unassigned_samples': [],
+    }
+    stats = ParseStats()
+    diags = {}
+    scans = {}
+    pending = {}
+    pending_count = 0
+
+    def flush():
+        for network, batch in pending.values():
+            _commit_batch(network, batch, diags[network.pk], scans)
+        pending.clear()
+
+    try:
+        for entry in parse_arp_lines(lines, stats=stats):
+            network = index.lookup(entry.ip)
+            if network is None:
+                summary['entries_unassigned'] += 1
+                if len(summary['unassigned_samples']) < stats.max_samples:
+                    summary['unassigned_samples'].append(entry.raw)
+                continue
+            diag = diags.get(network.pk)
+            if diag is None:
+                diag = diags[network.pk] = _table_diag(network.NetworkName)
+                diag['network_id'] = network.pk
+                summary['tables'].append(diag)
+            diag['parsed_entries_count'] += 1
+            if is_broadcast_or_multicast(entry.mac):
+                diag['entries_skipped_broadcast'] += 1
+                continue
+            pending.setdefault(network.pk, (network, []))[1].append((entry.ip, entry.mac, entry.interface))
+            pending_count += 1
+            if pending_count >= batch_size:
+                flush()
+                pending_count = 0
+    except Exception as e:
+        summary['errors'].append(f"upload aborted: {e}")
+        logger.exception("Subnet ingest for project %s aborted", project.pk)
+    finally:
+        flush()
+
+    summary['lines_total'] = stats.lines_total
+    summary['entries_total'] = stats.parsed_entries_count
+    summary['formats'] = dict(stats.formats)
+    summary['elapsed_s'] = round(time.perf_counter() - started, 3)
+    return summary
@@ -2,9 +2,11 @@ from django.urls import path
 
 from MainApp import views
 from MainApp.views import ProjectView, ProjectCreateView, ProjectDetailView, NetworksCreateView, \
-    ProjectNetworksListView, GenerateProjectGraphView
+    ProjectNetworksListView, GenerateProjectGraphView, GraphRenderJobStatusView, \
+    ProjectGraphExportView
 
-from .views import ArpTableCreateNodesView, ProjectNetworksNodesListView
+from .views import ArpTableCreateNodesView, ArpBulkIngestView, MetricsView, NetworkScanDiffView, \
+    NetworkScanListView, ProjectArpTableView, ProjectNetworksNodesListView
 
 app_name = "MainApp"
 
@@ -20,5 +22,13 @@ path(
     ProjectNetworksNodesListView.as_view(),
     name='project_network_nodes_list'
 ),
+path('project/<int:project_id>/network/<int:network_id>/scans/', NetworkScanListView.as_view(), name='network_scans'),
+path('project/<int:project_id>/network/<int:network_id>/scans/diff/', NetworkScanDiffView.as_view(), name='network_scan_diff'),
+path('project/<int:project_id>/parse-arp/', ProjectArpTableView.as_view(), name='project_parse_arp'),
+path('project/<int:project_id>/ingest/', ArpBulkIngestView.as_view(), name='project_bulk_ingest'),
 path('project/<int:project_id>/graph/generate/', GenerateProjectGraphView.as_view(), name='project_graph_generate'),
+path('project/<int:project_id>/graph/export.json', ProjectGraphExportView.as_view(export_format='json'), name='project_graph_json'),
+path('project/<int:project_id>/graph/export.svg', ProjectGraphExportView.as_view(export_format='svg'), name='project_graph_svg'),
+path('project/<int:project_id>/graph/jobs/<int:job_id>/', GraphRenderJobStatusView.as_view(), name='project_graph_job'),
+path('metrics', MetricsView.as_view(), name='metrics'),
 ]
\ No newline at end of file
@@ -0,0 +1,102 @@
+import csv
+import os
+import re
+from functools import lru_cache
+
+
+# Extra rules for ops, checked before the built-in ones. CSV with a
+# ``pattern,device_type`` header; patterns are regexes matched against the
+# lower-cased vendor name, lines starting with '#' are ignored.
+VENDOR_TYPE_RULES_PATH = os.environ.get(
+    'VENDOR_TYPE_RULES_FILE',
+    os.path.join(os.path.dirname(__file__), '..', 'data', 'vendor-type-rules.csv'),
+)
+
+DEFAULT_VENDOR_TYPE_RULES = [
+
+    (r'cisco', 'router/switch'),
+    (r'juniper', 'router/switch'),
+    (r'huawei', 'router/switch'),
+    (r'hpe|hewlett-packard', 'switch/router'),
+    (r'aruba', 'access-point/switch'),
+    (r'ubiquiti', 'access-point/switch'),
+    (r'mikrotik', 'router'),
+    (r'tp-link|tplink', 'router'),
+    (r'netgear', 'router'),
+    (r'd-link|dlink', 'router'),
+    (r'linksys', 'router'),
+    (r'apple', 'client'),
+    (r'samsung', 'client'),
+    (r'google', 'client'),
+    (r'acer|lenovo|dell|hp ', 'client'),
+    (r'xero[xq]|xerox', 'printer'),
+    (r'epson', 'printer'),
+    (r'brother', 'printer'),
+    (r'cannon|canon', 'printer'),
+    (r'fortinet|fortigate', 'firewall'),
+    (r'palo alto', 'firewall'),
+    (r'checkpoint', 'firewall'),
+    (r'sony', 'client'),
+    (r'ricoh', 'printer'),
+    (r'routerboard', 'router')
+
+]
+
+_FALLBACK_CLIENT = re.compile(r'\b(inc|ltd|corp|computer|electronics|systems|technologies)\b')
+
+_matcher = None
+_rule_types = []
+
+
+def load_rules_file(path):
+    rules = []
+    if not path or not os.path.exists(path):
+        return rules
+    with open(path, newline='', encoding='utf-8') as fh:
+        rows = (line for line in fh if line.strip() and not line.lstrip().startswith('#'))
+        for row in csv.DictReader(rows):
+            pattern = (row.get('pattern') or '').strip()
+            dtype = (row.get('device_type') or '').strip()
+            if pattern and dtype:
+                rules.append((pattern, dtype))
+    return rules
+
+
+def compile_rules(rules):
+    """
+    Fold the ordered rule list into one regex. Every alternative is an anchored
+    lookahead followed by an empty named group, so the alternation is tried in
+    list order and ``lastgroup`` names the first rule that matches anywhere in
+    the vendor string, exactly like checking the rules one by one.
+    """
+    parts = ['(?=.*?(?:%s))(?P<r%d>)' % (pattern, i) for i, (pattern, _) in enumerate(rules)]
+    return re.compile(r'\A(?:%s)' % '|'.join(parts), re.DOTALL) if parts else None
+
+
+def set_rules(rules):
+    global _matcher, _rule_types
+    rules = list(rules)
+    _matcher = compile_rules(rules)
+    _rule_types = [dtype for _, dtype in rules]
+    classify_vendor.cache_clear()
+
+
+def reload_rules(path=None):
+    """(Re)build the matcher from the override file plus the built-in rules."""
+    set_rules(load_rules_file(path or VENDOR_TYPE_RULES_PATH) + DEFAULT_VENDOR_TYPE_RULES)
+
+
+@lru_cache(maxsize=65536)
+def classify_vendor(vendor):
+    """Device type for a vendor name; memoized per vendor, of which there are only a few thousand."""
+    if not vendor:
+        return 'unknown'
+    if _matcher is None:
+        reload_rules()
+    v = vendor.lower()
+    m = _matcher.match(v) if _matcher is not None else None
+    if m:
+        return _rule_types[int(m.lastgroup[1:])]
+    if _FALLBACK_CLIENT.search(v):
+        return 'client'
+    return 'unknown'
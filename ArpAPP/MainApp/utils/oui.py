@@ -1,133 +1,322 @@
-
+import bisect
 import csv
+import mmap
 import os
 import re
-from functools import lru_cache
-
+import struct
+import tempfile
 
-OUI_CSV_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'mac-vendors-export.csv')
+from MainApp.addresses import mac_to_int
+from MainApp.utils.device_types import classify_vendor
 
-_oui_map = None
 
-def _normalize_oui(oui_raw: str) -> str:
+OUI_CSV_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'mac-vendors-export.csv')
+OUI_INDEX_SUFFIX = '.idx'
 
-    if not oui_raw:
-        return ''
-    parts = re.split(r'[^0-9A-Fa-f]+', oui_raw)
-    parts = [p.zfill(2).lower() for p in parts if p != '']
-    if len(parts) == 3:
-        return ':'.join(parts)
+# Index layout (native byte order, every array 8-byte aligned):
+#   header | table descriptors | per table: sorted keys, vendor ids | vendor offsets | vendor utf-8 blob
+_INDEX_MAGIC = b'OUIX'
+_INDEX_VERSION = 2
+_BYTE_ORDER_MARK = 0x0102
+_HEADER = struct.Struct('=4sHHII')
+_HEADER_EXTRA = struct.Struct('=I')
+_TABLE = struct.Struct('=HHIII')
 
-    s = re.sub(r'[^0-9A-Fa-f]', '', oui_raw)
-    if len(s) >= 6:
-        s = s[:6]
-        return ':'.join([s[i:i+2].lower() for i in range(0, 6, 2)])
-    return oui_raw.lower()
+_indexes = {}
 
-def load_oui_csv(path: str = None):
 
-    global _oui_map
-    if _oui_map is not None:
-        return _oui_map
+def _resolve_csv_path(path: str = None):
     path = path or OUI_CSV_PATH
-    mapping = {}
     if not os.path.exists(path):
 
         alt = "/mnt/data/mac-vendors-export.csv"
         if os.path.exists(alt):
-            path = alt
-        else:
+            return alt
+        return None
+    return path
 
-            _oui_map = mapping
-            return mapping
 
+def _iter_csv_rows(path):
+    """Yield (raw_prefix, vendor, block_type) for every row of the vendor export."""
     with open(path, newline='', encoding='utf-8', errors='replace') as fh:
-        reader = csv.DictReader(fh)
+        reader = csv.reader(fh)
+        fieldnames = next(reader, None) or []
 
-        prefix_key = None
-        vendor_key = None
-        headers = [h.lower() for h in reader.fieldnames or []]
-        for h in headers:
+        prefix_idx = None
+        vendor_idx = None
+        block_idx = None
+        headers = [h.lower() for h in fieldnames]
+        for i, h in enumerate(headers):
             if 'mac' in h and ('prefix' in h or 'oui' in h):
-                prefix_key = h
+                prefix_idx = i
             if 'vendor' in h or 'organization' in h or 'company' in h:
-                vendor_key = h
+                vendor_idx = i
+            if 'block' in h:
+                block_idx = i
 
-        if not prefix_key:
-            prefix_key = reader.fieldnames[0]
-        if not vendor_key:
-            vendor_key = reader.fieldnames[1] if len(reader.fieldnames) > 1 else reader.fieldnames[0]
+        if prefix_idx is None:
+            prefix_idx = 0
+        if vendor_idx is None:
+            vendor_idx = 1 if len(fieldnames) > 1 else 0
 
         for row in reader:
-            raw_prefix = row.get(prefix_key, '') if prefix_key in row else row.get(reader.fieldnames[0], '')
-            vendor = (row.get(vendor_key, '') if vendor_key in row else row.get(reader.fieldnames[1], '')).strip()
-            oui = _normalize_oui(raw_prefix)
-            if oui:
-                mapping[oui] = vendor
-
-    _oui_map = mapping
-    return mapping
-
-
-_VENDOR_TO_TYPE_RULES = [
-
-    (r'cisco', 'router/switch'),
-    (r'juniper', 'router/switch'),
-    (r'huawei', 'router/switch'),
-    (r'hpe|hewlett-packard', 'switch/router'),
-    (r'aruba', 'access-point/switch'),
-    (r'ubiquiti', 'access-point/switch'),
-    (r'mikrotik', 'router'),
-    (r'tp-link|tplink', 'router'),
-    (r'netgear', 'router'),
-    (r'd-link|dlink', 'router'),
-    (r'linksys', 'router'),
-    (r'apple', 'client'),
-    (r'samsung', 'client'),
-    (r'google', 'client'),
-    (r'acer|lenovo|dell|hp ', 'client'),
-    (r'xero[xq]|xerox', 'printer'),
-    (r'epson', 'printer'),
-    (r'brother', 'printer'),
-    (r'cannon|canon', 'printer'),
-    (r'fortinet|fortigate', 'firewall'),
-    (r'palo alto', 'firewall'),
-    (r'checkpoint', 'firewall'),
-    (r'sony', 'client'),
-    (r'ricoh', 'printer'),
-    (r'routerboard', 'router')
-
-]
-
-@lru_cache(maxsize=512)
+            if len(row) <= max(prefix_idx, vendor_idx):
+                continue
+            block = row[block_idx].strip() if block_idx is not None and block_idx < len(row) else ''
+            yield row[prefix_idx], row[vendor_idx].strip(), block
+
+
+def _align(offset, to=8):
+    return (offset + to - 1) // to * to
+
+
+def encode_oui_index(tables):
+    """
+    Serialize ``{prefix_bits: {prefix_int: vendor}}`` into the binary index format.
+    Vendor names are stored once and referenced by id from every table.
+    """
+    vendor_ids = {}
+    vendors = []
+    encoded_tables = []
+    for bits in sorted(tables, reverse=True):
+        entries = sorted(tables[bits].items())
+        keys = [k for k, _ in entries]
+        values = []
+        for _, vendor in entries:
+            vid = vendor_ids.get(vendor)
+            if vid is None:
+                vid = vendor_ids[vendor] = len(vendors)
+                vendors.append(vendor)
+            values.append(vid)
+        width = 4 if bits <= 32 else 8
+        encoded_tables.append((bits, width, keys, values))
+
+    offset = _align(_HEADER.size + _HEADER_EXTRA.size + _TABLE.size * len(encoded_tables))
+    descriptors = []
+    chunks = []
+    for bits, width, keys, values in encoded_tables:
+        keys_offset = offset
+        key_bytes = struct.pack('=%d%s' % (len(keys), 'I' if width == 4 else 'Q'), *keys)
+        offset = _align(offset + len(key_bytes))
+        values_offset = offset
+        value_bytes = struct.pack('=%dI' % len(values), *values)
+        offset = _align(offset + len(value_bytes))
+        descriptors.append(_TABLE.pack(bits, width, len(keys), keys_offset, values_offset))
+        chunks.append((keys_offset, key_bytes))
+        chunks.append((values_offset, value_bytes))
+
+    blob = bytearray()
+    string_offsets = [0]
+    for vendor in vendors:
+        blob += vendor.encode('utf-8')
+        string_offsets.append(len(blob))
+    vendors_offset = offset
+    chunks.append((vendors_offset, struct.pack('=%dI' % len(string_offsets), *string_offsets)))
+    chunks.append((vendors_offset + 4 * len(string_offsets), bytes(blob)))
+
+    out = bytearray(_HEADER.pack(_INDEX_MAGIC, _INDEX_VERSION, len(encoded_tables), len(vendors), vendors_offset))
+    out += _HEADER_EXTRA.pack(_BYTE_ORDER_MARK)
+    out += b''.join(descriptors)
+    for chunk_offset, data in chunks:
+        out += b'\0' * (chunk_offset - len(out))
+        out += data
+    return bytes(out)
+
+
+# IEEE registry block sizes; MA-M and MA-S blocks are carved out of MA-L ranges
+_BLOCK_PREFIX_BITS = {'ma-l': 24, 'ma-m': 28, 'ma-s': 36}
+
+
+def _prefix_key(raw_prefix: str, block_type: str = ''):
+    """Return (prefix_bits, prefix_int) for a registry prefix such as ``00:1B:C5:00:0``."""
+    digits = re.sub(r'[^0-9A-Fa-f]', '', raw_prefix or '')
+    bits = _BLOCK_PREFIX_BITS.get((block_type or '').strip().lower())
+    if bits is None:
+        bits = 36 if len(digits) >= 9 else 28 if len(digits) >= 7 else 24
+    nibbles = bits // 4
+    if len(digits) < nibbles:
+        return None
+    return bits, int(digits[:nibbles], 16)
+
+
+def _collect_prefix_tables(csv_path):
+    tables = {bits: {} for bits in _BLOCK_PREFIX_BITS.values()}
+    if csv_path is None:
+        return tables
+    for raw_prefix, vendor, block in _iter_csv_rows(csv_path):
+        key = _prefix_key(raw_prefix, block)
+        if key is not None:
+            tables[key[0]][key[1]] = vendor
+    return tables
+
+
+def default_index_path(csv_path: str = None):
+    return (csv_path or OUI_CSV_PATH) + OUI_INDEX_SUFFIX
+
+
+def _current_umask():
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+def build_oui_index(csv_path: str = None, index_path: str = None):
+    """Compile the vendor CSV into the mmap-able index file and return its path."""
+    index_path = index_path or default_index_path(csv_path)
+    data = encode_oui_index(_collect_prefix_tables(_resolve_csv_path(csv_path)))
+    directory = os.path.dirname(os.path.abspath(index_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.oui-', suffix=OUI_INDEX_SUFFIX)
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(data)
+        # mkstemp creates 0600; workers running as other users must be able to map the index
+        os.chmod(tmp_path, 0o644 & ~_current_umask())
+        # atomic so concurrent workers never map a half-written file
+        os.replace(tmp_path, index_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return index_path
+
+
+class OuiIndex:
+    """Read-only view over an encoded index; ``buf`` is an mmap or a bytes object."""
+
+    def __init__(self, buf):
+        self._buf = buf
+        view = memoryview(buf)
+        magic, version, table_count, vendor_count, vendors_offset = _HEADER.unpack_from(view, 0)
+        (bom,) = _HEADER_EXTRA.unpack_from(view, _HEADER.size)
+        if magic != _INDEX_MAGIC or version != _INDEX_VERSION or bom != _BYTE_ORDER_MARK:
+            raise ValueError("Unsupported OUI index")
+
+        self.tables = []
+        pos = _HEADER.size + _HEADER_EXTRA.size
+        for _ in range(table_count):
+            bits, width, count, keys_offset, values_offset = _TABLE.unpack_from(view, pos)
+            pos += _TABLE.size
+            keys = view[keys_offset:keys_offset + width * count].cast('I' if width == 4 else 'Q')
+            values = view[values_offset:values_offset + 4 * count].cast('I')
+            self.tables.append((bits, keys, values))
+        self.tables.sort(key=lambda t: t[0], reverse=True)
+
+        self._string_offsets = view[vendors_offset:vendors_offset + 4 * (vendor_count + 1)].cast('I')
+        self._blob = view[vendors_offset + 4 * (vendor_count + 1):]
+        self._vendors = {}
+
+    def __len__(self):
+        return sum(len(keys) for _, keys, _ in self.tables)
+
+    def vendor(self, vendor_id):
+        vendor = self._vendors.get(vendor_id)
+        if vendor is None:
+            start = self._string_offsets[vendor_id]
+            end = self._string_offsets[vendor_id + 1]
+            vendor = self._vendors[vendor_id] = str(self._blob[start:end], 'utf-8')
+        return vendor
+
+    def lookup(self, mac_int: int):
+        for bits, keys, values in self.tables:
+            key = mac_int >> (48 - bits)
+            i = bisect.bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                return self.vendor(values[i])
+        return None
+
+    def lookup_many(self, mac_ints):
+        """
+        Resolve many MACs at once. Queries are sorted so every table is walked
+        forward once, each bisect starting where the previous one stopped.
+        Returns ``{mac_int: vendor}`` with ``None`` for unknown prefixes.
+        """
+        pending = sorted(set(mac_ints))
+        found = {}
+        for bits, keys, values in self.tables:
+            shift = 48 - bits
+            lo = 0
+            remaining = []
+            for mac_int in pending:
+                key = mac_int >> shift
+                lo = bisect.bisect_left(keys, key, lo)
+                if lo < len(keys) and keys[lo] == key:
+                    found[mac_int] = self.vendor(values[lo])
+                else:
+                    remaining.append(mac_int)
+            pending = remaining
+        for mac_int in pending:
+            found[mac_int] = None
+        return found
+
+
+def _index_is_fresh(index_path, csv_path):
+    if not os.path.exists(index_path):
+        return False
+    if csv_path is not None and os.path.getmtime(csv_path) > os.path.getmtime(index_path):
+        return False
+    with open(index_path, 'rb') as fh:
+        header = fh.read(_HEADER.size + _HEADER_EXTRA.size)
+    if len(header) < _HEADER.size + _HEADER_EXTRA.size:
+        return False
+    magic, version = _HEADER.unpack_from(header)[:2]
+    (bom,) = _HEADER_EXTRA.unpack_from(header, _HEADER.size)
+    return magic == _INDEX_MAGIC and version == _INDEX_VERSION and bom == _BYTE_ORDER_MARK
+
+
+def load_oui_index(csv_path: str = None):
+    """
+    Map the compiled index for ``csv_path``, building it on first use when it is
+    missing or older than the CSV. Every worker maps the same file, so the
+    table lives once in the page cache instead of once per process.
+    """
+    index = _indexes.get(csv_path)
+    if index is not None:
+        return index
+
+    resolved = _resolve_csv_path(csv_path)
+    index_path = default_index_path(csv_path)
+    try:
+        if not _index_is_fresh(index_path, resolved):
+            build_oui_index(csv_path, index_path)
+        with open(index_path, 'rb') as fh:
+            index = OuiIndex(mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ))
+    except (OSError, ValueError):
+        # read-only checkout or foreign index file: keep a private in-memory copy
+        index = OuiIndex(encode_oui_index(_collect_prefix_tables(resolved)))
+
+    _indexes[csv_path] = index
+    return index
+
+
 def get_vendor_and_device_type(mac: str, csv_path: str = None):
 
     if not mac:
         return (None, 'unknown')
-    mac = mac.strip().lower()
-
-    parts = re.split(r'[^0-9a-fA-F]+', mac)
-    parts = [p.zfill(2).lower() for p in parts if p != '']
-    if len(parts) < 6:
+    mac_int = mac_to_int(mac)
+    if mac_int is None:
         # invalid mac
         return (None, 'unknown')
-    oui = ':'.join(parts[:3])
-    mapping = load_oui_csv(csv_path)
-
-    vendor = mapping.get(oui)
-    guessed = 'unknown'
-    if vendor:
-        v = vendor.lower()
-        for pattern, dtype in _VENDOR_TO_TYPE_RULES:
-            if re.search(pattern, v):
-                guessed = dtype
-                break
-
-        if guessed == 'unknown':
-            if re.search(r'\b(inc|ltd|corp|computer|electronics|systems|technologies)\b', v):
-                guessed = 'client'
-    else:
-
-        guessed = 'unknown'
-
-    return (vendor, guessed)
+
+    vendor = load_oui_index(csv_path).lookup(mac_int)
+    return (vendor, classify_vendor(vendor))
+
+
+def get_vendors_and_device_types(macs, csv_path: str = None):
+    """
+    Batch form of ``get_vendor_and_device_type``: ``{mac: (vendor, type)}`` for
+    every input MAC, given as text or as the integer of addresses.mac_to_int.
+    """
+    mac_ints = {}
+    result = {}
+    for mac in macs:
+        mac_int = mac_to_int(mac)
+        if mac_int is None:
+            result[mac] = (None, 'unknown')
+        else:
+            mac_ints[mac] = mac_int
+
+    vendors = load_oui_index(csv_path).lookup_many(mac_ints.values())
+    for mac, mac_int in mac_ints.items():
+        vendor = vendors[mac_int]
+        result[mac] = (vendor, classify_vendor(vendor))
+    return result
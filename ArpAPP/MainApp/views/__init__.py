@@ -0,0 +1,7 @@
+# Views are split by concern; graph views import the plotting stack on first use.
+from .arp import ArpBulkIngestView, ArpTableCreateNodesView, ProjectArpTableView, log_diag_summary
+from .graphs import GenerateProjectGraphView, GraphRenderJobStatusView, ProjectGraphExportView, graph_job_payload
+from .metrics import MetricsView
+from .projects import ProjectCreateView, ProjectDetailView, ProjectNetworksListView, ProjectNetworksNodesListView, \
+    ProjectView, NetworksCreateView
+from .scans import NetworkScanDiffView, NetworkScanListView
@@ -0,0 +1,207 @@
+import hmac
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404, render
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+
+from ..forms import ArpTableForm
+from ..history import start_scan
+from ..ingest import bulk_ingest_entries
+from ..metrics import Sampler, count_items, timed
+from ..models import Networks, Project
+from ..parsing import ParseStats, UnsupportedEncoding, is_broadcast_or_multicast, iter_stream_lines, iter_text_lines, \
+    normalize_mac, open_decoded_stream, parse_arp_lines
+from ..uploads import ingest_by_subnet, ingest_tables
+
+logger = logging.getLogger(__name__)
+
+# one pasted-text preview per this many POSTs when DEBUG logging is on
+DEBUG_SAMPLE_EVERY = getattr(settings, 'ARP_DEBUG_SAMPLE_EVERY', 50)
+DEBUG_PREVIEW_CHARS = 200
+# node records included in a sampled diagnostics log line
+DIAG_LOG_RECORDS = 5
+
+_debug_sampler = Sampler(DEBUG_SAMPLE_EVERY)
+
+
+def log_diag_summary(diag):
+    """
+    Log the counts of an ingest diag in one line; the per-node records are
+    never serialized, except for the first few in a sampled DEBUG line.
+    """
+    logger.info("Diagnostics: lines=%d parsed=%d broadcast=%d attached=%d nodes=%d errors=%d",
+                diag.get('lines_total', 0), diag.get('parsed_entries_count', 0),
+                diag.get('entries_skipped_broadcast', 0), diag.get('nodes_attached_count', 0),
+                len(diag.get('nodes_created') or ()), len(diag.get('errors') or ()))
+    if logger.isEnabledFor(logging.DEBUG) and _debug_sampler.sample():
+        logger.debug("Diagnostics sample: errors=%s records=%s", diag.get('errors', [])[:DIAG_LOG_RECORDS],
+                     (diag.get('nodes_created') or [])[:DIAG_LOG_RECORDS])
+
+class ArpTableCreateNodesView(View):
+
+    context_object_name = 'nodes'
+    template_name = "arp_table_input.html"
+
+    def get(self, request, project_id, network_id):
+        form = ArpTableForm()
+        network = get_object_or_404(Networks, pk=network_id, RelatedProject__pk=project_id)
+        logger.info("GET parse-arp for project=%s network=%s", project_id, network_id)
+        return render(request, self.template_name, {'form': form, 'network': network, 'project_id': project_id})
+
+    def post(self, request, project_id, network_id):
+        form = ArpTableForm(request.POST)
+        network = get_object_or_404(Networks, pk=network_id, RelatedProject__pk=project_id)
+        logger.info("POST parse-arp for project=%s network=%s", project_id, network_id)
+
+        if not form.is_valid():
+            logger.warning("Invalid parse form POST: %s", form.errors)
+            return render(request, self.template_name, {'form': form, 'network': network, 'project_id': project_id})
+
+        arp_text = form.cleaned_data.get('arp_text', '')
+
+        logger.info("Received arp_text length=%d", len(arp_text))
+        if logger.isEnabledFor(logging.DEBUG) and _debug_sampler.sample():
+            logger.debug("arp_text (first %d chars): %r", DEBUG_PREVIEW_CHARS, arp_text[:DEBUG_PREVIEW_CHARS])
+
+        diag = self.parse_and_create_nodes_diagnostic(arp_text, network)
+
+
+        # the ingest moved the counters by F() deltas; read back the stored values
+        diag['project_nodes_count'] = Project.objects.filter(pk=project_id).values_list(
+            'NumberOfNodes', flat=True).first() or 0
+
+        log_diag_summary(diag)
+
+        return render(request, self.template_name, {
+            'form': form,
+            'diag': diag,
+            'network': network,
+            'project_id': project_id,
+        })
+
+
+    def normalize_mac(self, mac):
+        return normalize_mac(mac)
+
+    def is_broadcast_or_multicast(self, mac):
+        return is_broadcast_or_multicast(mac)
+
+    @transaction.atomic
+    def parse_and_create_nodes_diagnostic(self, arp_text, network):
+
+        diag = {
+            'lines_total': 0,
+            'iface_detected_count': 0,
+            'parsed_entries_count': 0,
+            'entries_skipped_broadcast': 0,
+            'nodes_created': [],
+            'nodes_attached_count': 0,
+            'errors': [],
+            'samples': [],
+        }
+
+        entries = []
+        stats = ParseStats()
+
+        with timed('parse'):
+            for entry in parse_arp_lines(iter_text_lines(arp_text), stats=stats):
+                if is_broadcast_or_multicast(entry.mac):
+                    diag['entries_skipped_broadcast'] += 1
+                    continue
+                entries.append((entry.ip, entry.mac, entry.interface))
+        count_items('parse', stats.lines_total)
+
+        diag['lines_total'] = stats.lines_total
+        diag['iface_detected_count'] = stats.iface_detected_count
+        diag['parsed_entries_count'] = stats.parsed_entries_count
+        diag['samples'] = stats.samples
+        diag['formats'] = dict(stats.formats)
+
+        try:
+            # own savepoint: a failed write is rolled back and reported in the diag
+            with transaction.atomic():
+                # no scan for a paste without entries: it would read as every node gone
+                scan = start_scan(network, 'paste') if entries else None
+                bulk_ingest_entries(network, entries, diag, scan=scan)
+        except Exception as e:
+            diag['errors'].append(str(e))
+            logger.exception("Error creating/attaching node with vendor/type")
+
+        network.refresh_from_db(fields=['NumberOfNodes'])
+        diag['network_nodes_count'] = network.NumberOfNodes or 0
+
+        return diag
+
+
+def has_ingest_token(request):
+    """True when the request carries ``Authorization: Bearer <token>`` with one of ``ARP_INGEST_TOKENS``."""
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        return False
+    return any(hmac.compare_digest(token.strip(), allowed) for allowed in getattr(settings, 'ARP_INGEST_TOKENS', ()))
+
+
+# collectors are not browsers: no session, so no CSRF token, and a bearer token instead
+@method_decorator(csrf_exempt, name='dispatch')
+class ArpBulkIngestView(View):
+    """
+    Collector endpoint: the raw request body holds many ARP tables, each
+    introduced by an ``@network <id or name>`` line, optionally compressed
+    with ``Content-Encoding: gzip`` or ``zstd``. The body is parsed while it
+    is read and never materialized as a whole. With ``?assign=subnet`` the
+    body is untagged and each entry goes to the network whose subnet holds it.
+    Requests must carry one of the ``ARP_INGEST_TOKENS`` as a bearer token;
+    with none configured the endpoint refuses every request.
+    """
+
+    def post(self, request, project_id):
+        if not has_ingest_token(request):
+            response = JsonResponse({'errors': ["a valid 'Authorization: Bearer <token>' header is required"]},
+                                    status=401)
+            response['WWW-Authenticate'] = 'Bearer'
+            return response
+        project = get_object_or_404(Project, pk=project_id)
+        try:
+            stream = open_decoded_stream(request, request.headers.get('Content-Encoding'))
+        except UnsupportedEncoding as e:
+            return JsonResponse({'errors': [str(e)]}, status=415)
+
+        if request.GET.get('assign') == 'subnet':
+            summary = ingest_by_subnet(project, iter_stream_lines(stream))
+        else:
+            summary = ingest_tables(project, iter_stream_lines(stream))
+        logger.info("Bulk ingest for project %s: %d tables, %d lines, %d entries in %.2fs",
+                    project.pk, len(summary['tables']), summary['lines_total'], summary['entries_total'],
+                    summary['elapsed_s'])
+        return JsonResponse(summary, status=400 if summary['errors'] else 200)
+
+
+class ProjectArpTableView(View):
+    """Paste form for a whole project: entries are assigned to networks by their subnet masks."""
+    template_name = "arp_table_input.html"
+
+    def get(self, request, project_id):
+        project = get_object_or_404(Project, pk=project_id)
+        return render(request, self.template_name, {'form': ArpTableForm(), 'project': project,
+                                                     'project_id': project_id})
+
+    def post(self, request, project_id):
+        project = get_object_or_404(Project, pk=project_id)
+        form = ArpTableForm(request.POST)
+        if not form.is_valid():
+            return render(request, self.template_name, {'form': form, 'project': project, 'project_id': project_id})
+
+        summary = ingest_by_subnet(project, iter_text_lines(form.cleaned_data['arp_text']))
+        logger.info("Subnet ingest for project %s: %d networks, %d entries, %d unassigned",
+                    project.pk, len(summary['tables']), summary['entries_total'], summary['entries_unassigned'])
+        return render(request, self.template_name, {
+            'form': form,
+            'project': project,
+            'project_id': project_id,
+            'summary': summary,
+        })
@@ -0,0 +1,97 @@
+import logging
+
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.gzip import gzip_page
+
+from ..models import GraphRenderJob, Project
+from ..topology import GRAPH_BUILD_OPTIONS
+
+logger = logging.getLogger(__name__)
+
+# networkx, numpy and matplotlib are imported by the first graph request, not
+# when the URLconf loads: workers that only serve lists and ingest never pay
+# for them.
+
+
+def graph_job_payload(job):
+    graph = job.graph
+    return {
+        'id': job.pk,
+        'project_id': job.project_id,
+        'status': job.status,
+        'error': job.error or None,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'status_url': reverse('MainApp:project_graph_job', kwargs={'project_id': job.project_id, 'job_id': job.pk}),
+        'graph': {
+            'id': graph.pk,
+            'url': graph.image.url,
+            'created_at': graph.created_at.isoformat(),
+        } if graph is not None else None,
+    }
+
+
+class GenerateProjectGraphView(View):
+
+    def post(self, request, project_id):
+        from ..jobs import enqueue_graph_render
+
+        project = get_object_or_404(Project, pk=project_id)
+        job, created = enqueue_graph_render(project)
+        logger.info("Graph job %s for project %s (%s)", job.pk, project.pk, 'queued' if created else job.status)
+
+        if 'application/json' in request.headers.get('Accept', ''):
+            return JsonResponse(graph_job_payload(job), status=202)
+        url = reverse('MainApp:project_detail', kwargs={'pk': project.pk})
+        if job.status == GraphRenderJob.STATUS_DONE:
+            return redirect(url)
+        return redirect(f"{url}?graph_job={job.pk}")
+
+
+class GraphRenderJobStatusView(View):
+
+    def get(self, request, project_id, job_id):
+        from ..jobs import expire_stale_jobs
+
+        # a job whose worker died would otherwise be polled forever
+        expire_stale_jobs(project_id)
+        job = get_object_or_404(GraphRenderJob.objects.select_related('graph'), pk=job_id, project__pk=project_id)
+        return JsonResponse(graph_job_payload(job))
+
+
+@method_decorator(gzip_page, name='dispatch')
+class ProjectGraphExportView(View):
+    export_format = 'json'
+
+    def get(self, request, project_id):
+        from ..export import graph_to_json, iter_svg
+        from ..graph import graph_fingerprint, load_project_graph
+        from ..layout import compute_layout
+
+        project = get_object_or_404(Project, pk=project_id)
+        G, diag = load_project_graph(project)
+        options = {**GRAPH_BUILD_OPTIONS, 'export': self.export_format}
+        if self.export_format == 'svg':
+            options['label_limit'] = getattr(settings, 'GRAPH_LABEL_LIMIT', None)
+        etag = f'"{graph_fingerprint(G, options)}"'
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            layout = compute_layout(G)
+            if self.export_format == 'svg':
+                label_options = {}
+                if options['label_limit'] is not None:
+                    label_options['label_limit'] = options['label_limit']
+                response = StreamingHttpResponse(iter_svg(G, layout, **label_options), content_type='image/svg+xml')
+            else:
+                response = JsonResponse(graph_to_json(G, layout))
+        response['ETag'] = etag
+        patch_cache_control(response, no_cache=True)
+        return response
@@ -0,0 +1,11 @@
+from django.http import HttpResponse
+from django.views import View
+
+from ..metrics import REGISTRY
+
+
+class MetricsView(View):
+    """Stage timers and request histograms of this process in the Prometheus text format."""
+
+    def get(self, request):
+        return HttpResponse(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,120 @@
+from django.shortcuts import get_object_or_404, render
+from django.urls import reverse
+from django.views import View
+from django.views.generic import CreateView, DetailView, ListView
+from django.http import JsonResponse
+
+from ..dashboard import project_summaries, project_summary
+from ..forms import NodeFilterForm
+from ..listing import NODE_PAGE_SIZE, filter_nodes, node_page, node_payload
+from ..models import GraphRenderJob, Networks, Project
+
+class ProjectView(ListView):
+    queryset = Project.objects.only('pk', 'Name').order_by('pk')
+    context_object_name = 'projects'
+    template_name = 'project_list.html'
+    paginate_by = 16
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        summaries = project_summaries([project.pk for project in context['projects']])
+        for project in context['projects']:
+            project.summary = summaries[project.pk]
+        return context
+
+class ProjectCreateView(CreateView):
+    model = Project
+    fields = ['Name']
+    context_object_name = 'project'
+    template_name = 'project_create.html'
+    success_url = '/'
+
+class ProjectDetailView(DetailView):
+    queryset = Project.objects.only('pk', 'Name')
+    context_object_name = 'project'
+    template_name = "project_detail.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['summary'] = project_summary(self.object.pk)
+        job_id = self.request.GET.get('graph_job')
+        if job_id and job_id.isdigit():
+            context['graph_job'] = GraphRenderJob.objects.filter(pk=job_id, project=self.object).first()
+        return context
+
+class NetworksCreateView(CreateView):
+    model = Networks
+    fields = ['NetworkName', 'NetworkMask']
+    template_name = "network_create.html"
+
+    def form_valid(self, form):
+        # get project id from URL
+        project_id = self.kwargs.get('project_id')
+        project = get_object_or_404(Project, pk=project_id)
+        form.instance.RelatedProject = project
+        # Project.NumberOfNetworks is bumped by the post_save signal
+        return super().form_valid(form)
+
+    def get_success_url(self):
+
+        project_id = self.kwargs.get('project_id')
+        return reverse('MainApp:project_detail', kwargs={'pk': project_id})
+
+class ProjectNetworksNodesListView(View):
+    template_name = 'project_network_nodes_list.html'
+
+    def get(self, request, project_id, network_id):
+        network = get_object_or_404(Networks.objects.select_related('RelatedProject'),
+                                    pk=network_id, RelatedProject__pk=project_id)
+        wants_json = request.GET.get('format') == 'json' or 'application/json' in request.headers.get('Accept', '')
+
+        form = NodeFilterForm(request.GET)
+        if not form.is_valid():
+            if wants_json:
+                return JsonResponse({'errors': form.errors}, status=400)
+            return render(request, self.template_name, {
+                'form': form, 'project': network.RelatedProject, 'network': network, 'nodes': [],
+            }, status=400)
+
+        filters = form.cleaned_data
+        nodes = filter_nodes(network.Nodes.all(), vendor=filters['vendor'], type=filters['type'],
+                             mac=filters['mac'], cidr=filters['cidr'])
+        page, next_cursor = node_page(nodes, after=filters['after'], limit=filters['limit'] or NODE_PAGE_SIZE)
+
+        query = request.GET.copy()
+        query.pop('after', None)
+        first_url = f"{request.path}?{query.urlencode()}" if filters['after'] else None
+        next_url = None
+        if next_cursor is not None:
+            query['after'] = next_cursor
+            next_url = f"{request.path}?{query.urlencode()}"
+
+        if wants_json:
+            return JsonResponse({
+                'network': {'id': network.pk, 'name': network.NetworkName, 'project_id': network.RelatedProject_id},
+                'nodes': [node_payload(node) for node in page],
+                'next': next_cursor,
+                'next_url': next_url,
+            })
+        return render(request, self.template_name, {
+            'form': form,
+            'project': network.RelatedProject,
+            'network': network,
+            'nodes': page,
+            'next_url': next_url,
+            'first_url': first_url,
+        })
+
+class ProjectNetworksListView(ListView):
+    context_object_name = 'networks'
+    template_name = "network_list.html"
+
+    def get_queryset(self):
+        self.project = get_object_or_404(Project.objects.only('pk', 'Name'), pk=self.kwargs.get('pk'))
+        # network rows with their attachment counts, from the cached project summary
+        return project_summary(self.project.pk)['networks']
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['project'] = self.project
+        return context
@@ -0,0 +1,52 @@
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views import View
+
+from ..history import diff_scans
+from ..models import Networks, Node, Scan
+
+
+class NetworkScanListView(View):
+    """Scans of one network, newest first."""
+
+    def get(self, request, project_id, network_id):
+        network = get_object_or_404(Networks, pk=network_id, RelatedProject__pk=project_id)
+        scans = Scan.objects.filter(network=network).values('pk', 'previous_id', 'source', 'taken_at')
+        return JsonResponse({'scans': [
+            {'id': scan['pk'], 'previous': scan['previous_id'], 'source': scan['source'],
+             'taken_at': scan['taken_at'].isoformat()}
+            for scan in scans
+        ]})
+
+
+class NetworkScanDiffView(View):
+    """
+    Hosts added, removed and re-addressed between the scans ``?from=`` and
+    ``?to=`` of a network; without them, between its last two scans.
+    """
+
+    def get(self, request, project_id, network_id):
+        network = get_object_or_404(Networks, pk=network_id, RelatedProject__pk=project_id)
+        scans = Scan.objects.filter(network=network)
+        try:
+            new = scans.get(pk=int(request.GET['to'])) if 'to' in request.GET else scans.first()
+            if 'from' in request.GET:
+                old = scans.get(pk=int(request.GET['from']))
+            else:
+                old = scans.filter(pk__lt=new.pk).first() if new is not None else None
+        except (ValueError, Scan.DoesNotExist):
+            return JsonResponse({'errors': ["'from' and 'to' must be scans of this network"]}, status=400)
+        if old is None or new is None:
+            return JsonResponse({'errors': ["the network needs two scans to compare"]}, status=400)
+
+        diff = diff_scans(old, new)
+        pks = {row[0] for rows in diff.values() for row in rows}
+        macs = {node.pk: node.MacAddress for node in Node.objects.filter(pk__in=pks).only('pk', 'MacInt')}
+        return JsonResponse({
+            'from': old.pk,
+            'to': new.pk,
+            'added': [{'node': pk, 'mac': macs.get(pk), 'ip': ip} for pk, ip in diff['added']],
+            'removed': [{'node': pk, 'mac': macs.get(pk), 'ip': ip} for pk, ip in diff['removed']],
+            'changed': [{'node': pk, 'mac': macs.get(pk), 'old_ip': old_ip, 'new_ip': new_ip}
+                        for pk, old_ip, new_ip in diff['changed']],
+        })
@@ -0,0 +1,120 @@
+import csv
+import random
+from typing import Dict, Iterator, List
+
+from MainApp.utils.oui import OUI_CSV_PATH
+
+# share of MACs per vendor; keys are matched against vendor names of MA-L blocks,
+# 'unknown' draws locally administered MACs that no OUI block covers
+DEFAULT_VENDOR_MIX = {
+    'cisco': 0.10,
+    'hewlett': 0.10,
+    'apple': 0.25,
+    'samsung': 0.15,
+    'epson': 0.05,
+    'unknown': 0.35,
+}
+
+FORMATS = ('linux-ip-neigh', 'arp-an', 'windows')
+
+_prefix_cache = {}
+
+
+def vendor_prefixes(vendors, csv_path=None, per_vendor=16) -> Dict[str, List[int]]:
+    """Up to ``per_vendor`` MA-L prefixes (24-bit ints) per vendor key, in CSV order."""
+    key = (tuple(sorted(vendors)), csv_path, per_vendor)
+    if key in _prefix_cache:
+        return _prefix_cache[key]
+    wanted = [v for v in vendors if v != 'unknown']
+    prefixes = {v: [] for v in wanted}
+    with open(csv_path or OUI_CSV_PATH, encoding='utf-8', newline='') as fh:
+        for row in csv.DictReader(fh):
+            if (row.get('Block Type') or '').upper() != 'MA-L':
+                continue
+            name = (row.get('Vendor Name') or '').lower()
+            for vendor in wanted:
+                if vendor in name and len(prefixes[vendor]) < per_vendor:
+                    prefixes[vendor].append(int(row['Mac Prefix'].replace(':', ''), 16))
+    _prefix_cache[key] = prefixes
+    return prefixes
+
+
+def _mac_text(value):
+    digits = f'{value:012x}'
+    return ':'.join(digits[i:i + 2] for i in range(0, 12, 2))
+
+
+def _ip_text(index, subnet):
+    # 10.<subnet>.x.y, skipping .0 and .255 host bytes
+    host = index % (254 * 256)
+    return f"10.{subnet % 256}.{host // 254}.{host % 254 + 1}"
+
+
+def generate_macs(count, vendor_mix=None, seed=0, csv_path=None) -> List[int]:
+    """``count`` distinct 48-bit MACs drawn per ``vendor_mix``; the same arguments give the same list."""
+    vendor_mix = vendor_mix or DEFAULT_VENDOR_MIX
+    rng = random.Random(seed)
+    prefixes = vendor_prefixes(vendor_mix, csv_path)
+    vendors = [v for v in vendor_mix if v == 'unknown' or prefixes.get(v)]
+    weights = [vendor_mix[v] for v in vendors]
+
+    macs = []
+    seen = set()
+    while len(macs) < count:
+        vendor = rng.choices(vendors, weights)[0]
+        if vendor == 'unknown':
+            # locally administered, unicast
+            mac = (rng.getrandbits(48) | (0x02 << 40)) & ~(0x01 << 40)
+        else:
+            mac = (rng.choice(prefixes[vendor]) << 24) | rng.getrandbits(24)
+        if mac not in seen:
+            seen.add(mac)
+            macs.append(mac)
+    return macs
+
+
+def format_line(fmt, ip, mac, interface):
+    if fmt == 'linux-ip-neigh':
+        return f"{ip} dev {interface} lladdr {mac} REACHABLE\n"
+    if fmt == 'arp-an':
+        return f"? ({ip}) at {mac} [ether] on {interface}\n"
+    raise ValueError(f"unknown format {fmt!r}")
+
+
+def generate_arp_lines(count, vendor_mix=None, interfaces=4, seed=0, fmt='linux-ip-neigh', subnet=0,
+                       csv_path=None) -> Iterator[str]:
+    """
+    Yield a synthetic ARP dump of ``count`` entries, spread round-robin over
+    ``interfaces`` interfaces. ``fmt`` is one of ``FORMATS``; Windows dumps
+    get one ``Interface:`` header per interface block.
+    """
+    macs = generate_macs(count, vendor_mix, seed, csv_path)
+    if fmt == 'windows':
+        per_interface = [[] for _ in range(max(interfaces, 1))]
+        for i, mac in enumerate(macs):
+            per_interface[i % len(per_interface)].append((i, mac))
+        for n, rows in enumerate(per_interface):
+            yield f"Interface: 10.{subnet % 256}.255.{n + 1} --- 0x{n + 2:x}\n"
+            yield "  Internet Address      Physical Address      Type\n"
+            for i, mac in rows:
+                yield f"  {_ip_text(i, subnet):<21} {_mac_text(mac).replace(':', '-'):<21} dynamic\n"
+        return
+    for i, mac in enumerate(macs):
+        yield format_line(fmt, _ip_text(i, subnet), _mac_text(mac), f"eth{i % max(interfaces, 1)}")
+
+
+def generate_project_dumps(lines, networks=4, vendor_mix=None, interfaces=4, seed=0, fmt='linux-ip-neigh',
+                           csv_path=None) -> List[List[str]]:
+    """
+    Split ``lines`` entries over ``networks`` dumps, one per network and subnet
+    ``10.<n>.0.0/16``. A tenth of each dump's hosts reappear in the next
+    network's dump, so the networks share hosts as real projects do.
+    """
+    per_network = max(lines // max(networks, 1), 1)
+    dumps = []
+    for n in range(networks):
+        dumps.append(list(generate_arp_lines(per_network, vendor_mix, interfaces, seed * 1000 + n, fmt, n, csv_path)))
+    overlap = per_network // 10
+    for n in range(1, networks):
+        dumps[n][:overlap] = dumps[n - 1][-overlap:] if overlap else []
+    return dumps
@@ -0,0 +1,267 @@
+"""
+Stage benchmarks for the ARP ingest and graph pipeline.
+
+Run from the ``ArpAPP`` directory::
+
+    python -m benchmarks.run                      # compare against benchmarks/baseline.json
+    python -m benchmarks.run --sizes 1000 100000  # other dump sizes (lines)
+    python -m benchmarks.run --update-baseline    # record the current numbers as the baseline
+
+Every size runs against a fresh in-memory test database. Each stage records
+wall time, SQL query count and peak Python memory (tracemalloc); the process
+exits with status 1 when a stage is slower, uses more memory or issues more
+queries than the baseline allows.
+
+A startup check boots Django and imports ``MainApp.urls`` in fresh
+interpreters under ``-X importtime``. It fails when the app's imports take
+longer than ``--import-budget-ms`` or pull in the graph stack (networkx, numpy,
+matplotlib), which only graph requests should load.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+DEFAULT_SIZES = (1000, 10000)
+
+# graph stages draw every node; beyond this many lines they are skipped
+GRAPH_MAX_LINES = 100000
+
+STAGES = ('parse', 'oui_lookup', 'ingest', 'graph_rebuild', 'graph_load', 'layout', 'render')
+
+# a stage regresses when it exceeds baseline * TOLERANCE + the absolute slack
+TIME_TOLERANCE = 1.5
+TIME_SLACK_S = 0.05
+MEMORY_TOLERANCE = 1.25
+MEMORY_SLACK_KIB = 1024
+
+# fixed budget for MainApp's share of a worker's startup imports, best of IMPORT_RUNS
+IMPORT_BUDGET_MS = 120
+IMPORT_RUNS = 3
+LAZY_MODULES = ('networkx', 'numpy', 'matplotlib', 'scipy')
+
+
+def _setup_django():
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ArpAPP.settings')
+    import django
+    django.setup()
+
+
+class StageTimer:
+    """Collects ``{stage: {'seconds', 'queries', 'peak_kib'}}`` for one benchmark size."""
+
+    def __init__(self):
+        self.results = {}
+
+    def run(self, stage, func, *args, **kwargs):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            result = func(*args, **kwargs)
+            elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        self.results[stage] = {
+            'seconds': round(elapsed, 4),
+            'queries': len(queries),
+            'peak_kib': round(max(peak - base, 0) / 1024),
+        }
+        return result
+
+
+def run_size(lines, networks=4, interfaces=4, vendor_mix=None, seed=0, graph_max_lines=GRAPH_MAX_LINES):
+    from django.core.management import call_command
+
+    from MainApp.graph import load_project_graph
+    from MainApp.graph_store import rebuild_project_graph
+    from MainApp.layout import compute_layout
+    from MainApp.models import Networks, Project
+    from MainApp.parsing import parse_arp_lines
+    from MainApp.rendering import render_project_graph_png
+    from MainApp.utils.oui import get_vendor_and_device_type
+    from MainApp.views import ArpTableCreateNodesView
+
+    from .generator import generate_project_dumps
+
+    call_command('flush', interactive=False, verbosity=0)
+    dumps = generate_project_dumps(lines, networks, vendor_mix, interfaces, seed)
+    project = Project.objects.create(Name=f"bench-{lines}")
+    nets = [Networks.objects.create(RelatedProject=project, NetworkName=f"net-{n}",
+                                    NetworkMask=f"10.{n}.0.0/16") for n in range(networks)]
+    all_lines = [line for dump in dumps for line in dump]
+
+    timer = StageTimer()
+    entries = timer.run('parse', lambda: list(parse_arp_lines(all_lines)))
+    macs = sorted({entry.mac for entry in entries})
+    timer.run('oui_lookup', lambda: [get_vendor_and_device_type(mac) for mac in macs])
+
+    view = ArpTableCreateNodesView()
+    texts = [''.join(dump) for dump in dumps]
+    timer.run('ingest', lambda: [view.parse_and_create_nodes_diagnostic(text, net) for text, net in zip(texts, nets)])
+
+    if lines <= graph_max_lines:
+        timer.run('graph_rebuild', rebuild_project_graph, project)
+        # what a render job draws from
+        G, _ = timer.run('graph_load', load_project_graph, project)
+        layout = timer.run('layout', compute_layout, G)
+        timer.run('render', render_project_graph_png, G)
+        del layout
+    return timer.results
+
+
+def measure_startup(runs=IMPORT_RUNS):
+    """
+    Import ``MainApp.urls`` after ``django.setup()`` in ``runs`` fresh
+    interpreters with ``-X importtime`` and return the fastest as
+    ``{'app_ms', 'urls_ms', 'eager'}``: cumulative milliseconds of every
+    top-level MainApp import (models and signals load during setup), the
+    URLconf's own share, and the lazily imported packages that were loaded anyway.
+    """
+    project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'ArpAPP.settings', 'PYTHONPATH': project_dir}
+    code = 'import django; django.setup(); import MainApp.urls'
+    best = None
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=project_dir, env=env,
+                              capture_output=True, text=True, check=True)
+        app_us = urls_us = 0
+        eager = set()
+        for line in proc.stderr.splitlines():
+            # "import time:  self [us] | cumulative | <two spaces per nesting level>name"
+            if not line.startswith('import time:'):
+                continue
+            _, cumulative, name = line[len('import time:'):].split('|')
+            if not cumulative.strip().isdigit():
+                continue
+            depth = (len(name) - len(name.lstrip()) - 1) // 2
+            name = name.strip()
+            if name.split('.')[0] in LAZY_MODULES:
+                eager.add(name.split('.')[0])
+            if depth == 0 and name.split('.')[0] == 'MainApp':
+                app_us += int(cumulative)
+            if name == 'MainApp.urls':
+                urls_us = int(cumulative)
+        run = {'app_ms': round(app_us / 1000, 1), 'urls_ms': round(urls_us / 1000, 1), 'eager': sorted(eager)}
+        if best is None or run['app_ms'] < best['app_ms']:
+            best = run
+    return best
+
+
+def check_startup(startup, budget_ms=IMPORT_BUDGET_MS):
+    failures = []
+    if startup['app_ms'] > budget_ms:
+        failures.append(f"startup: MainApp imports take {startup['app_ms']:.1f}ms, budget {budget_ms}ms")
+    if startup['eager']:
+        failures.append(f"startup: importing MainApp.urls loads {', '.join(startup['eager'])}")
+    return failures
+
+
+def compare(results, baseline):
+    """Return one message per stage that regressed against ``baseline``."""
+    failures = []
+    for size, stages in results.items():
+        for stage, now in stages.items():
+            then = baseline.get(size, {}).get(stage)
+            if then is None:
+                continue
+            if now['seconds'] > then['seconds'] * TIME_TOLERANCE + TIME_SLACK_S:
+                failures.append(f"{size} lines / {stage}: {now['seconds']:.3f}s vs baseline {then['seconds']:.3f}s")
+            if now['queries'] > then['queries']:
+                failures.append(f"{size} lines / {stage}: {now['queries']} queries vs baseline {then['queries']}")
+            if now['peak_kib'] > then['peak_kib'] * MEMORY_TOLERANCE + MEMORY_SLACK_KIB:
+                failures.append(f"{size} lines / {stage}: peak {now['peak_kib']} KiB vs baseline {then['peak_kib']} KiB")
+    return failures
+
+
+def print_table(results, out=sys.stdout):
+    out.write(f"{'lines':>9} {'stage':<14} {'seconds':>9} {'queries':>8} {'peak KiB':>10}\n")
+    for size, stages in results.items():
+        for stage in STAGES:
+            if stage in stages:
+                r = stages[stage]
+                out.write(f"{size:>9} {stage:<14} {r['seconds']:>9.4f} {r['queries']:>8} {r['peak_kib']:>10}\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the ARP ingest and graph pipeline stage by stage.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help="Dump sizes in lines.")
+    parser.add_argument('--networks', type=int, default=4)
+    parser.add_argument('--interfaces', type=int, default=4, help="Interfaces per dump (ARP segments).")
+    parser.add_argument('--vendor-mix', dest='vendor_mix', default=None,
+                        help="JSON object of vendor share, e.g. '{\"cisco\": 0.5, \"unknown\": 0.5}'.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--graph-max-lines', dest='graph_max_lines', type=int, default=GRAPH_MAX_LINES)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', dest='update_baseline', action='store_true')
+    parser.add_argument('--output', default=None, help="Also write the results as JSON here.")
+    parser.add_argument('--import-budget-ms', dest='import_budget_ms', type=float, default=IMPORT_BUDGET_MS,
+                        help="Budget for MainApp's startup imports (django.setup() plus MainApp.urls).")
+    args = parser.parse_args(argv)
+
+    # before this process imports anything, so nothing is measured warm
+    startup = measure_startup()
+    startup_failures = check_startup(startup, args.import_budget_ms)
+
+    _setup_django()
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    from MainApp.utils.oui import load_oui_index
+
+    vendor_mix = json.loads(args.vendor_mix) if args.vendor_mix else None
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    load_oui_index()
+    tracemalloc.start()
+    try:
+        results = {
+            str(size): run_size(size, args.networks, args.interfaces, vendor_mix, args.seed, args.graph_max_lines)
+            for size in args.sizes
+        }
+    finally:
+        tracemalloc.stop()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    print_table(results)
+    print(f"startup: MainApp imports {startup['app_ms']:.1f}ms (MainApp.urls {startup['urls_ms']:.1f}ms), "
+          f"budget {args.import_budget_ms:g}ms")
+    for failure in startup_failures:
+        print(f"REGRESSION {failure}", file=sys.stderr)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            json.dump(results, fh, indent=2)
+
+    if args.update_baseline:
+        baseline = {
+            'meta': {'python': platform.python_version(), 'machine': platform.machine(),
+                     'networks': args.networks, 'interfaces': args.interfaces, 'seed': args.seed},
+            'results': results,
+        }
+        with open(args.baseline, 'w', encoding='utf-8') as fh:
+            json.dump(baseline, fh, indent=2)
+            fh.write('\n')
+        print(f"Wrote baseline {args.baseline}")
+        return 1 if startup_failures else 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one.")
+        return 1 if startup_failures else 0
+    with open(args.baseline, encoding='utf-8') as fh:
+        failures = compare(results, json.load(fh).get('results', {}))
+    for failure in failures:
+        print(f"REGRESSION {failure}", file=sys.stderr)
+    return 1 if failures or startup_failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())